@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+중단되어도 깨지지 않는 파일 쓰기와 종목별 파일 잠금
+
+- atomic_write: 같은 폴더의 임시 파일에 다 쓴 뒤 os.replace로 교체합니다. 쓰는 도중
+  프로세스가 죽어도 기존 파일은 그대로이고, 읽는 쪽은 항상 이전 또는 새 파일 전체를 봅니다.
+- write_if_changed: 내용이 디스크와 같으면 쓰지 않습니다 (변경 없는 종목 파일 재작성 방지).
+- file_lock: 종목 파일 하나의 읽기 → 병합 → 쓰기를 다른 스레드/프로세스와 겹치지 않게 하는
+  권고(advisory) 잠금입니다. <폴더>/.locks/<파일명>.lock에 flock을 걸며, 같은 스레드 안에서는
+  다시 잠가도 기다리지 않습니다 (저장 중 장기 이력 기록 등).
+
+fcntl이 없는 환경(Windows)에서는 같은 프로세스 안의 스레드끼리만 잠급니다.
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCK_DIR = ".locks"
+
+# 잠금 파일 경로별 프로세스 내부 잠금 (fcntl이 없을 때, 그리고 같은 스레드의 재진입 판단용)
+_locks = {}
+_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# import 시점에 한 번만 읽음 (os.umask는 프로세스 전체 설정을 잠시 바꾸므로 스레드에서 호출하지 않음)
+_UMASK = _umask()
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8', newline=None):
+    """
+    path에 쓸 파일 객체를 돌려주고, 블록이 정상 종료되면 원래 파일과 교체합니다.
+
+    블록에서 예외가 나면 임시 파일을 지우고 기존 파일은 건드리지 않습니다.
+
+    Args:
+        path (str): 최종 파일 경로
+        mode (str): 'w' 또는 'wb'
+        encoding (str): 텍스트 모드 인코딩 (예: CSV는 'utf-8-sig')
+        newline: open()의 newline 인자 (CSV는 '')
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        if 'b' in mode:
+            f = os.fdopen(fd, mode)
+        else:
+            f = os.fdopen(fd, mode, encoding=encoding, newline=newline)
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp는 0600으로 만들므로 일반 파일 권한으로 맞춤
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_if_changed(path, text, encoding='utf-8'):
+    """
+    text를 인코딩한 내용이 디스크의 파일과 다를 때만 원자적으로 씁니다.
+
+    Returns:
+        bool: 파일을 새로 썼으면 True, 내용이 같아 건너뛰었으면 False
+    """
+    content = text.encode(encoding)
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    with atomic_write(path, 'wb') as f:
+        f.write(content)
+    return True
+
+
+@contextmanager
+def file_lock(path):
+    """
+    path(확장자 제외 가능, 예: data/kr/stock_005930)에 대한 배타적 잠금을 잡습니다.
+
+    Args:
+        path (str): 잠글 대상 경로 - 같은 경로를 쓰는 모든 스레드/프로세스가 서로를 기다림
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    lock_path = os.path.join(directory, LOCK_DIR, f"{name}.lock")
+
+    held = getattr(_held, 'paths', None)
+    if held is None:
+        held = _held.paths = set()
+    if lock_path in held:
+        # 같은 스레드가 이미 잡고 있음
+        yield
+        return
+
+    with _locks_guard:
+        thread_lock = _locks.setdefault(lock_path, threading.Lock())
+
+    with thread_lock:
+        held.add(lock_path)
+        try:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+            with open(lock_path, 'a') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            held.discard(lock_path)
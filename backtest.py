@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+운영 매뉴얼 정배열 전략 백테스트
+
+저장된 장기 이력(data/<market>/history/)과 최근 20일 파일을 종목 × 날짜 행렬로 읽어
+(종목이 많으면 프로세스 풀로 나눠 읽음) 매뉴얼의 매수/매도 규칙과 자금 관리 규칙을
+포트폴리오 단위로 적용합니다. 국내/미국은 통화가 다르므로 따로 계산합니다.
+
+- 매수: 신호 발생 다음 거래일에 신호일 종가로 지정가 주문 (저가가 지정가 이하일 때 체결)
+- 매도: 장 마감 후 위험 신호 → 손절 → 익절 순으로 확인해 다음 거래일 시가에 전량 매도
+- 자금: 1회 매수 금액 단위, 종목당 최대 2회, 최대 4종목, 신호가 겹치면 자금 한도 내 모두 매수
+
+사용법:
+    python backtest.py [--market kr|us|all] [--codes 005930,AAPL] [--start 2020-01-01] [--end 2026-12-31]
+                       [--capital N] [--lot N] [--workers N] [--backfill DAYS] [--trades] [--json]
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cli_options import pop_flag, pop_option
+from history_store import HistoryStore
+from market_data import MARKETS, list_codes, load_matrix
+from strategy import StrategyParams, evaluate
+
+# 시장별 (총 자금, 1회 매수 금액) 기본값
+# 국내는 운영 매뉴얼 v1.3 기준, 미국 매뉴얼은 자금 규칙이 정해지지 않아 같은 비율(4회분)로 둠
+DEFAULT_CAPITAL = {
+    'kr': (48_000_000, 12_000_000),
+    'us': (40_000, 10_000),
+}
+
+
+class BacktestResult:
+    """백테스트 결과 (체결 내역, 일별 평가금액, 요약 지표)"""
+
+    def __init__(self, market, dates, equity, trades, capital):
+        self.market = market
+        self.dates = dates
+        self.equity = equity
+        self.trades = trades
+        self.capital = capital
+
+    @property
+    def drawdown(self):
+        """일별 낙폭 (고점 대비 비율, 0 이하)"""
+        if not len(self.equity):
+            return np.array([])
+        peak = np.maximum.accumulate(self.equity)
+        return self.equity / peak - 1.0
+
+    def summary(self):
+        final = float(self.equity[-1]) if len(self.equity) else float(self.capital)
+        wins = [trade for trade in self.trades if trade['pnl'] > 0]
+        return {
+            'market': self.market,
+            'start': self.dates[0] if self.dates else None,
+            'end': self.dates[-1] if self.dates else None,
+            'capital': self.capital,
+            'final_equity': final,
+            'total_return': final / self.capital - 1.0,
+            'max_drawdown': float(self.drawdown.min()) if len(self.equity) else 0.0,
+            'trades': len(self.trades),
+            'win_rate': len(wins) / len(self.trades) if self.trades else 0.0,
+        }
+
+
+def _forward_fill(values):
+    """행마다 NaN을 직전 값으로 채웁니다 (평가금액 계산용)."""
+    cols = np.arange(values.shape[1])
+    index = np.where(np.isnan(values), 0, cols)
+    np.maximum.accumulate(index, axis=1, out=index)
+    return values[np.arange(values.shape[0])[:, None], index]
+
+
+def simulate(matrix, signals, params, capital, lot, start=None, end=None, market=None):
+    """
+    포트폴리오 단위로 매수/매도 규칙을 적용합니다.
+
+    Args:
+        matrix (PriceMatrix): 날짜 기준 가격 행렬
+        signals (dict): strategy.evaluate() 결과
+        params (StrategyParams): 매도/자금 관리 기준값
+        capital (float): 총 자금
+        lot (float): 1회 매수 금액
+        start (str): 매매 시작일 (YYYY-MM-DD, 이전 날짜는 지표 계산에만 사용)
+        end (str): 매매 종료일
+
+    Returns:
+        BacktestResult
+    """
+    dates = matrix.dates
+    first = next((i for i, day in enumerate(dates) if not start or day >= start), len(dates))
+    last = max((i for i, day in enumerate(dates) if not end or day <= end), default=-1) + 1
+
+    open_, low, close = matrix.open, matrix.low, matrix.close
+    valuation = _forward_fill(close)
+    buy, danger, mid_gap = signals['buy'], signals['danger'], signals['mid_gap']
+    buy_days = buy.any(axis=0)
+
+    cash = float(capital)
+    positions = {}   # row -> {'shares', 'cost', 'buys', 'entry_date'}
+    orders = {}      # row -> 지정가 (다음 거래일 매수 주문)
+    exits = {}       # row -> 매도 사유 (다음 거래일 시가 매도)
+    trades = []
+    equity = []
+
+    for t in range(first, last):
+        # 1) 전일 장 마감 후 결정한 매도를 시가에 실행
+        for row, reason in list(exits.items()):
+            price = open_[row, t] if not np.isnan(open_[row, t]) else close[row, t]
+            if np.isnan(price):
+                continue
+            position = positions.pop(row)
+            proceeds = position['shares'] * price * (1.0 - params.tax)
+            cash += proceeds
+            trades.append({
+                'code': matrix.codes[row],
+                'name': matrix.names[row],
+                'entry_date': position['entry_date'],
+                'exit_date': dates[t],
+                'buys': position['buys'],
+                'shares': position['shares'],
+                'avg_price': position['cost'] / position['shares'],
+                'exit_price': float(price),
+                'reason': reason,
+                'pnl': proceeds - position['cost'],
+                'return': proceeds / position['cost'] - 1.0,
+            })
+            del exits[row]
+
+        # 2) 전일 종가 지정가 매수 주문 체결 (갭상승으로 미체결이면 주문 취소)
+        for row, limit in orders.items():
+            if np.isnan(low[row, t]) or low[row, t] > limit:
+                continue
+            price = min(open_[row, t], limit) if not np.isnan(open_[row, t]) else limit
+            shares = int(lot // price)
+            if shares < 1 or shares * price > cash:
+                continue
+            cash -= shares * price
+            position = positions.setdefault(row, {'shares': 0, 'cost': 0.0, 'buys': 0, 'entry_date': dates[t]})
+            position['shares'] += shares
+            position['cost'] += shares * price
+            position['buys'] += 1
+        orders = {}
+
+        # 3) 장 마감 후 매도 조건 확인 (위험 신호 → 손절 → 익절)
+        for row, position in positions.items():
+            if row in exits or np.isnan(close[row, t]):
+                continue
+            real_return = close[row, t] * position['shares'] / position['cost'] - 1.0 - params.tax
+            if danger[row, t]:
+                exits[row] = 'danger'
+            elif real_return <= -params.stop_loss:
+                exits[row] = 'stop'
+            elif real_return >= params.take_profit:
+                exits[row] = 'take'
+
+        # 4) 매수 신호 → 다음 거래일 지정가 주문 (MA10에 가까운 종목부터, 자금 한도 내 모두)
+        if t + 1 < last and buy_days[t]:
+            rows = np.flatnonzero(buy[:, t])
+            rows = rows[np.argsort(np.abs(mid_gap[rows, t]))]
+            available = cash
+            holding = len(positions)
+            for row in rows:
+                row = int(row)
+                if row in exits or available < lot:
+                    continue
+                if row in positions:
+                    if positions[row]['buys'] >= params.max_buys:
+                        continue
+                elif holding >= params.max_positions:
+                    continue
+                else:
+                    holding += 1
+                orders[row] = float(close[row, t])
+                available -= lot
+
+        held = sum(position['shares'] * valuation[row, t] for row, position in positions.items())
+        equity.append(cash + held)
+
+    return BacktestResult(market, dates[first:last], np.array(equity), trades, capital)
+
+
+def backfill(market, codes, days, data_dir=None):
+    """
+    fetcher로 최근 days 거래일 일봉을 받아 장기 이력(history/)에 추가합니다.
+
+    Returns:
+        dict: {종목코드: 추가한 일봉 수}
+    """
+    store = HistoryStore(os.path.join(data_dir or MARKETS[market][0], "history"))
+    if market == 'kr':
+        from stock_fetcher import NaverStockFetcher
+        fetcher = NaverStockFetcher()
+
+        def fetch(code):
+            return fetcher.fetch_historical_data(code, days=days) or []
+    else:
+        from stock_fetcher_us import YahooStockFetcher
+        fetcher = YahooStockFetcher()
+
+        def fetch(code):
+            info = fetcher.fetch_stock_info(code, sessions=days)
+            return sorted(info['data'], key=lambda bar: bar.date) if info else []
+
+    with ThreadPoolExecutor(max_workers=fetcher.max_workers) as executor:
+        fetched = dict(zip(codes, executor.map(fetch, codes)))
+    return {code: store.append(code, bars) for code, bars in fetched.items()}
+
+
+def run(market, codes=None, params=None, capital=None, lot=None, start=None, end=None,
+        data_dir=None, workers=None):
+    """
+    시장 하나를 읽고 신호를 계산해 백테스트합니다.
+
+    Returns:
+        BacktestResult (데이터가 없으면 None)
+    """
+    params = params or StrategyParams()
+    default_capital, default_lot = DEFAULT_CAPITAL[market]
+    # 주말/휴장일로 잘못 저장된 행은 거래일로 시뮬레이션하지 않음
+    matrix = load_matrix(market, codes, data_dir, workers=workers, sessions_only=True)
+    if matrix is None:
+        return None
+    signals = evaluate(matrix.close, matrix.volume, params)
+    return simulate(matrix, signals, params, capital or default_capital, lot or default_lot,
+                    start, end, market)
+
+
+def print_result(result, show_trades=False):
+    s = result.summary()
+    digits = 0 if result.market == 'kr' else 2
+    print(f"[{s['market']}] {s['start']} ~ {s['end']}")
+    print(f"  총 자금 {s['capital']:,.{digits}f} → 평가금액 {s['final_equity']:,.{digits}f} "
+          f"({s['total_return'] * 100:+.2f}%)")
+    print(f"  최대 낙폭 {s['max_drawdown'] * 100:.2f}%, 매매 {s['trades']}회, 승률 {s['win_rate'] * 100:.1f}%")
+    if show_trades:
+        for trade in result.trades:
+            print(f"  {trade['code']:<8} {trade['entry_date']} → {trade['exit_date']} "
+                  f"{trade['buys']}회 {trade['avg_price']:,.{digits}f} → {trade['exit_price']:,.{digits}f} "
+                  f"{trade['return'] * 100:+.2f}% ({trade['reason']})")
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        market = pop_option(args, '--market', 'all')
+        codes = pop_option(args, '--codes')
+        start = pop_option(args, '--start')
+        end = pop_option(args, '--end')
+        capital = pop_option(args, '--capital', None, float)
+        lot = pop_option(args, '--lot', None, float)
+        workers = pop_option(args, '--workers', None, int)
+        backfill_days = pop_option(args, '--backfill', None, int)
+        show_trades = pop_flag(args, '--trades')
+        as_json = pop_flag(args, '--json')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args or market not in ('kr', 'us', 'all'):
+        print(__doc__)
+        sys.exit(1)
+
+    codes = [code.strip() for code in codes.split(',') if code.strip()] if codes else None
+    reports = {}
+    for name in MARKETS:
+        if market not in (name, 'all'):
+            continue
+        market_codes = [c for c in codes if c.isdigit() == (name == 'kr')] if codes else None
+        if backfill_days:
+            added = backfill(name, market_codes or list_codes(name), backfill_days)
+            print(f"[{name}] 이력 보충: {len(added)}종목, {sum(added.values())}일봉")
+        result = run(name, market_codes, capital=capital, lot=lot, start=start, end=end, workers=workers)
+        if result is None:
+            if not as_json:
+                print(f"[{name}] 데이터가 없습니다")
+            continue
+        if as_json:
+            reports[name] = {
+                'summary': result.summary(),
+                'equity': [{'date': day, 'equity': float(value), 'drawdown': float(dd)}
+                           for day, value, dd in zip(result.dates, result.equity, result.drawdown)],
+                'trades': result.trades,
+            }
+        else:
+            print_result(result, show_trades)
+
+    if as_json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
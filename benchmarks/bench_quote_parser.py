@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+네이버 현재가 페이지 파서 벤치마크 (BeautifulSoup html.parser vs lxml XPath)
+
+파서별로 현재가 1건당 CPU 시간과 메모리 할당(tracemalloc 최대 사용량, 할당 블록 수)을
+측정하고, 두 파서가 같은 값을 추출하는지 확인합니다. libxml2 내부 할당은 tracemalloc에
+잡히지 않으므로 lxml의 메모리 수치는 Python 객체 기준입니다.
+
+사용법:
+    python benchmarks/bench_quote_parser.py [--file page.html] [--encoding euc-kr] [--repeat 200] [--json]
+
+--file을 생략하면 실제 종목 페이지와 비슷한 크기(약 150KB)의 합성 페이지를 사용합니다.
+--record로 녹화한 fixture의 bodies/*.bin 파일도 그대로 사용할 수 있습니다.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli_options import pop_flag, pop_option  # noqa: E402
+from quote_parser import PARSERS, lxml_etree  # noqa: E402
+
+
+def synthetic_page(filler_blocks=400):
+    """종목 페이지 구조(상단 메뉴, 시세 영역, 뉴스/공시/재무 표)를 흉내 낸 HTML"""
+    menu = ''.join(f'<li class="menu_item"><a href="/menu/{i}">메뉴 {i}</a></li>' for i in range(60))
+    filler = ''.join(
+        f'<div class="section sub_section"><h4 class="h_sub">영역 {i}</h4>'
+        f'<table class="tb_type1"><tr><th scope="row">항목 {i}</th><td class="num">{i * 1234:,}</td>'
+        f'<td class="num"><em class="up">{i % 7}.{i % 10}%</em></td><td><a href="/item/news/{i}">'
+        f'뉴스 제목 {i} 관련 기사 요약 텍스트</a></td></tr></table>'
+        f'<script type="text/javascript">var data{i} = {{"k": {i}, "v": "{"x" * 40}"}};</script></div>'
+        for i in range(filler_blocks))
+    return (
+        '<!DOCTYPE html><html lang="ko"><head><meta charset="euc-kr"><title>삼성전자 : 네이버 금융</title>'
+        '<link rel="stylesheet" href="/css/finance.css"></head><body>'
+        f'<div id="header"><ul class="gnb">{menu}</ul></div>'
+        '<div id="middle" class="new_totalinfo">'
+        '<div class="wrap_company"><h2><a href="#" onclick="return false;">삼성전자</a></h2>'
+        '<div class="description"><span class="code">005930</span><img class="kospi" alt="코스피"></div></div>'
+        '<div class="rate_info"><div class="today"><p class="no_today"><em class="no_up">'
+        '<span class="blind">160,500</span><span class="no1">1</span><span class="shim">,</span></em></p></div>'
+        '<dl class="blind"><dt>종목 시세 정보</dt><dd>2026년 01월 30일 16시 10분 기준 장마감</dd>'
+        '<dd>종목명 삼성전자</dd><dd>종목코드 005930 코스피</dd><dd>현재가 160,500 전일대비 보합 0 플러스 0.00 퍼센트</dd>'
+        '<dd>전일가 160,500</dd><dd>시가 160,100</dd><dd>고가 166,500</dd><dd>상한가 208,500</dd>'
+        '<dd>저가 160,100</dd><dd>하한가 112,400</dd><dd>거래량 39,013,626</dd><dd>거래대금 6,357,071백만</dd></dl>'
+        '</div></div>'
+        f'<div id="content">{filler}</div></body></html>'
+    )
+
+
+def measure(parser, page, repeat):
+    """파서 하나의 1건당 CPU 시간(ms), 최대 메모리(KB), 할당 블록 수를 측정합니다."""
+    function = PARSERS[parser]
+    function(page)  # 첫 호출의 import/캐시 비용 제외
+
+    start = time.process_time()
+    for _ in range(repeat):
+        result = function(page)
+    cpu_ms = (time.process_time() - start) * 1000 / repeat
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    function(page)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+    return {'cpu_ms': cpu_ms, 'peak_kb': peak / 1024, 'blocks': blocks, 'result': result}
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        path = pop_option(args, '--file')
+        encoding = pop_option(args, '--encoding', 'euc-kr')
+        repeat = pop_option(args, '--repeat', 200, int)
+        as_json = pop_flag(args, '--json')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args:
+        print(__doc__)
+        sys.exit(1)
+
+    if path:
+        with open(path, 'rb') as f:
+            page = f.read().decode(encoding, errors='replace')
+    else:
+        page = synthetic_page()
+
+    parsers = ['soup'] + (['lxml'] if lxml_etree is not None else [])
+    reports = {parser: measure(parser, page, repeat) for parser in parsers}
+    same = len({json.dumps(r['result'], sort_keys=True, ensure_ascii=False) for r in reports.values()}) == 1
+
+    if as_json:
+        print(json.dumps({'page_bytes': len(page.encode('utf-8')), 'same_result': same, 'parsers': reports},
+                         ensure_ascii=False, indent=2))
+        return
+
+    print(f"페이지 크기: {len(page.encode('utf-8')) / 1024:.0f}KB, 반복 {repeat}회")
+    for parser, report in reports.items():
+        print(f"  {parser:<5} CPU {report['cpu_ms']:7.2f}ms/건  최대 메모리 {report['peak_kb']:8.0f}KB  "
+              f"할당 블록 {report['blocks']:>7,}")
+    if 'lxml' in reports:
+        print(f"  lxml 속도 향상: {reports['soup']['cpu_ms'] / reports['lxml']['cpu_ms']:.1f}배")
+    print(f"  추출 결과 일치: {'예' if same else '아니오'} {reports['soup']['result']}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+국내/미국 배치 갱신 벤치마크 (로컬 재생 서버 사용)
+
+합성 fixture(또는 --record로 녹화한 fixture)를 replay.ReplayServer로 제공하고,
+두 fetcher를 --base-url로 연결해 네트워크 없이 같은 조건에서 반복 측정합니다.
+단계별(과거 일봉 조회 / 현재가 조회 / 저장) p50/p99와 초당 처리 종목 수를 출력합니다.
+
+사용법:
+    python benchmarks/bench_refresh.py [--market kr|us|all] [--tickers 50] [--workers 8]
+                                       [--latency 0.05] [--jitter 0.02] [--error-rate 0]
+                                       [--rate-limit N] [--client-rate N] [--fixtures DIR] [--json]
+
+--rate-limit는 재생 서버의 초당 허용 요청 수(초과 시 429), --client-rate는 fetcher 쪽
+전송 계층(transport.Transport)의 초당 요청 수 제한입니다.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli_options import pop_flag, pop_option  # noqa: E402
+from replay import FixtureStore, ReplayServer  # noqa: E402
+from stock_fetcher import NaverStockFetcher, run_batch  # noqa: E402
+from stock_fetcher_us import YahooStockFetcher  # noqa: E402
+from trading_calendar import KRX, NYSE, TradingCalendar  # noqa: E402
+from transport import Transport  # noqa: E402
+
+# 합성 fixture의 마지막 거래일 (금요일, 양 시장 모두 거래일) - 측정 시각은 이날 장중으로 고정
+LAST_SESSION = datetime(2026, 10, 16).date()
+MARKET_HOURS_NOW = dtime(14, 0)
+# 합성 fixture에 넣을 일봉 수
+FIXTURE_SESSIONS = 60
+
+
+class FixedClockCalendar(TradingCalendar):
+    """현재 시각을 고정한 거래일 달력 (측정할 때마다 같은 경로를 타도록)"""
+
+    def __init__(self, base, fixed_now):
+        super().__init__(base.name, str(base.tz), base.open_time, base.close_time, base.holidays)
+        self.fixed_now = fixed_now.replace(tzinfo=self.tz)
+
+    def now(self, now=None):
+        return super().now(now or self.fixed_now)
+
+
+def _sessions(calendar, count):
+    """LAST_SESSION까지의 최근 거래일 count개 (오래된 날짜부터)"""
+    days = [LAST_SESSION]
+    while len(days) < count:
+        days.append(calendar.previous_session(days[-1]))
+    return list(reversed(days))
+
+
+def kr_codes(count):
+    return [f"{900000 + i:06d}" for i in range(count)]
+
+
+def us_tickers(count):
+    return [f"T{i:03d}" for i in range(count)]
+
+
+def write_synthetic_fixtures(root_dir, codes, tickers):
+    """fchart XML / 네이버 현재가 HTML / Yahoo chart JSON 형태의 합성 fixture를 만듭니다."""
+    store = FixtureStore(root_dir)
+    kr_days = _sessions(KRX, FIXTURE_SESSIONS)
+    us_days = _sessions(NYSE, FIXTURE_SESSIONS)
+
+    for n, code in enumerate(codes):
+        name = f"벤치종목{n}"
+        items = []
+        for i, day in enumerate(reversed(kr_days)):
+            close = 50000 + n * 100 + i * 10
+            items.append(f'<item data="{day:%Y%m%d}|{close - 50}|{close + 100}|{close - 100}|{close}|{100000 + i}" />')
+        xml = (f'<?xml version="1.0" encoding="EUC-KR" ?>\n<protocol>\n'
+               f'<chartdata symbol="{code}" name="{name}" count="{len(items)}" timeframe="day">\n'
+               + '\n'.join(items) + '\n</chartdata>\n</protocol>\n')
+        store.add("/sise.nhn", {'symbol': code, 'timeframe': 'day', 'count': str(FIXTURE_SESSIONS),
+                                'requestType': '0'},
+                  200, 'text/xml;charset=EUC-KR', xml.encode('euc-kr'))
+
+        close = 50000 + n * 100
+        html = (f'<html><head><meta charset="euc-kr"></head><body>'
+                f'<div class="wrap_company"><h2><a href="#">{name}</a></h2></div>'
+                f'<p class="no_today"><span class="blind">{close:,}</span></p>'
+                f'<div class="new_totalinfo"><dl>'
+                f'<dd>시가 {close - 50:,}</dd><dd>고가 {close + 100:,}</dd>'
+                f'<dd>저가 {close - 100:,}</dd><dd>거래량 {123456:,}</dd>'
+                f'</dl></div></body></html>')
+        store.add("/item/main.nhn", {'code': code}, 200, 'text/html;charset=EUC-KR', html.encode('euc-kr'))
+
+    for n, ticker in enumerate(tickers):
+        timestamps = [int(datetime.combine(day, dtime(9, 30), NYSE.tz).timestamp()) for day in us_days]
+        closes = [100.0 + n + i * 0.25 for i in range(len(us_days))]
+        chart = {'chart': {'result': [{
+            'meta': {'symbol': ticker, 'shortName': f"Bench {ticker}", 'currency': 'USD'},
+            'timestamp': timestamps,
+            'indicators': {'quote': [{
+                'open': [c - 0.5 for c in closes],
+                'high': [c + 1.0 for c in closes],
+                'low': [c - 1.0 for c in closes],
+                'close': closes,
+                'volume': [1000000 + i for i in range(len(closes))],
+            }]},
+        }], 'error': None}}
+        store.add(f"/v8/finance/chart/{ticker}", {'range': '3mo', 'interval': '1d', 'includePrePost': 'false'},
+                  200, 'application/json', json.dumps(chart).encode('utf-8'))
+
+
+def fixture_symbols(root_dir):
+    """녹화된 fixture에 들어 있는 국내 종목코드와 미국 티커 목록"""
+    codes, tickers = set(), set()
+    for entry in FixtureStore(root_dir).entries:
+        if entry['path'].endswith('/item/main.nhn') and 'code' in entry['query']:
+            codes.add(entry['query']['code'])
+        elif '/v8/finance/chart/' in entry['path']:
+            tickers.add(entry['path'].rsplit('/', 1)[-1])
+    return sorted(codes), sorted(tickers)
+
+
+class StageTimer:
+    """fetcher 메서드를 감싸 단계별 소요 시간을 모읍니다 (스레드 안전)."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, obj, method_name, stage):
+        original = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        setattr(obj, method_name, timed)
+
+    def summary(self):
+        return {stage: {'count': len(values),
+                        'p50_ms': percentile(values, 50) * 1000,
+                        'p99_ms': percentile(values, 99) * 1000}
+                for stage, values in self.samples.items()}
+
+
+def percentile(values, pct):
+    """nearest-rank 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def bench_kr(base_url, codes, workers, transport):
+    with tempfile.TemporaryDirectory() as data_dir:
+        fetcher = NaverStockFetcher(max_workers=workers, base_url=base_url, data_dir=data_dir, transport=transport)
+        fetcher.calendar = FixedClockCalendar(KRX, datetime.combine(LAST_SESSION, MARKET_HOURS_NOW))
+        timer = StageTimer()
+        timer.wrap(fetcher, 'fetch_historical_data', 'history')
+        timer.wrap(fetcher, 'fetch_stock_info', 'quote')
+        timer.wrap(fetcher, 'save', 'save')
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_batch(fetcher, codes)
+        elapsed = time.perf_counter() - start
+    ok = sum(1 for success in results.values() if success)
+    return {'tickers': len(codes), 'ok': ok, 'seconds': elapsed,
+            'tickers_per_sec': len(codes) / elapsed if elapsed else 0.0, 'stages': timer.summary()}
+
+
+def bench_us(base_url, tickers, workers, transport):
+    with tempfile.TemporaryDirectory() as data_dir:
+        fetcher = YahooStockFetcher(max_workers=workers, base_url=base_url, data_dir=data_dir, transport=transport)
+        fetcher.calendar = FixedClockCalendar(NYSE, datetime.combine(LAST_SESSION, MARKET_HOURS_NOW))
+        timer = StageTimer()
+        timer.wrap(fetcher, '_fetch_chart', 'chart')
+        timer.wrap(fetcher, 'save_stock_data', 'save')
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, _ = fetcher.refresh_watchlist(tickers)
+        elapsed = time.perf_counter() - start
+    return {'tickers': len(tickers), 'ok': len(results), 'seconds': elapsed,
+            'tickers_per_sec': len(tickers) / elapsed if elapsed else 0.0, 'stages': timer.summary()}
+
+
+def print_report(market, report, server_stats):
+    print(f"[{market}] {report['ok']}/{report['tickers']} 종목, {report['seconds']:.2f}초, "
+          f"{report['tickers_per_sec']:.1f} 종목/초")
+    for stage, stats in report['stages'].items():
+        print(f"  {stage:<8} n={stats['count']:<5} p50={stats['p50_ms']:8.2f}ms  p99={stats['p99_ms']:8.2f}ms")
+    print(f"  서버: {server_stats}")
+    print(f"  전송 계층: {report['transport']}")
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        market = pop_option(args, '--market', 'all')
+        count = pop_option(args, '--tickers', 50, int)
+        workers = pop_option(args, '--workers', 8, int)
+        latency = pop_option(args, '--latency', 0.05, float)
+        jitter = pop_option(args, '--jitter', 0.02, float)
+        error_rate = pop_option(args, '--error-rate', 0.0, float)
+        rate_limit = pop_option(args, '--rate-limit', None, int)
+        client_rate = pop_option(args, '--client-rate', None, float)
+        fixture_dir = pop_option(args, '--fixtures')
+        as_json = pop_flag(args, '--json')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args or market not in ('kr', 'us', 'all'):
+        print(__doc__)
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if fixture_dir is None:
+            codes, tickers = kr_codes(count), us_tickers(count)
+            fixture_dir = tmp_dir
+            write_synthetic_fixtures(fixture_dir, codes, tickers)
+        else:
+            codes, tickers = fixture_symbols(fixture_dir)
+
+        reports = {}
+        for name, bench, symbols in (('kr', bench_kr, codes), ('us', bench_us, tickers)):
+            if market not in (name, 'all'):
+                continue
+            with ReplayServer(fixture_dir, latency=latency, jitter=jitter, error_rate=error_rate,
+                              rate_limit=rate_limit, seed=0) as server:
+                transport = Transport(pool_size=workers, rate=client_rate)
+                report = bench(server.url, symbols, workers, transport)
+                report['server'] = dict(server.stats)
+                report['transport'] = dict(transport.stats, wait_seconds=round(transport.stats['wait_seconds'], 3))
+            reports[name] = report
+            if not as_json:
+                print_report(name, report, report['server'])
+
+    if as_json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+진입점별 시작 시간 벤치마크 (python -X importtime)
+
+워크플로는 종목마다 인터프리터를 새로 띄우므로 짧은 실행에서는 import 시간이 대부분을
+차지합니다. 각 진입점을 새 프로세스에서 -X importtime으로 실행해 인터프리터 기본 import(site)를
+뺀 import 누적 시간과 프로세스 전체 실행 시간(중앙값)을 측정하고, 누적 시간이 큰 모듈을 보여줍니다.
+
+측정 대상:
+    - 스크립트 모듈 import (import stock_fetcher 등): 다른 스크립트가 import할 때의 비용
+    - 빠른 경로 (stock_fetcher.py --version 등): 거의 아무것도 import하지 않아야 함
+
+사용법:
+    python benchmarks/bench_startup.py [--entries stock_fetcher,--version] [--repeat 5] [--top 5]
+                                       [--budget MS] [--json]
+
+--entries는 아래 ENTRY_POINTS 이름(쉼표 구분), --budget을 지정하면 import 누적 시간이
+이 값(ms)을 넘는 진입점이 있을 때 종료 코드 1로 끝납니다 (CI에서 시작 시간 회귀 확인).
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli_options import pop_flag, pop_option  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 이름 → 인터프리터 인자 (BASE_DIR에서 실행)
+ENTRY_POINTS = {
+    'stock_fetcher --version': ['stock_fetcher.py', '--version'],
+    'stock_fetcher --help': ['stock_fetcher.py', '--help'],
+    'stock_fetcher_us --version': ['stock_fetcher_us.py', '--version'],
+    'import stock_fetcher': ['-c', 'import stock_fetcher'],
+    'import stock_fetcher_us': ['-c', 'import stock_fetcher_us'],
+    'import screener': ['-c', 'import screener'],
+    'import backtest': ['-c', 'import backtest'],
+    'import sweep': ['-c', 'import sweep'],
+    'import intraday': ['-c', 'import intraday'],
+    'import sqlite_store': ['-c', 'import sqlite_store'],
+    'import columnar_archive': ['-c', 'import columnar_archive'],
+}
+
+
+def parse_importtime(stderr):
+    """
+    -X importtime 출력에서 site 이후(스크립트가 일으킨) import를 읽습니다.
+
+    Returns:
+        list: (모듈명, 깊이, 자체 시간 us, 누적 시간 us) - 출력 순서 (자식이 부모보다 먼저)
+    """
+    entries = []
+    after_site = False
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 헤더 줄
+        field = parts[2]
+        name = field.lstrip()
+        depth = (len(field) - len(name) - 1) // 2
+        if not after_site:
+            after_site = depth == 0 and name == 'site'
+            continue
+        entries.append((name, depth, int(parts[0]), int(parts[1])))
+    return entries
+
+
+def measure(argv, repeat):
+    """진입점 하나를 repeat번 실행해 import 누적 시간과 실행 시간을 측정합니다."""
+    command = [sys.executable, '-X', 'importtime'] + argv
+    import_us = []
+    wall_ms = []
+    entries = []
+    subprocess.run(command, cwd=BASE_DIR, capture_output=True)  # .pyc 생성 등 첫 실행 비용 제외
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=BASE_DIR, capture_output=True, text=True)
+        wall_ms.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} 실행 실패: {result.stderr.strip().splitlines()[-1:]}")
+        entries = parse_importtime(result.stderr)
+        import_us.append(sum(cumulative for _, depth, _, cumulative in entries if depth == 0))
+
+    # 마지막 실행 기준 누적 시간이 큰 모듈 (진입점 자신 제외, 깊이 1까지)
+    heaviest = sorted(((name, cumulative) for name, depth, _, cumulative in entries
+                       if depth <= 1 and name not in argv[-1].split()),
+                      key=lambda item: item[1], reverse=True)
+    return {
+        'import_ms': statistics.median(import_us) / 1000,
+        'wall_ms': statistics.median(wall_ms),
+        'modules': len(entries),
+        'heaviest': [(name, cumulative / 1000) for name, cumulative in heaviest],
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        names = pop_option(args, '--entries')
+        repeat = pop_option(args, '--repeat', 5, int)
+        top = pop_option(args, '--top', 5, int)
+        budget = pop_option(args, '--budget', None, float)
+        as_json = pop_flag(args, '--json')
+        if repeat < 1:
+            raise ValueError("--repeat는 1 이상이어야 합니다")
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args:
+        print(__doc__)
+        sys.exit(1)
+
+    if names:
+        selected = [name.strip() for name in names.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in ENTRY_POINTS]
+        if unknown:
+            print(f"알 수 없는 진입점: {', '.join(unknown)} (가능: {', '.join(ENTRY_POINTS)})")
+            sys.exit(1)
+    else:
+        selected = list(ENTRY_POINTS)
+
+    baseline = measure(['-c', 'pass'], repeat)
+    reports = {}
+    for name in selected:
+        report = measure(ENTRY_POINTS[name], repeat)
+        report['heaviest'] = report['heaviest'][:top]
+        reports[name] = report
+
+    over = [name for name, report in reports.items() if budget is not None and report['import_ms'] > budget]
+
+    if as_json:
+        print(json.dumps({'interpreter_ms': baseline['wall_ms'], 'budget_ms': budget, 'over_budget': over,
+                          'entries': reports}, ensure_ascii=False, indent=2))
+    else:
+        print(f"인터프리터 기본 실행: {baseline['wall_ms']:.0f}ms (python -c pass, 반복 {repeat}회 중앙값)")
+        for name, report in reports.items():
+            mark = "  ← 예산 초과" if name in over else ""
+            print(f"\n{name}: import {report['import_ms']:6.1f}ms ({report['modules']}개 모듈), "
+                  f"실행 {report['wall_ms']:6.0f}ms{mark}")
+            for module, cumulative in report['heaviest']:
+                print(f"    {module:<28} {cumulative:7.1f}ms")
+        if budget is not None:
+            print(f"\n예산 {budget:g}ms 초과: {', '.join(over) if over else '없음'}")
+
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+실행 한 번에 바뀐 일봉과 신호 변화만 모은 변경 피드 (JSONL)
+
+fetcher가 종목 파일을 저장할 때 기존 시계열과 병합 결과를 비교해, 새로 생긴 일봉(new),
+값이 바뀐 일봉(modified), 마지막 날 신호가 켜지거나 꺼진 경우(signal)를 한 줄씩 기록합니다.
+이동평균은 일봉에서 다시 계산할 수 있으므로 싣지 않습니다. 실행이 끝나면 종목/날짜순으로
+정렬해 파일 하나로 씁니다 (이전 실행의 피드를 대체, 내용이 같으면 쓰지 않음).
+기본 경로(data/<market>/changes.jsonl)는 실행마다 바뀌므로 git에서 제외합니다.
+
+    {"market":"kr","code":"005930","name":"삼성전자","date":"2026-10-16","change":"new",
+     "open":160100,"high":166500,"low":160100,"close":160500,"volume":39013626}
+    {"market":"kr","code":"005930","name":"삼성전자","date":"2026-10-16","change":"signal","event":"aligned"}
+"""
+
+import json
+import threading
+
+from atomic_file import write_if_changed
+
+# 일봉 비교/기록 필드
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# 같은 종목/날짜 안에서 기록 순서
+_CHANGE_ORDER = {'new': 0, 'modified': 1, 'signal': 2}
+
+
+def _signals(bars):
+    """최신 날짜가 위인 StockBar 리스트의 마지막 날 신호 (계산할 수 없으면 None)"""
+    bars = [bar for bar in reversed(bars) if bar.close is not None and bar.volume is not None]
+    if not bars:
+        return None
+    # numpy를 쓰는 strategy는 실제로 바뀐 종목이 있을 때만 import
+    from strategy import latest_signals
+    return latest_signals([bar.close for bar in bars], [bar.volume for bar in bars])
+
+
+class ChangeFeed:
+    def __init__(self, path, market):
+        """
+        Args:
+            path (str): 피드 파일 경로 (close()에서 씀)
+            market (str): 'kr' 또는 'us'
+        """
+        self.path = path
+        self.market = market
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def record(self, code, old_bars, new_bars):
+        """
+        저장 전후 시계열을 비교해 바뀐 일봉과 신호 변화를 기록합니다.
+
+        Args:
+            code (str): 종목코드/티커
+            old_bars: 기존에 저장되어 있던 StockBar 리스트 (최신 날짜가 위)
+            new_bars: 새로 저장할 StockBar 리스트 (최신 날짜가 위)
+
+        Returns:
+            int: 기록한 줄 수 (0이면 바뀐 것이 없음)
+        """
+        old_by_date = {bar.date: bar for bar in old_bars}
+        entries = []
+        for bar in new_bars:
+            old = old_by_date.get(bar.date)
+            values = {field: getattr(bar, field) for field in BAR_FIELDS}
+            if old is None:
+                change = 'new'
+            elif any(getattr(old, field) != value for field, value in values.items()):
+                change = 'modified'
+            else:
+                continue
+            entries.append(dict({'market': self.market, 'code': code, 'name': bar.name, 'date': bar.date,
+                                 'change': change}, **values))
+
+        if entries:
+            before, after = _signals(old_bars), _signals(new_bars)
+            if after is not None:
+                for name, value in after.items():
+                    if value != (before or {}).get(name, False):
+                        entries.append({'market': self.market, 'code': code, 'name': new_bars[0].name,
+                                        'date': new_bars[0].date, 'change': 'signal',
+                                        'event': name if value else f"{name}_cleared"})
+
+        with self._lock:
+            self.entries.extend(entries)
+        return len(entries)
+
+    def close(self):
+        """
+        모은 변경을 종목/날짜순으로 피드 파일에 씁니다.
+
+        Returns:
+            int: 기록한 줄 수
+        """
+        with self._lock:
+            entries = sorted(self.entries, key=lambda e: (e['code'], e['date'], _CHANGE_ORDER[e['change']]))
+        lines = [json.dumps(entry, ensure_ascii=False, separators=(',', ':')) for entry in entries]
+        write_if_changed(self.path, ''.join(line + '\n' for line in lines))
+        return len(lines)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+stock_fetcher.py / stock_fetcher_us.py 공통 명령행 옵션 처리 도우미
+
+두 스크립트는 위치 인자(종목코드, --date 등)를 직접 해석하므로, 위치와 무관한
+옵션(--workers N 등)은 먼저 이 함수들로 꺼내서 인자 리스트에서 제거합니다.
+
+두 스크립트가 --version/--help를 가장 먼저 처리하므로 이 모듈은 표준 라이브러리도
+import하지 않습니다.
+"""
+
+# stock_fetcher.py / stock_fetcher_us.py --version 출력
+VERSION = "1.0.0"
+
+
+def pop_option(args, name, default=None, convert=str):
+    """
+    args에서 "name 값" 쌍을 꺼내 변환한 값을 반환합니다 (args는 제자리 수정).
+
+    Raises:
+        ValueError: 값이 없거나 변환에 실패한 경우
+    """
+    if name not in args:
+        return default
+    idx = args.index(name)
+    if idx + 1 >= len(args):
+        raise ValueError(f"{name} 옵션에 값이 필요합니다")
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"{name} 옵션 값이 올바르지 않습니다: {value}")
+
+
+def pop_flag(args, name):
+    """args에 name 플래그가 있으면 제거하고 True를 반환합니다."""
+    if name not in args:
+        return False
+    args.remove(name)
+    return True
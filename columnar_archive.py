@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+시장별 다년 일봉 컬럼 아카이브 (mmap)
+
+data/<market>/archive/ 아래에 필드마다 고정 폭 배열 파일 하나와 작은 색인을 둡니다.
+
+- date.col: int32 (YYYYMMDD)
+- open.col, high.col, low.col, close.col, volume.col, ma<N>.col: float64 (값이 없으면 NaN)
+- index.json: 시장, MA 윈도우, 사용한 행 수, {종목코드: [종목명, 시작 행, 일봉 수, 예약 행 수]}
+
+종목마다 연속된 행 구간을 예약해 두므로 읽기는 색인에서 구간을 찾아 mmap 배열을 잘라내기만 하고
+(다른 종목은 읽거나 파싱하지 않음, 복사 없음), append()는 새 거래일을 예약된 빈 행에 제자리로 덧붙입니다.
+예약 구간이 가득 차면 그 종목만 파일 끝으로 옮기며, 비게 된 구간은 compact로 회수합니다.
+데이터를 먼저 쓰고 색인을 마지막에 교체하므로 쓰는 도중 읽어도 이전 상태가 보입니다.
+
+fetcher는 아카이브를 갱신하지 않습니다. 새 일봉은 import를 다시 실행해 반영하며, 이미 있는 종목은
+같은 날짜를 제자리에서 덮어쓰고 새 날짜만 덧붙이므로 전체를 다시 쓰지 않습니다. 그 전까지
+market_data.load_series가 아카이브 뒤의 최근 일봉을 JSON 파일(최근 20일)과 장기 이력에서 합쳐 읽으므로,
+아카이브를 마지막으로 가져온 뒤 20거래일이 지나기 전에 (장기 이력을 쓰지 않으면) 다시 import해야 합니다.
+
+사용법:
+    python columnar_archive.py import [--market kr|us|all] [--no-history]   # JSON/CSV/장기 이력 → 아카이브 (갱신도 같음)
+    python columnar_archive.py export [--market kr|us|all] [--out DIR] [--days 20]   # 아카이브 → JSON/CSV
+    python columnar_archive.py compact [--market kr|us|all]
+    python columnar_archive.py info [--market kr|us|all]
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from atomic_file import atomic_write
+from cli_options import pop_flag, pop_option
+from indicators import DEFAULT_MA_WINDOWS, moving_averages
+from stock_record import StockBar, write_export
+
+ARCHIVE_VERSION = 1
+INDEX_FILE = "index.json"
+COLUMN_SUFFIX = ".col"
+
+# 종목마다 일봉 수 외에 더 예약해 둘 행 수 (약 1년치 거래일)
+HEADROOM = 256
+# 파일을 늘릴 때 최소 단위 (행)
+GROW_ROWS = 4096
+
+# 가격/거래량 필드 (MA 필드는 색인의 윈도우에 따라 ma5, ma10, ...)
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# open_if_exists가 연 읽기 전용 아카이브 {폴더: (색인 수정 시각, 아카이브)}
+_opened = {}
+
+
+def _date_to_int(day):
+    return int(day[:4]) * 10000 + int(day[5:7]) * 100 + int(day[8:10])
+
+
+def _dates_to_str(values):
+    """YYYYMMDD 정수 배열을 'YYYY-MM-DD' 문자열 리스트로 변환합니다 (numpy datetime64로 한 번에)."""
+    values = np.asarray(values, dtype=np.int64)
+    months = (values // 10000 - 1970) * 12 + values // 100 % 100 - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]') + (values % 100 - 1)
+    return days.astype(str).tolist()
+
+
+def _to_list(values, integer=False):
+    """배열을 리스트로 변환합니다 (NaN은 None, integer면 정수)."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.astype(np.int64).tolist() if integer else values.tolist()
+    result = (np.where(missing, 0, values).astype(np.int64) if integer else values).tolist()
+    for i in np.flatnonzero(missing).tolist():
+        result[i] = None
+    return result
+
+
+def archive_dir(data_dir):
+    """데이터 폴더(data/<market>)의 아카이브 폴더"""
+    return os.path.join(data_dir, "archive")
+
+
+class ColumnarArchive:
+    def __init__(self, root_dir, market=None, ma_windows=DEFAULT_MA_WINDOWS, writable=False):
+        """
+        Args:
+            root_dir (str): 아카이브 폴더 (예: data/kr/archive)
+            market (str): 새 아카이브의 시장 ('kr'이면 가격을 정수로 읽음, 기존 아카이브는 색인의 값)
+            ma_windows: 새 아카이브의 MA 윈도우 (기존 아카이브는 색인의 값을 사용)
+            writable (bool): 쓰기 모드 (없으면 폴더 생성)
+        """
+        self.root_dir = root_dir
+        self.writable = writable
+        index_path = os.path.join(root_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+            if self.index.get('version') != ARCHIVE_VERSION:
+                raise ValueError(f"지원하지 않는 아카이브 버전입니다: {self.index.get('version')}")
+        elif writable:
+            os.makedirs(root_dir, exist_ok=True)
+            self.index = {'version': ARCHIVE_VERSION, 'market': market, 'ma_windows': list(ma_windows),
+                          'rows': 0, 'tickers': {}}
+        else:
+            raise FileNotFoundError(f"아카이브가 없습니다: {root_dir}")
+
+        self.market = self.index['market']
+        self.ma_windows = tuple(self.index['ma_windows'])
+        self.ma_fields = tuple(f"ma{window}" for window in self.ma_windows)
+        self.dtypes = {'date': np.dtype('<i4')}
+        self.dtypes.update((field, np.dtype('<f8')) for field in PRICE_FIELDS + self.ma_fields)
+        self._maps = {}
+
+    @classmethod
+    def open_if_exists(cls, root_dir):
+        """
+        아카이브가 있으면 읽기 모드로 열고, 없으면 None.
+
+        같은 폴더는 색인이 바뀌지 않았으면 이전에 연 객체를 재사용합니다 (종목마다 색인을 다시 읽지 않음).
+        """
+        try:
+            mtime = os.stat(os.path.join(root_dir, INDEX_FILE)).st_mtime_ns
+        except OSError:
+            return None
+        cached = _opened.get(root_dir)
+        if cached is None or cached[0] != mtime:
+            cached = _opened[root_dir] = (mtime, cls(root_dir))
+        return cached[1]
+
+    # ----- 저수준: mmap 배열 -----
+
+    def _path(self, field):
+        return os.path.join(self.root_dir, field + COLUMN_SUFFIX)
+
+    def _capacity(self):
+        """파일에 할당된 행 수 (모든 필드가 같음)"""
+        path = self._path('date')
+        return os.path.getsize(path) // self.dtypes['date'].itemsize if os.path.exists(path) else 0
+
+    def _column(self, field):
+        """필드 하나의 mmap 배열 (파일 전체, 처음 접근할 때 매핑)"""
+        if field not in self._maps:
+            rows = self._capacity()
+            if rows == 0:
+                return np.empty(0, dtype=self.dtypes[field])
+            self._maps[field] = np.memmap(self._path(field), dtype=self.dtypes[field],
+                                          mode='r+' if self.writable else 'r', shape=(rows,))
+        return self._maps[field]
+
+    def _grow(self, rows):
+        """파일을 최소 rows행이 되도록 늘립니다 (기존 내용은 그대로, 새 행은 0)."""
+        capacity = self._capacity()
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, GROW_ROWS)
+        self._release()
+        for field, dtype in self.dtypes.items():
+            with open(self._path(field), 'ab') as f:
+                f.truncate(new_capacity * dtype.itemsize)
+
+    def _release(self):
+        for array in self._maps.values():
+            if self.writable:
+                array.flush()
+        self._maps = {}
+
+    def _write_index(self):
+        with atomic_write(os.path.join(self.root_dir, INDEX_FILE)) as f:
+            json.dump(self.index, f, ensure_ascii=False, separators=(',', ':'))
+
+    def flush(self):
+        """mmap 변경 내용을 디스크에 쓰고 색인을 교체합니다."""
+        for array in self._maps.values():
+            array.flush()
+        self._write_index()
+
+    def close(self):
+        if self.writable:
+            self.flush()
+        self._maps = {}
+
+    # ----- 읽기 -----
+
+    def codes(self):
+        return sorted(self.index['tickers'])
+
+    def name(self, code):
+        entry = self.index['tickers'].get(code)
+        return entry[0] if entry else None
+
+    def columns(self, code, start=None, end=None):
+        """
+        종목 하나의 구간을 필드별 배열로 반환합니다. 배열은 mmap의 뷰이므로 복사하지 않습니다.
+
+        Args:
+            code (str): 종목코드/티커
+            start (str): 시작 날짜 (포함, YYYY-MM-DD), None이면 처음부터
+            end (str): 종료 날짜 (포함), None이면 끝까지
+
+        Returns:
+            dict: {필드: 배열} (date는 YYYYMMDD 정수), 종목이 없으면 None
+        """
+        entry = self.index['tickers'].get(code)
+        if entry is None:
+            return None
+        _, offset, length, _ = entry
+        dates = self._column('date')[offset:offset + length]
+        lo = int(np.searchsorted(dates, _date_to_int(start), 'left')) if start else 0
+        hi = int(np.searchsorted(dates, _date_to_int(end), 'right')) if end else length
+        return {field: self._column(field)[offset + lo:offset + hi] for field in self.dtypes}
+
+    def bars(self, code, start=None, end=None):
+        """
+        종목 하나의 구간을 StockBar 리스트로 반환합니다 (오래된 날짜부터, MA 포함).
+        """
+        columns = self.columns(code, start, end)
+        if columns is None:
+            return []
+        name = self.name(code)
+        days = _dates_to_str(columns['date'])
+
+        # 국내 가격은 정수 (JSON/CSV와 같은 표현)
+        integer = self.market == 'kr'
+        prices = [_to_list(columns[field], integer) for field in ('open', 'high', 'low', 'close')]
+        volumes = _to_list(columns['volume'], integer=True)
+        windows = self.ma_windows
+        ma_rows = zip(*(_to_list(columns[field]) for field in self.ma_fields)) if windows else ({} for _ in days)
+        return [StockBar(code, name, day, open_price, high, low, close, volume, dict(zip(windows, ma)))
+                for day, open_price, high, low, close, volume, ma in zip(days, *prices, volumes, ma_rows)]
+
+    # ----- 쓰기 -----
+
+    def _allocate(self, rows):
+        """파일 끝에 rows행을 예약하고 시작 행을 반환합니다."""
+        offset = self.index['rows']
+        self._grow(offset + rows)
+        self.index['rows'] = offset + rows
+        return offset
+
+    def _write_rows(self, offset, bars):
+        """offset부터 bars(오래된 날짜부터)의 날짜/가격/거래량과 bar.ma에 있는 MA를 씁니다."""
+        n = len(bars)
+        self._column('date')[offset:offset + n] = [_date_to_int(bar.date) for bar in bars]
+        # None은 float 변환 시 NaN이 됨
+        values = np.array([(bar.open, bar.high, bar.low, bar.close, bar.volume)
+                           + tuple(bar.ma.get(window) for window in self.ma_windows) for bar in bars],
+                          dtype=np.float64).reshape(n, len(PRICE_FIELDS) + len(self.ma_windows))
+        for k, field in enumerate(PRICE_FIELDS + self.ma_fields):
+            self._column(field)[offset:offset + n] = values[:, k]
+
+    def _update_ma(self, offset, length, first):
+        """
+        종목 구간에서 first번째 행부터 MA를 다시 계산합니다 (앞쪽은 윈도우만큼만 읽음).
+
+        아카이브 안의 일봉이 윈도우보다 적은 행은 원본(bar.ma)에서 받은 값을 그대로 둡니다
+        (최근 20일 파일은 잘리기 전의 더 긴 이력으로 계산한 MA를 담고 있음).
+        """
+        if not self.ma_windows or first >= length:
+            return
+        start = max(0, first - max(self.ma_windows) + 1)
+        closes = self._column('close')[offset + start:offset + length].tolist()
+        for window, values in moving_averages(closes, self.ma_windows).items():
+            computed = np.array(values[first - start:], dtype=np.float64)
+            column = self._column(f"ma{window}")[offset + first:offset + length]
+            column[:] = np.where(np.isnan(computed), column, computed)
+
+    def append(self, code, bars, name=None):
+        """
+        새 일봉을 기록합니다. 마지막 날짜 이후 일봉은 예약된 행에 제자리로 덧붙이고,
+        이미 있는 날짜는 같은 행을 덮어씁니다. 중간 날짜가 새로 들어오면 그 종목 구간만 다시 씁니다.
+
+        Args:
+            code (str): 종목코드/티커
+            bars: StockBar 리스트 (순서 무관, 종가가 없는 일봉은 제외)
+            name (str): 종목명 (None이면 마지막 일봉의 종목명)
+
+        Returns:
+            int: 기록한 일봉 수
+        """
+        if not self.writable:
+            raise ValueError("읽기 모드로 연 아카이브입니다")
+        by_date = {bar.date: bar for bar in bars if bar.close is not None}
+        if not by_date:
+            return 0
+        new = [by_date[day] for day in sorted(by_date)]
+        name = name or new[-1].name
+
+        entry = self.index['tickers'].get(code)
+        if entry is None:
+            offset = self._allocate(len(new) + HEADROOM)
+            self._write_rows(offset, new)
+            self.index['tickers'][code] = [name, offset, len(new), len(new) + HEADROOM]
+            self._update_ma(offset, len(new), 0)
+            return len(new)
+
+        _, offset, length, capacity = entry
+        dates = self._column('date')[offset:offset + length]
+        last = int(dates[-1]) if length else 0
+        keys = np.array([_date_to_int(bar.date) for bar in new], dtype=np.int32)
+        positions = np.searchsorted(dates, keys)
+        if length:
+            existing = dates[np.minimum(positions, length - 1)] == keys
+        else:
+            existing = np.zeros(len(new), dtype=bool)
+        tail = keys > last
+
+        if not np.all(existing | tail):
+            # 중간에 빠진 날짜가 들어옴: 종목 구간 전체를 병합해 다시 씀
+            merged = {bar.date: bar for bar in self.bars(code)}
+            merged.update(by_date)
+            ordered = [merged[day] for day in sorted(merged)]
+            new_capacity = max(capacity, len(ordered) + HEADROOM)
+            if len(ordered) > capacity:
+                offset = self._allocate(new_capacity)
+            self._write_rows(offset, ordered)
+            self.index['tickers'][code] = [name, offset, len(ordered), new_capacity if len(ordered) > capacity
+                                           else capacity]
+            self._update_ma(offset, len(ordered), 0)
+            return len(new)
+
+        # 같은 날짜는 제자리 갱신
+        first_changed = length
+        for bar, position in zip((b for b, hit in zip(new, existing) if hit), positions[existing]):
+            self._write_rows(offset + int(position), [bar])
+            first_changed = min(first_changed, int(position))
+
+        appended = [bar for bar, is_tail in zip(new, tail) if is_tail]
+        if appended:
+            if length + len(appended) > capacity:
+                # 예약 구간이 가득 참: 이 종목만 파일 끝으로 옮김
+                capacity = max(capacity * 2, length + len(appended) + HEADROOM)
+                moved = self._allocate(capacity)
+                for field in self.dtypes:
+                    column = self._column(field)
+                    column[moved:moved + length] = column[offset:offset + length]
+                offset = moved
+            self._write_rows(offset + length, appended)
+            first_changed = min(first_changed, length)
+            length += len(appended)
+
+        self.index['tickers'][code] = [name, offset, length, capacity]
+        self._update_ma(offset, length, first_changed)
+        return len(new)
+
+    def compact(self):
+        """
+        옮겨진 종목이 남긴 빈 구간을 없애고 종목마다 HEADROOM만 남겨 새로 씁니다.
+
+        Returns:
+            tuple: (compaction 전 행 수, 후 행 수)
+        """
+        before = self.index['rows']
+        # 같은 폴더 옆의 숨김 임시 폴더에 새로 씀 (중단되어 남은 이전 임시 폴더는 지우고 시작)
+        parent, name = os.path.split(os.path.abspath(self.root_dir))
+        tmp_dir = os.path.join(parent, f".{name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp = ColumnarArchive(tmp_dir, self.market, self.ma_windows, writable=True)
+        for code in self.codes():
+            tmp.append(code, self.bars(code), self.name(code))
+        tmp.close()
+        self._release()
+        for field in self.dtypes:
+            os.replace(tmp._path(field), self._path(field))
+        os.replace(os.path.join(tmp.root_dir, INDEX_FILE), os.path.join(self.root_dir, INDEX_FILE))
+        os.rmdir(tmp.root_dir)
+        with open(os.path.join(self.root_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        return before, self.index['rows']
+
+
+def import_market(market, data_dir=None, history=True, ma_windows=DEFAULT_MA_WINDOWS):
+    """
+    data/<market>의 JSON/CSV(와 장기 이력)를 아카이브로 가져옵니다.
+
+    Returns:
+        dict: {종목코드: 기록한 일봉 수}
+    """
+    from market_data import MARKETS, list_codes, load_series
+
+    data_dir = data_dir or MARKETS[market][0]
+    archive = ColumnarArchive(archive_dir(data_dir), market, ma_windows, writable=True)
+    try:
+        return {code: archive.append(code, load_series(market, code, data_dir, history, archive=False))
+                for code in list_codes(market, data_dir)}
+    finally:
+        archive.close()
+
+
+def export_market(market, out_dir, data_dir=None, days=None):
+    """
+    아카이브를 fetcher와 같은 형식의 JSON(국내는 CSV도) 파일로 씁니다.
+
+    Returns:
+        dict: {종목코드: 쓴 일봉 수}
+    """
+    from market_data import MARKETS
+
+    archive = ColumnarArchive(archive_dir(data_dir or MARKETS[market][0]))
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    for code in archive.codes():
+        bars = archive.bars(code)[::-1]
+        if bars:
+            written[code] = write_export(market, out_dir, code, bars[:days] if days else bars, archive.ma_windows)
+    return written
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        market = pop_option(args, '--market', 'all')
+        out_dir = pop_option(args, '--out')
+        days = pop_option(args, '--days', None, int)
+        no_history = pop_flag(args, '--no-history')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    command = args.pop(0) if args else None
+    if args or command not in ('import', 'export', 'compact', 'info') or market not in ('kr', 'us', 'all'):
+        print(__doc__)
+        sys.exit(1)
+
+    from market_data import MARKETS
+
+    for name, (data_dir, _) in MARKETS.items():
+        if market not in (name, 'all'):
+            continue
+        root_dir = archive_dir(data_dir)
+        if command == 'import':
+            imported = import_market(name, history=not no_history)
+            print(f"[{name}] {len(imported)}종목, {sum(imported.values())}일봉 → {root_dir}")
+            continue
+
+        if ColumnarArchive.open_if_exists(root_dir) is None:
+            print(f"[{name}] 아카이브가 없습니다 ({root_dir}, 먼저 import 실행)")
+            continue
+        if command == 'export':
+            written = export_market(name, out_dir or data_dir, days=days)
+            print(f"[{name}] {len(written)}종목 파일 생성 → {out_dir or data_dir}")
+        elif command == 'compact':
+            archive = ColumnarArchive(root_dir, writable=True)
+            before, after = archive.compact()
+            print(f"[{name}] {before:,}행 → {after:,}행")
+        else:
+            archive = ColumnarArchive(root_dir)
+            tickers = archive.index['tickers']
+            used = sum(entry[2] for entry in tickers.values())
+            size = sum(os.path.getsize(archive._path(field)) for field in archive.dtypes)
+            print(f"[{name}] {len(tickers)}종목, 일봉 {used:,}개 / 예약 {archive.index['rows']:,}행, "
+                  f"{size / 1024 / 1024:.1f}MB, MA {archive.ma_windows}")
+
+
+if __name__ == "__main__":
+    main()
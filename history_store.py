@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+종목별 장기 이력 저장소 (append-only 로그 + 주기적 compaction)
+
+data/<market>/history/ 아래에 종목마다 두 개의 파일을 둡니다.
+
+- stock_<code>.base.jsonl: 날짜 오름차순으로 정리된 기본 파일
+- stock_<code>.log.jsonl: 새 일봉을 뒤에 덧붙이기만 하는 로그
+
+일일 갱신은 로그에 새 일봉 몇 줄만 추가하므로 I/O가 이력 길이와 무관합니다.
+같은 날짜가 여러 번 기록되면 나중 줄이 우선합니다. 로그가 일정 크기를 넘으면
+compaction이 로그를 기본 파일에 합치고 보존 기간(retention)을 적용합니다.
+"""
+
+import json
+import os
+import re
+from bisect import bisect_left
+from datetime import date, timedelta
+
+from atomic_file import atomic_write, file_lock
+from stock_record import StockBar
+
+# 로그 파일이 이 크기를 넘으면 자동 compaction
+DEFAULT_COMPACT_BYTES = 64 * 1024
+# 기본 파일을 끝에서부터 읽는 단위 (바이트)
+TAIL_BLOCK = 16 * 1024
+
+BASE_SUFFIX = ".base.jsonl"
+LOG_SUFFIX = ".log.jsonl"
+
+
+class Retention:
+    """
+    이력 보존 기간
+
+    None(무제한), N일, N년 중 하나이며 기준일은 저장된 가장 최근 일봉 날짜입니다.
+    """
+
+    def __init__(self, days=None, years=None):
+        self.days = days
+        self.years = years
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        "unlimited", "90d", "5y" 형식의 문자열을 Retention으로 변환합니다.
+
+        Raises:
+            ValueError: 형식이 올바르지 않은 경우
+        """
+        if spec is None:
+            return cls()
+        text = str(spec).strip().lower()
+        if text in ('', 'unlimited', 'all', 'none'):
+            return cls()
+        match = re.fullmatch(r'(\d+)\s*([dy])', text)
+        if not match or int(match.group(1)) < 1:
+            raise ValueError(f"보존 기간 형식이 올바르지 않습니다: {spec} (예: unlimited, 90d, 5y)")
+        count = int(match.group(1))
+        return cls(days=count) if match.group(2) == 'd' else cls(years=count)
+
+    @property
+    def unlimited(self):
+        return self.days is None and self.years is None
+
+    def cutoff(self, latest_date):
+        """
+        보존할 가장 오래된 날짜(YYYY-MM-DD)를 반환합니다. 무제한이면 None.
+
+        Args:
+            latest_date (str): 가장 최근 일봉 날짜 (YYYY-MM-DD)
+        """
+        if self.unlimited:
+            return None
+        latest = date.fromisoformat(latest_date)
+        if self.days is not None:
+            return (latest - timedelta(days=self.days)).isoformat()
+        try:
+            return latest.replace(year=latest.year - self.years).isoformat()
+        except ValueError:
+            # 2월 29일 → 2월 28일
+            return latest.replace(year=latest.year - self.years, day=28).isoformat()
+
+    def __repr__(self):
+        if self.days is not None:
+            return f"Retention({self.days}d)"
+        if self.years is not None:
+            return f"Retention({self.years}y)"
+        return "Retention(unlimited)"
+
+
+def _bar_to_line(bar):
+    """StockBar를 로그 한 줄(JSON 배열)로 변환합니다. MA는 파생값이므로 저장하지 않습니다."""
+    return json.dumps([bar.date, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.name],
+                      ensure_ascii=False, separators=(',', ':'))
+
+
+def _line_to_bar(code, line):
+    """로그 한 줄을 StockBar로 변환합니다."""
+    day, open_price, high, low, close, volume, name = json.loads(line)
+    return StockBar(code, name, day, open=open_price, high=high, low=low, close=close, volume=volume)
+
+
+def _reversed_lines(path, block_size=TAIL_BLOCK):
+    """파일의 줄(bytes)을 끝에서부터 돌려줍니다 (빈 줄 제외, 파일이 없으면 아무것도 없음)."""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        rest = b''
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + rest).split(b'\n')
+            # 첫 조각은 앞 블록과 이어지는 줄일 수 있으므로 다음 블록에 붙임
+            rest = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if rest.strip():
+            yield rest
+
+
+class HistoryStore:
+    def __init__(self, root_dir, retention=None, compact_bytes=DEFAULT_COMPACT_BYTES):
+        """
+        Args:
+            root_dir (str): 이력 파일을 둘 폴더 (예: data/kr/history)
+            retention: Retention 또는 "unlimited"/"90d"/"5y" 문자열
+            compact_bytes (int): 로그 크기가 이 값을 넘으면 append 후 자동 compaction
+        """
+        self.root_dir = root_dir
+        self.retention = retention if isinstance(retention, Retention) else Retention.parse(retention)
+        self.compact_bytes = compact_bytes
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, code, suffix):
+        return os.path.join(self.root_dir, f"stock_{code}{suffix}")
+
+    def codes(self):
+        """저장된 종목코드 목록"""
+        codes = set()
+        for filename in os.listdir(self.root_dir):
+            for suffix in (BASE_SUFFIX, LOG_SUFFIX):
+                if filename.startswith("stock_") and filename.endswith(suffix):
+                    codes.add(filename[len("stock_"):-len(suffix)])
+        return sorted(codes)
+
+    def append(self, code, bars):
+        """
+        새 일봉을 로그 끝에 추가합니다. 같은 날짜는 조회 시 마지막 기록이 우선합니다.
+
+        Args:
+            code (str): 종목코드/티커
+            bars: StockBar 리스트
+
+        Returns:
+            int: 추가한 줄 수
+        """
+        lines = [_bar_to_line(bar) for bar in bars if bar.close is not None]
+        if not lines:
+            return 0
+
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        log_path = self._path(code, LOG_SUFFIX)
+        with open(log_path, 'a+b') as f:
+            # 이전 기록이 중단되어 마지막 줄이 끊겨 있으면 새 줄에서 시작 (끊긴 줄만 읽을 때 버려짐)
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.getsize(log_path) > self.compact_bytes:
+            self.compact(code)
+        return len(lines)
+
+    def _read_lines(self, code, suffix, by_date):
+        path = self._path(code, suffix)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line for line in (raw.strip() for raw in f) if line]
+
+        # 파일 전체를 JSON 배열 하나로 파싱 (줄마다 json.loads를 호출하는 것보다 훨씬 빠름)
+        try:
+            records = json.loads('[' + ','.join(lines) + ']')
+            bars = [StockBar(code, name, day, open=open_price, high=high, low=low, close=close, volume=volume)
+                    for day, open_price, high, low, close, volume, name in records]
+        except (ValueError, TypeError):
+            # 기록 도중 중단된 마지막 줄 등이 있으면 줄 단위로 파싱하며 건너뜀
+            bars = []
+            for line in lines:
+                try:
+                    bars.append(_line_to_bar(code, line))
+                except (ValueError, TypeError):
+                    continue
+        for bar in bars:
+            by_date[bar.date] = bar
+
+    def load(self, code, start=None, end=None):
+        """
+        기본 파일과 로그를 합쳐 일봉 리스트를 반환합니다.
+
+        Args:
+            code (str): 종목코드/티커
+            start (str): 시작 날짜 (포함, YYYY-MM-DD), None이면 처음부터
+            end (str): 종료 날짜 (포함, YYYY-MM-DD), None이면 끝까지
+
+        Returns:
+            list: 오래된 날짜부터 정렬된 StockBar 리스트
+        """
+        by_date = {}
+        self._read_lines(code, BASE_SUFFIX, by_date)
+        self._read_lines(code, LOG_SUFFIX, by_date)
+        bars = [by_date[day] for day in sorted(by_date)]
+        if start:
+            bars = [bar for bar in bars if bar.date >= start]
+        if end:
+            bars = [bar for bar in bars if bar.date <= end]
+        return bars
+
+    def tail(self, code, count, keep=None):
+        """
+        최근 count개 일봉만 읽습니다 (스크리너처럼 최근 구간만 필요한 경우).
+
+        로그는 compaction 기준 크기 이하이므로 전체를 읽고, 날짜 오름차순인 기본 파일은 끝에서부터
+        최근 count개가 모일 때까지만 읽습니다 (이력 길이와 무관).
+
+        Args:
+            code (str): 종목코드/티커
+            count (int): 일봉 수
+            keep: 지정하면 keep(bar)가 참인 일봉만 셈 (예: 거래일만)
+
+        Returns:
+            list: 오래된 날짜부터 정렬된 StockBar 리스트 (최대 count개, load()의 마지막 count개와 같음)
+        """
+        log = {}
+        self._read_lines(code, LOG_SUFFIX, log)
+        by_date = {day: bar for day, bar in log.items() if keep is None or keep(bar)}
+        log_days = sorted(by_date)
+
+        base_count = 0
+        for line in _reversed_lines(self._path(code, BASE_SUFFIX)):
+            try:
+                bar = _line_to_bar(code, line)
+            except (ValueError, TypeError):
+                continue
+            # 같은 날짜는 로그가 우선
+            if bar.date not in log and (keep is None or keep(bar)):
+                by_date[bar.date] = bar
+                base_count += 1
+            # 이 날짜 이후로 count개가 모이면 더 오래된 줄은 결과에 들어가지 않음
+            if base_count + len(log_days) - bisect_left(log_days, bar.date) >= count:
+                break
+        return [by_date[day] for day in sorted(by_date)][-count:]
+
+    def compact(self, code):
+        """
+        로그를 기본 파일에 합치고 보존 기간을 적용한 뒤 로그를 비웁니다.
+
+        Returns:
+            int: compaction 후 보존된 일봉 수
+        """
+        bars = self.load(code)
+        if bars:
+            cutoff = self.retention.cutoff(bars[-1].date)
+            if cutoff:
+                bars = [bar for bar in bars if bar.date >= cutoff]
+
+        # 쓰는 도중 중단되어도 기존 기본 파일은 그대로 (로그는 교체 후에 지움)
+        with atomic_write(self._path(code, BASE_SUFFIX)) as f:
+            for bar in bars:
+                f.write(_bar_to_line(bar) + '\n')
+
+        log_path = self._path(code, LOG_SUFFIX)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        return len(bars)
+
+    def compact_all(self, lock_dir=None):
+        """
+        모든 종목을 compaction 합니다.
+
+        Args:
+            lock_dir (str): 지정하면 종목마다 fetcher와 같은 종목 잠금(<lock_dir>/stock_<code>)을 잡고
+                            compaction (실행 중인 fetcher가 덧붙이는 일봉을 잃지 않도록)
+
+        Returns:
+            dict: {종목코드: 보존된 일봉 수}
+        """
+        results = {}
+        for code in self.codes():
+            if lock_dir is None:
+                results[code] = self.compact(code)
+                continue
+            with file_lock(os.path.join(lock_dir, f"stock_{code}")):
+                results[code] = self.compact(code)
+        return results
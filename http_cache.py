@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+fchart / 네이버 금융 / Yahoo chart 응답을 디스크에 캐시하는 모듈
+
+URL과 요청 파라미터로 키를 만들고, TTL 안에서는 같은 요청을 다시 보내지 않습니다.
+만료 시각은 항목을 저장한 시각 기준입니다. 장중에 저장한 항목은 fetcher가 엔드포인트별로 넘기는
+장중 TTL(실시간 현재가는 짧게, 일봉 차트는 길게)이 지나면 만료되고 늦어도 그날 장 마감에 만료되며,
+장 마감 후에 저장한 항목은 다음 장 시작까지 유지합니다.
+offline 모드에서는 캐시에 있는 응답만 사용합니다.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+# 장중 시세 TTL 기본값 (초) - fetcher는 엔드포인트별 값을 넘김
+INTRADAY_TTL = 60
+# 장 마감 후 TTL 상한 (초) - 다음 장 시작 전이면 이보다 짧아짐
+CLOSED_TTL = 12 * 60 * 60
+# 캐시 전체 크기 상한 / 항목 최대 보관 기간
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+# put 이 횟수마다 한 번씩 정리
+EVICT_EVERY = 100
+
+
+class CacheMiss(IOError):
+    """offline 모드에서 캐시에 응답이 없는 경우 (requests.RequestException처럼 IOError 하위 클래스)"""
+
+
+class CachedResponse:
+    """캐시에서 복원한 응답 (requests.Response에서 fetcher가 쓰는 부분만 제공)"""
+
+    def __init__(self, url, status_code, content, encoding=None, headers=None, from_cache=True, stored_at=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers or {}
+        self.from_cache = from_cache
+        # 원래 응답을 받은 시각 (time.time(), 장 마감 전에 받은 시세인지 판단하는 데 사용)
+        self.stored_at = stored_at
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        view = memoryview(self.content)
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if 400 <= self.status_code:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def cache_key(url, params=None):
+    """URL과 파라미터(정렬)로 캐시 키를 만듭니다."""
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode('utf-8')).hexdigest()
+
+
+def ttl_for(calendar, now=None, intraday_ttl=INTRADAY_TTL):
+    """
+    거래소 장 운영 상태에 맞는 TTL(초)을 반환합니다.
+
+    장중에는 intraday_ttl, 장 마감 후에는 다음 거래일 장 시작까지 (최대 CLOSED_TTL).
+    """
+    if calendar.is_open(now):
+        return intraday_ttl
+    local = calendar.now(now)
+    day = local.date()
+    if not (calendar.is_session(day) and local.time() < calendar.open_time):
+        day = calendar.next_session(day)
+    next_open = datetime.combine(day, calendar.open_time, tzinfo=calendar.tz)
+    return max(intraday_ttl, min(CLOSED_TTL, int((next_open - local).total_seconds())))
+
+
+def expires_at(calendar, stored_at, intraday_ttl=INTRADAY_TTL):
+    """
+    stored_at(time.time())에 저장한 항목의 만료 시각을 반환합니다.
+
+    저장 시각의 ttl_for()를 쓰되, 장중에 저장한 항목은 그날 장 마감에 만료됩니다
+    (장중 시세가 마감 후 확정 시세로 쓰이지 않도록).
+
+    Args:
+        intraday_ttl (int): 장중에 저장한 항목의 TTL (초, 엔드포인트별)
+    """
+    stored = datetime.fromtimestamp(stored_at, calendar.tz)
+    expires = stored_at + ttl_for(calendar, stored, intraday_ttl)
+    if calendar.is_open(stored):
+        close = datetime.combine(stored.date(), calendar.close_time, tzinfo=calendar.tz)
+        expires = min(expires, close.timestamp())
+    return expires
+
+
+class HttpCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        """
+        Args:
+            cache_dir (str): 캐시 폴더
+            max_bytes (int): 캐시 전체 크기 상한 (초과 시 오래된 항목부터 삭제)
+            max_age (int): 항목 최대 보관 기간 (초)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._puts = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.evict()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, url, params=None, ttl=None, calendar=None):
+        """
+        캐시된 응답을 반환합니다.
+
+        Args:
+            ttl (int): 이 시간(초)보다 오래된 항목은 무시, None이면 max_age 이내 모두 사용
+            calendar: 지정하면 저장 시각 기준 만료 시각(expires_at)으로 판단 (TradingCalendar)
+                      - 이때 ttl은 장중에 저장한 항목의 TTL (None이면 INTRADAY_TTL)
+
+        Returns:
+            CachedResponse 또는 None
+        """
+        meta_path, body_path = self._paths(cache_key(url, params))
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            now = time.time()
+            age = now - meta['stored_at']
+            if age > self.max_age:
+                return None
+            if calendar is not None:
+                if now >= expires_at(calendar, meta['stored_at'], ttl or INTRADAY_TTL):
+                    return None
+            elif ttl is not None and age > ttl:
+                return None
+            with open(body_path, 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return CachedResponse(meta['url'], meta['status_code'], content, meta.get('encoding'), meta.get('headers'),
+                              stored_at=meta['stored_at'])
+
+    def put(self, url, params, response):
+        """성공 응답(2xx)을 캐시에 저장합니다."""
+        if not 200 <= response.status_code < 300:
+            return
+        meta_path, body_path = self._paths(cache_key(url, params))
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            'url': response.url or url,
+            'status_code': response.status_code,
+            'encoding': response.encoding,
+            'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+            'stored_at': time.time(),
+        }
+        # 본문 먼저 쓰고 메타를 마지막에 교체 (메타가 있으면 본문도 완전함)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, 'wb') as f:
+            f.write(response.content)
+        os.replace(body_path + suffix, body_path)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + suffix, meta_path)
+
+        with self._lock:
+            self._puts += 1
+            should_evict = self._puts % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """max_age가 지난 항목을 지우고, 전체 크기가 max_bytes 이하가 될 때까지 오래된 항목부터 삭제합니다."""
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if not filename.endswith(".body"):
+                    continue
+                body_path = os.path.join(root, filename)
+                meta_path = body_path[:-len(".body")] + ".json"
+                try:
+                    stat = os.stat(body_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, body_path, meta_path))
+
+        entries.sort()
+        total = sum(size for _, size, _, _ in entries)
+        for mtime, size, body_path, meta_path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                continue
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def fetch(self, session, url, params=None, ttl=INTRADAY_TTL, offline=False, calendar=None, **kwargs):
+        """
+        캐시를 먼저 확인하고, 없으면 session으로 요청해 저장합니다.
+
+        Args:
+            session: requests.Session 또는 transport.Transport (get 메서드가 같음)
+            ttl (int): 이 요청에 적용할 TTL (초), calendar를 지정하면 장중에 저장한 항목의 TTL
+            offline (bool): True면 네트워크 요청 없이 캐시만 사용 (TTL 무시)
+            calendar: 거래소 달력 (TradingCalendar) - 저장 시각의 장 운영 상태로 만료 시각을 정함
+            **kwargs: session.get에 전달할 인자 (timeout 등)
+
+        Raises:
+            CacheMiss: offline 모드에서 캐시에 없는 경우
+        """
+        if offline:
+            cached = self.get(url, params)
+        else:
+            cached = self.get(url, params, ttl=ttl, calendar=calendar)
+        if cached is not None:
+            return cached
+        if offline:
+            raise CacheMiss(f"offline 모드: 캐시에 없는 요청입니다 ({url})")
+
+        response = session.get(url, params=params, **kwargs)
+        self.put(url, params, response)
+        return response
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+종목별 지표 누적 상태 (증분 갱신, 종목마다 JSON 파일로 보관)
+
+저장 파일에는 최근 20일만 남기 때문에, 저장할 때마다 병합된 시계열 전체에서 지표를 다시
+계산하면 지표가 늘어날수록 비용이 커지고 오래된 행의 MA20은 데이터가 모자라 N/A가 됩니다.
+대신 data/<market>/state/stock_<code>.json에 종목마다 다음 상태를 둡니다.
+
+- last: 마지막 일봉의 날짜/종가/거래량 - 같은 날짜가 다시 들어오면(장중 갱신) 교체
+- captured: last 일봉을 받은 시각 - 장 마감 전에 받은 일봉(장중 시세)인지 판단하는 데 사용
+- 그 전날까지 확정된 일봉의 누적값: 종가/거래량 링 버퍼, 윈도우별 직전 (w-1)일 종가 합,
+  볼린저 밴드용 종가 제곱합, 거래량 합, EMA, RSI 평균 상승/하락폭
+
+새 날짜의 일봉이 오면 last를 누적값에 넣고(roll) 새 일봉을 last로 두므로, 일봉 하나의 갱신은
+이력 길이와 무관하게 O(윈도우 수)입니다. 이미 누적된 과거 일봉의 종가/거래량이 바뀐
+경우(수정주가 등)나 상태 파일이 저장 파일과 맞지 않는 경우에만 전체를 다시 계산합니다.
+"""
+
+import json
+import math
+import os
+from collections import deque
+from datetime import datetime
+
+from atomic_file import write_if_changed
+from indicators import DEFAULT_MA_WINDOWS
+
+STATE_VERSION = 1
+
+# 지표 기준값 (바꾸면 저장된 상태는 다음 저장 때 다시 계산됨)
+EMA_WINDOWS = (12, 26)
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2.0
+VOLUME_MA_WINDOW = 20
+# 운영 매뉴얼의 "거래량 10거래일 고점"
+VOLUME_HIGH_WINDOW = 10
+
+
+def state_path(data_dir, code):
+    """종목 지표 상태 파일 경로 (<data_dir>/state/stock_<code>.json)"""
+    return os.path.join(data_dir, "state", f"stock_{code}.json")
+
+
+def captured_at(path, day):
+    """
+    상태 파일에서 day 일봉(마지막 일봉)을 받은 시각을 읽습니다.
+
+    Returns:
+        datetime: 받은 시각, 마지막 일봉이 day가 아니거나 기록이 없으면 None
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data['last'][0] != day or not data.get('captured'):
+            return None
+        return datetime.fromisoformat(data['captured'])
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def _params(ma_windows):
+    return {
+        'ma': list(ma_windows),
+        'ema': list(EMA_WINDOWS),
+        'rsi': RSI_WINDOW,
+        'bollinger': [BOLLINGER_WINDOW, BOLLINGER_WIDTH],
+        'volume_ma': VOLUME_MA_WINDOW,
+        'volume_high': VOLUME_HIGH_WINDOW,
+    }
+
+
+def _slide(total, ring, value, span, square=False):
+    """ring에 value를 넣은 뒤, 마지막 span개 합 total을 밀어 갱신합니다."""
+    leaving = ring[-(span + 1)] if len(ring) > span else 0.0
+    if square:
+        return total + value * value - leaving * leaving
+    return total + value - leaving
+
+
+def _rsi_step(gain, loss, change, changes):
+    """
+    RSI 평균 상승/하락폭에 변화 하나를 반영합니다 (Wilder 평활).
+
+    changes번째 변화까지는 합을 모으고, RSI_WINDOW번째에서 평균으로 바꾼 뒤 평활합니다.
+    """
+    up, down = max(change, 0.0), max(-change, 0.0)
+    if changes < RSI_WINDOW:
+        return gain + up, loss + down
+    if changes == RSI_WINDOW:
+        return (gain + up) / RSI_WINDOW, (loss + down) / RSI_WINDOW
+    return ((gain * (RSI_WINDOW - 1) + up) / RSI_WINDOW,
+            (loss * (RSI_WINDOW - 1) + down) / RSI_WINDOW)
+
+
+class IndicatorState:
+    """
+    종목 하나의 지표 누적 상태
+
+    push()로 일봉을 날짜순으로 넣으면 마지막 일봉 기준 지표를 돌려줍니다.
+    """
+
+    def __init__(self, ma_windows=DEFAULT_MA_WINDOWS):
+        self.ma_windows = tuple(ma_windows)
+        self.last = None  # (날짜, 종가, 거래량)
+        self.captured = None  # last 일봉을 받은 시각 (ISO 8601, 모르면 None)
+        self.count = 0  # 누적값에 들어간(확정된) 일봉 수
+        keep = max(self.ma_windows + (BOLLINGER_WINDOW, VOLUME_MA_WINDOW, VOLUME_HIGH_WINDOW))
+        self.closes = deque(maxlen=keep)
+        self.volumes = deque(maxlen=keep)
+        # 윈도우 w별 직전 (w-1)일 종가 합 (last와 더하면 w일 합)
+        self.sums = {window: 0.0 for window in self._close_windows()}
+        self.square_sum = 0.0
+        self.volume_sum = 0.0
+        self.ema = {window: None for window in EMA_WINDOWS}
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def _close_windows(self):
+        return sorted(set(self.ma_windows) | {BOLLINGER_WINDOW})
+
+    def push(self, bar):
+        """
+        일봉 하나를 반영합니다. last와 같은 날짜면 last를 교체합니다 (장중 갱신).
+
+        Args:
+            bar: StockBar (종가 필수, 거래량이 없으면 0으로 계산)
+
+        Returns:
+            dict: values()와 같은 마지막 일봉 기준 지표
+
+        Raises:
+            ValueError: last보다 이전 날짜의 일봉인 경우 (전체를 다시 계산해야 함)
+        """
+        if self.last is not None:
+            if bar.date < self.last[0]:
+                raise ValueError(f"이전 날짜의 일봉은 증분 반영할 수 없습니다: {bar.date} < {self.last[0]}")
+            if bar.date > self.last[0]:
+                self._roll(self.last[1], self.last[2])
+        self.last = (bar.date, float(bar.close), float(bar.volume or 0))
+        return self.values()
+
+    def _roll(self, close, volume):
+        """확정된 일봉 하나를 누적값에 넣습니다."""
+        if self.count:
+            self.gain, self.loss = _rsi_step(self.gain, self.loss, close - self.closes[-1], self.count)
+        for window in EMA_WINDOWS:
+            previous = self.ema[window]
+            self.ema[window] = close if previous is None else previous + 2.0 / (window + 1) * (close - previous)
+
+        self.closes.append(close)
+        self.volumes.append(volume)
+        for window in self.sums:
+            self.sums[window] = _slide(self.sums[window], self.closes, close, window - 1)
+        self.square_sum = _slide(self.square_sum, self.closes, close, BOLLINGER_WINDOW - 1, square=True)
+        self.volume_sum = _slide(self.volume_sum, self.volumes, volume, VOLUME_MA_WINDOW - 1)
+        self.count += 1
+
+    def values(self):
+        """
+        마지막 일봉 기준 지표를 계산합니다 (데이터가 부족한 값은 None).
+
+        Returns:
+            dict: ma {윈도우: 값}, ema {윈도우: 값}, rsi, bollinger_upper/bollinger_lower,
+                  volume_ma, volume_high
+        """
+        if self.last is None:
+            return None
+        _, close, volume = self.last
+        # 윈도우 w의 값은 확정된 일봉 w-1개 + last로 계산
+        seen = self.count + 1
+
+        ma = {window: (self.sums[window] + close) / window if seen >= window else None
+              for window in self.ma_windows}
+
+        ema = {}
+        for window, previous in self.ema.items():
+            value = close if previous is None else previous + 2.0 / (window + 1) * (close - previous)
+            ema[window] = value if seen >= window else None
+
+        rsi = None
+        if self.count >= RSI_WINDOW:
+            gain, loss = _rsi_step(self.gain, self.loss, close - self.closes[-1], self.count)
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss) if loss else (100.0 if gain else 50.0)
+
+        upper = lower = None
+        if seen >= BOLLINGER_WINDOW:
+            mean = (self.sums[BOLLINGER_WINDOW] + close) / BOLLINGER_WINDOW
+            variance = (self.square_sum + close * close) / BOLLINGER_WINDOW - mean * mean
+            width = BOLLINGER_WIDTH * math.sqrt(max(variance, 0.0))
+            upper, lower = mean + width, mean - width
+
+        volume_ma = (self.volume_sum + volume) / VOLUME_MA_WINDOW if seen >= VOLUME_MA_WINDOW else None
+        volume_high = None
+        if seen >= VOLUME_HIGH_WINDOW:
+            prior = list(self.volumes)[len(self.volumes) - (VOLUME_HIGH_WINDOW - 1):]
+            volume_high = max(prior + [volume])
+
+        return {
+            'ma': ma,
+            'ema': ema,
+            'rsi': rsi,
+            'bollinger_upper': upper,
+            'bollinger_lower': lower,
+            'volume_ma': volume_ma,
+            'volume_high': volume_high,
+        }
+
+    def matches(self, bar):
+        """bar가 last와 같은 일봉(날짜/종가/거래량)인지 확인합니다."""
+        return self.last == (bar.date, float(bar.close), float(bar.volume or 0))
+
+    def to_dict(self):
+        values = self.values()
+        return {
+            'version': STATE_VERSION,
+            'params': _params(self.ma_windows),
+            'last': list(self.last) if self.last else None,
+            'captured': self.captured,
+            'count': self.count,
+            'closes': list(self.closes),
+            'volumes': list(self.volumes),
+            'sums': {str(window): total for window, total in self.sums.items()},
+            'square_sum': self.square_sum,
+            'volume_sum': self.volume_sum,
+            'ema': {str(window): value for window, value in self.ema.items()},
+            'gain': self.gain,
+            'loss': self.loss,
+            # 마지막 일봉 기준 지표 (다른 도구가 다시 계산하지 않고 읽을 수 있도록)
+            'values': values and dict(values, ma={str(w): v for w, v in values['ma'].items()},
+                                      ema={str(w): v for w, v in values['ema'].items()}),
+        }
+
+    @classmethod
+    def from_dict(cls, data, ma_windows=DEFAULT_MA_WINDOWS):
+        """
+        to_dict() 결과로 상태를 복원합니다.
+
+        Returns:
+            IndicatorState, 형식/기준값이 현재와 다르면 None (다시 계산해야 함)
+        """
+        if data.get('version') != STATE_VERSION or data.get('params') != _params(ma_windows):
+            return None
+        state = cls(ma_windows)
+        state.last = tuple(data['last']) if data.get('last') else None
+        state.captured = data.get('captured')
+        state.count = data['count']
+        state.closes.extend(data['closes'])
+        state.volumes.extend(data['volumes'])
+        state.sums = {int(window): total for window, total in data['sums'].items()}
+        state.square_sum = data['square_sum']
+        state.volume_sum = data['volume_sum']
+        state.ema = {int(window): value for window, value in data['ema'].items()}
+        state.gain = data['gain']
+        state.loss = data['loss']
+        return state
+
+    @classmethod
+    def load(cls, path, ma_windows=DEFAULT_MA_WINDOWS):
+        """상태 파일을 읽습니다 (없거나 읽을 수 없으면 None)."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f), ma_windows)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def dump(self, path):
+        """상태 파일을 씁니다 (내용이 같으면 쓰지 않음)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return write_if_changed(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+
+def _same_inputs(old, new):
+    """지표 계산에 쓰는 값(종가/거래량)이 같은지 확인합니다."""
+    return float(old.close) == float(new.close) and float(old.volume or 0) == float(new.volume or 0)
+
+
+def _can_extend(state, merged, pending):
+    """저장된 일봉(merged)과 상태가 일치하고, 새 일봉을 증분으로 반영할 수 있는지 확인합니다."""
+    if state is None or state.last is None or not merged:
+        return False
+    if not state.matches(merged[max(merged)]):
+        return False
+    for bar in pending:
+        if bar.date < state.last[0]:
+            old = merged.get(bar.date)
+            if old is None or not _same_inputs(old, bar):
+                return False
+    return True
+
+
+def merge_bars(path, existing, new_bars, ma_windows=DEFAULT_MA_WINDOWS, load_history=None, captured_at=None):
+    """
+    저장된 일봉에 새 일봉을 병합하고, 지표 상태로 새 일봉의 이동평균을 채웁니다.
+
+    저장된 일봉의 bar.ma는 그대로 두고 새 일봉만 증분 계산합니다. 과거 일봉이 바뀌었거나
+    상태 파일이 없거나 맞지 않으면 전체를 다시 계산하고 상태를 새로 만듭니다.
+    종가가 없는 일봉은 기존/새 일봉 모두 제외합니다.
+
+    Args:
+        path (str): 상태 파일 경로
+        existing: 저장된 StockBar 리스트 (bar.ma 포함, 순서 무관)
+        new_bars: 새 StockBar 리스트 (순서 무관, 같은 날짜는 나중 것이 우선)
+        ma_windows: 이동평균 윈도우
+        load_history: 다시 계산할 때 저장된 일봉보다 긴 이력(StockBar 리스트)을 돌려주는 함수
+        captured_at (str): new_bars를 받은 시각 (ISO 8601) - 마지막 일봉이 새 일봉이면 상태에 기록
+
+    Returns:
+        list: 병합된 StockBar 리스트 (최신 날짜가 위, bar.ma 채움)
+    """
+    # 종가가 없는 일봉은 지표를 계산할 수 없으므로 병합하지 않음 (손상된 행 하나로 저장이 계속 실패하지 않도록)
+    merged = {bar.date: bar for bar in existing if bar.close is not None}
+    incoming = {bar.date: bar for bar in new_bars if bar.close is not None}
+    pending = sorted(incoming.values(), key=lambda bar: bar.date)
+
+    state = IndicatorState.load(path, ma_windows)
+    if _can_extend(state, merged, pending):
+        for bar in pending:
+            if bar.date < state.last[0]:
+                # 지표 입력값이 같은 과거 일봉 - 저장된 지표를 그대로 사용
+                bar.ma = dict(merged[bar.date].ma)
+            else:
+                bar.ma = state.push(bar)['ma']
+                state.captured = captured_at
+            merged[bar.date] = bar
+    else:
+        previous = state
+        merged.update(incoming)
+        source = dict(merged)
+        if load_history is not None:
+            for bar in load_history():
+                if bar.close is not None:
+                    source.setdefault(bar.date, bar)
+        state = IndicatorState(ma_windows)
+        for bar in sorted(source.values(), key=lambda bar: bar.date):
+            bar.ma = state.push(bar)['ma']
+        # 마지막 일봉이 기존 일봉이면 그 일봉을 받은 시각을 유지
+        if state.last is not None:
+            if state.last[0] in incoming:
+                state.captured = captured_at
+            elif previous is not None and previous.last and previous.last[0] == state.last[0]:
+                state.captured = previous.captured
+
+    state.dump(path)
+    return sorted(merged.values(), key=lambda bar: bar.date, reverse=True)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+국내/미국 fetcher가 공통으로 사용하는 기술적 지표 계산 모듈
+
+모든 함수는 오래된 날짜부터 정렬된 값 배열을 받아 한 번의 누적합(prefix sum)으로
+계산하므로, 이력 길이와 윈도우 개수에 대해 선형 시간이 걸립니다.
+"""
+
+from itertools import accumulate
+
+# 기본 이동평균 윈도우 (운영 매뉴얼의 MA5 / MA10 / MA20)
+DEFAULT_MA_WINDOWS = (5, 10, 20)
+
+
+def rolling_mean(values, window):
+    """
+    단순 이동평균을 계산합니다.
+
+    Args:
+        values: 오래된 날짜부터 정렬된 숫자 시퀀스
+        window (int): 윈도우 길이
+
+    Returns:
+        list: values와 같은 길이의 리스트 (데이터가 window보다 적은 구간은 None)
+    """
+    return moving_averages(values, (window,))[window]
+
+
+def moving_averages(values, windows=DEFAULT_MA_WINDOWS):
+    """
+    여러 윈도우의 단순 이동평균을 한 번에 계산합니다.
+
+    누적합 P를 한 번 만든 뒤 MA_w[i] = (P[i+1] - P[i+1-w]) / w 로 구하므로
+    행마다 윈도우를 다시 만들거나 합산하지 않습니다.
+
+    Args:
+        values: 오래된 날짜부터 정렬된 숫자 시퀀스
+        windows: 윈도우 길이들 (예: (5, 10, 20, 60, 120))
+
+    Returns:
+        dict: {윈도우: 이동평균 리스트} (데이터가 부족한 구간은 None)
+
+    Raises:
+        ValueError: 윈도우 길이가 1보다 작은 경우
+    """
+    values = list(values)
+    prefix = [0]
+    prefix.extend(accumulate(values))
+    n = len(values)
+
+    result = {}
+    for window in windows:
+        if window < 1:
+            raise ValueError(f"윈도우 길이는 1 이상이어야 합니다: {window}")
+        averages = [None] * n
+        for i in range(window - 1, n):
+            averages[i] = (prefix[i + 1] - prefix[i + 1 - window]) / window
+        result[window] = averages
+    return result
+
+
+def apply_moving_averages(bars, windows=DEFAULT_MA_WINDOWS):
+    """
+    StockBar 리스트(오래된 날짜부터)의 종가로 이동평균을 계산해 bar.ma에 채웁니다.
+
+    Args:
+        bars: 오래된 날짜부터 정렬된 StockBar 리스트
+        windows: 윈도우 길이들
+
+    Returns:
+        bars (제자리 수정)
+    """
+    averages = moving_averages([bar.close for bar in bars], windows)
+    for window, values in averages.items():
+        for bar, value in zip(bars, values):
+            bar.ma[window] = value
+    return bars
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+장중 시세 폴링 데몬 (asyncio)
+
+국내/미국 관심 종목을 각 시장의 정규장 시간 동안 일정 간격으로 조회하고,
+종목마다 확정 일봉 이력과 당일 현재 일봉을 메모리에 유지하며 시세가 들어올 때마다
+정배열/매수/위험 신호를 증분 계산합니다. 신호가 바뀌면 이벤트를 JSON 한 줄로
+stdout 또는 파일(JSONL)에 씁니다. 장이 닫혀 있는 시장은 다음 장 시작까지 대기합니다.
+
+요청 속도는 시장별로 초당 요청 수 상한을 두고, 오류가 나면 절반으로 줄였다가 성공하면
+천천히 늘립니다. 종목 수 / 초당 요청 수가 폴링 간격보다 길면 한 바퀴가 그만큼 늘어납니다.
+
+사용법:
+    python intraday.py [--markets kr,us] [--codes 005930,AAPL] [--interval 60] [--rate 5]
+                       [--workers 4] [--output events.jsonl] [--quotes] [--once] [--base-url URL]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from cli_options import pop_flag, pop_option
+from market_data import load_series
+from strategy import EVENT_SIGNALS, LiveSignals, StrategyParams
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 장이 닫혀 있을 때 한 번에 대기할 최대 시간 (초) - 달력/설정 변경을 주기적으로 반영
+MAX_IDLE_SLEEP = 15 * 60
+
+
+class AdaptiveRate:
+    """
+    초당 요청 수 제한 (AIMD)
+
+    요청 간격을 1/rate 초 이상으로 유지하고, 실패하면 rate를 절반으로 줄이고
+    성공하면 조금씩(+step) 늘려 max_rate까지 회복합니다.
+    """
+
+    def __init__(self, max_rate, min_rate=0.2, step=0.1):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.step = step
+        self.rate = max_rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + 1.0 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def success(self):
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def failure(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+
+class TickerState:
+    """종목 하나의 확정 일봉 이력, 당일 일봉, 마지막으로 알린 신호"""
+
+    def __init__(self, code, name, session, signals):
+        self.code = code
+        self.name = name
+        self.session = session    # 당일 일봉의 거래일 (date)
+        self.signals = signals    # LiveSignals
+        self.bar = None           # 당일 현재 일봉 (StockBar)
+        self.last = {}            # 마지막으로 알린 신호 {이름: bool}
+
+
+class MarketPoller:
+    """시장 하나의 관심 종목을 장중에 반복 조회합니다."""
+
+    def __init__(self, market, fetcher, calendar, codes, emit, params=None, interval=60.0, rate=5.0,
+                 workers=4, quotes=False):
+        """
+        Args:
+            market (str): 'kr' 또는 'us'
+            fetcher: NaverStockFetcher 또는 YahooStockFetcher
+            calendar (TradingCalendar): 거래일 달력
+            codes (list): 종목코드/티커
+            emit: 이벤트 딕셔너리를 받는 함수
+            interval (float): 한 바퀴 폴링 간격 (초)
+            rate (float): 초당 최대 요청 수
+            workers (int): 동시에 진행할 최대 요청 수
+            quotes (bool): 신호 변화가 없어도 시세마다 quote 이벤트를 보낼지 여부
+        """
+        self.market = market
+        self.fetcher = fetcher
+        self.calendar = calendar
+        self.codes = codes
+        self.emit = emit
+        self.params = params or StrategyParams()
+        self.interval = interval
+        self.limiter = AdaptiveRate(rate)
+        self.semaphore = asyncio.Semaphore(workers)
+        self.quotes = quotes
+        self.states = {}
+
+    def _seed(self, code):
+        """저장된 일봉으로 종목 상태를 만듭니다. 현재 거래일 일봉은 장중 값으로 다시 받으므로 제외합니다."""
+        session = self.calendar.current_session()
+        bars = [bar for bar in load_series(self.market, code, self.fetcher.data_dir)
+                if bar.date < session.isoformat() and bar.volume is not None]
+        signals = LiveSignals([bar.close for bar in bars], [bar.volume for bar in bars], self.params)
+        name = bars[-1].name if bars else code
+        return TickerState(code, name, session, signals)
+
+    def _fetch_quote(self, code):
+        """현재가 일봉 하나를 조회합니다 (스레드에서 실행). 실패 시 None."""
+        if self.market == 'kr':
+            return self.fetcher.fetch_stock_info(code)
+        info = self.fetcher.fetch_stock_info(code, sessions=1)
+        return info['data'][0] if info and info['data'] else None
+
+    def _apply(self, state, bar):
+        """새 시세를 반영하고 바뀐 신호를 이벤트로 보냅니다."""
+        session = self.calendar.current_session()
+        if session != state.session:
+            # 거래일이 바뀜: 직전 당일 일봉을 확정 이력으로 넘김
+            if state.bar is not None and state.bar.volume is not None:
+                state.signals.roll(state.bar.close, state.bar.volume)
+            state.session, state.bar, state.last = session, None, {}
+
+        state.bar = bar
+        state.name = bar.name or state.name
+        if bar.close is None or bar.volume is None:
+            return
+        result = state.signals.update(bar.close, bar.volume)
+
+        event = {
+            'time': datetime.now(self.calendar.tz).isoformat(timespec='seconds'),
+            'market': self.market,
+            'code': state.code,
+            'name': state.name,
+            'date': bar.date,
+            'close': bar.close,
+            'volume': bar.volume,
+            'ma': {f"MA{w}": result[key] for w, key in zip(self.params.ma_windows, ('ma_short', 'ma_mid', 'ma_long'))},
+            'conditions': [result['below_short'], result['near_mid'], result['volume_dry']],
+        }
+        for signal in EVENT_SIGNALS:
+            value = bool(result[signal])
+            if value != state.last.get(signal, False):
+                self.emit(dict(event, event=signal if value else f"{signal}_cleared"))
+            state.last[signal] = value
+        if self.quotes:
+            self.emit(dict(event, event='quote'))
+
+    async def _poll_one(self, code):
+        await self.limiter.acquire()
+        async with self.semaphore:
+            try:
+                bar = await asyncio.to_thread(self._fetch_quote, code)
+            except Exception as e:
+                bar = None
+                print(f"[{self.market}] {code} 조회 오류: {e}", file=sys.stderr)
+        if bar is None:
+            self.limiter.failure()
+            return
+        self.limiter.success()
+        if code not in self.states:
+            self.states[code] = await asyncio.to_thread(self._seed, code)
+        self._apply(self.states[code], bar)
+
+    async def poll_once(self):
+        """모든 종목을 한 바퀴 조회합니다."""
+        await asyncio.gather(*(self._poll_one(code) for code in self.codes))
+
+    def _seconds_until_open(self):
+        local = self.calendar.now()
+        day = local.date()
+        if not (self.calendar.is_session(day) and local.time() < self.calendar.open_time):
+            day = self.calendar.next_session(day)
+        opening = datetime.combine(day, self.calendar.open_time, tzinfo=self.calendar.tz)
+        return max(1.0, (opening - local).total_seconds())
+
+    async def run(self):
+        """장중에는 interval마다 한 바퀴씩, 장이 닫혀 있으면 다음 장 시작까지 대기합니다."""
+        was_open = False
+        while True:
+            if not self.calendar.is_open():
+                if was_open:
+                    # 장 마감 직후 한 번 더 조회해 종가 기준 신호를 남김
+                    await self.poll_once()
+                    was_open = False
+                await asyncio.sleep(min(MAX_IDLE_SLEEP, self._seconds_until_open()))
+                continue
+
+            was_open = True
+            started = time.monotonic()
+            await self.poll_once()
+            elapsed = time.monotonic() - started
+            if elapsed > self.interval:
+                print(f"[{self.market}] {len(self.codes)}종목 조회에 {elapsed:.0f}초 소요 "
+                      f"(간격 {self.interval:.0f}초, 현재 초당 {self.limiter.rate:.1f}회)", file=sys.stderr)
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+
+
+def _watchlist(market):
+    if market == 'kr':
+        from extract_watchlist import extract_stock_codes
+        return extract_stock_codes(os.path.join(BASE_DIR, "docs", "kr", "PORTFOLIO.md"))
+    from stock_fetcher_us import extract_us_watchlist
+    return extract_us_watchlist(os.path.join(BASE_DIR, "docs", "us", "PORTFOLIO_US.md"))
+
+
+def build_poller(market, codes, emit, base_url=None, **options):
+    """시장별 fetcher(캐시 없음)와 달력으로 MarketPoller를 만듭니다."""
+    if market == 'kr':
+        from stock_fetcher import NaverStockFetcher
+        fetcher = NaverStockFetcher(max_workers=options.get('workers', 4), base_url=base_url)
+    else:
+        from stock_fetcher_us import YahooStockFetcher
+        fetcher = YahooStockFetcher(max_workers=options.get('workers', 4), base_url=base_url)
+    return MarketPoller(market, fetcher, fetcher.calendar, codes, emit, **options)
+
+
+async def run_daemon(pollers, once=False):
+    if once:
+        await asyncio.gather(*(poller.poll_once() for poller in pollers))
+    else:
+        await asyncio.gather(*(poller.run() for poller in pollers))
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        markets = pop_option(args, '--markets', 'kr,us')
+        codes = pop_option(args, '--codes')
+        interval = pop_option(args, '--interval', 60.0, float)
+        rate = pop_option(args, '--rate', 5.0, float)
+        workers = pop_option(args, '--workers', 4, int)
+        output = pop_option(args, '--output')
+        base_url = pop_option(args, '--base-url')
+        quotes = pop_flag(args, '--quotes')
+        once = pop_flag(args, '--once')
+        if interval <= 0 or rate <= 0 or workers < 1:
+            raise ValueError("--interval, --rate, --workers는 0보다 커야 합니다")
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    markets = [m.strip() for m in markets.split(',') if m.strip()]
+    if args or not markets or any(m not in ('kr', 'us') for m in markets):
+        print(__doc__)
+        sys.exit(1)
+
+    out = open(output, 'a', encoding='utf-8') if output else sys.stdout
+
+    def emit(event):
+        out.write(json.dumps(event, ensure_ascii=False) + '\n')
+        out.flush()
+
+    codes = [code.strip() for code in codes.split(',') if code.strip()] if codes else None
+    pollers = []
+    for market in markets:
+        if codes:
+            market_codes = [c for c in codes if c.isdigit() == (market == 'kr')]
+        else:
+            market_codes = _watchlist(market)
+        if market_codes:
+            pollers.append(build_poller(market, market_codes, emit, base_url=base_url, interval=interval,
+                                        rate=rate, workers=workers, quotes=quotes))
+            print(f"[{market}] {len(market_codes)}종목 폴링 (간격 {interval:.0f}초, 초당 최대 {rate:g}회)",
+                  file=sys.stderr)
+
+    if not pollers:
+        print("조회할 종목이 없습니다")
+        sys.exit(1)
+
+    try:
+        asyncio.run(run_daemon(pollers, once))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+시장별/통합 최신 스냅샷 (data/<market>/latest.json, data/latest.json)
+
+종목마다 가장 최근 일봉, 이동평균, 지표 상태의 값(EMA/RSI/볼린저 밴드/거래량 평균·고점),
+운영 매뉴얼 규칙(정배열, 매수 조건, 위험 신호)을 한 파일에 모아 둡니다. 현재 상태를 볼 때
+종목 파일을 하나씩 열지 않고 이 파일 하나만 읽으면 됩니다.
+
+fetcher는 저장 내용이 바뀐 종목만 update()로 갱신하고, 실행이 끝날 때 close()에서 파일에 씁니다.
+시장 스냅샷이 아직 없으면 close()에서 저장된 모든 종목으로 한 번 만듭니다. 통합 스냅샷은 두 시장
+스냅샷을 합친 것으로, 한 시장만 갱신해도 다른 시장 파일을 읽어 함께 씁니다.
+
+    {"market": "kr", "date": "2026-10-16", "count": 6, "tickers": {
+      "005930": {"name": "삼성전자", "date": "2026-10-16", "close": 160500, "volume": 39013626,
+                 "ma": {"5": 160720.0, ...}, "aligned": true, "buy": false, "danger": false,
+                 "conditions": {"below_short": true, "near_mid": false, "volume_dry": false},
+                 "mid_gap": 0.0323, "volume_ratio": 0.8123, "indicators": {"rsi": 61.2, ...}}}}
+
+사용법 (저장된 데이터로 스냅샷 전체 다시 만들기):
+    python latest_snapshot.py [--market kr|us|all]
+"""
+
+import json
+import os
+import sys
+import threading
+
+from atomic_file import file_lock, write_if_changed
+from indicator_state import state_path
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+SNAPSHOT_FILE = "latest.json"
+MARKETS = ('kr', 'us')
+
+
+def _round(value, digits=2):
+    return round(float(value), digits) if value is not None else None
+
+
+def _state_values(data_dir, code):
+    """종목 지표 상태 파일의 마지막 일봉 기준 지표 (없으면 None)"""
+    try:
+        with open(state_path(data_dir, code), 'r', encoding='utf-8') as f:
+            return json.load(f).get('values')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def snapshot_entry(bars, state_values=None):
+    """
+    종목 하나의 스냅샷 항목을 만듭니다.
+
+    Args:
+        bars: StockBar 리스트 (최신 날짜가 위, bar.ma 포함)
+        state_values (dict): 지표 상태의 values (IndicatorState.to_dict()['values'])
+
+    Returns:
+        dict: 스냅샷 항목, 일봉이 없으면 None
+    """
+    bars = [bar for bar in bars if bar.close is not None]
+    if not bars:
+        return None
+    latest = bars[0]
+    entry = {
+        'name': latest.name,
+        'date': latest.date,
+        'open': latest.open,
+        'high': latest.high,
+        'low': latest.low,
+        'close': latest.close,
+        'volume': latest.volume,
+        'ma': {str(window): _round(value) for window, value in sorted(latest.ma.items())},
+    }
+
+    # 운영 매뉴얼 규칙은 strategy와 같은 계산 (numpy를 쓰는 strategy는 갱신할 종목이 있을 때만 import)
+    series = [bar for bar in reversed(bars) if bar.volume is not None]
+    if series and series[-1] is latest:
+        from strategy import LiveSignals
+        signals = LiveSignals([bar.close for bar in series[:-1]],
+                              [bar.volume for bar in series[:-1]]).update(latest.close, latest.volume)
+        entry.update({
+            'aligned': bool(signals['aligned']),
+            'buy': bool(signals['buy']),
+            'danger': bool(signals['danger']),
+            'conditions': {name: bool(signals[name]) for name in ('below_short', 'near_mid', 'volume_dry')},
+            'mid_gap': _round(signals['mid_gap'], 4),
+            'volume_ratio': _round(signals['volume_ratio'], 4),
+        })
+
+    if state_values:
+        entry['indicators'] = {
+            'ema': {window: _round(value) for window, value in state_values.get('ema', {}).items()},
+            'rsi': _round(state_values.get('rsi')),
+            'bollinger_upper': _round(state_values.get('bollinger_upper')),
+            'bollinger_lower': _round(state_values.get('bollinger_lower')),
+            'volume_ma': _round(state_values.get('volume_ma')),
+            'volume_high': _round(state_values.get('volume_high'), 0),
+        }
+    return entry
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, indent=2) + '\n'
+
+
+def write_combined(data_root=DATA_DIR):
+    """
+    시장 스냅샷들을 합쳐 통합 스냅샷(data/latest.json)을 씁니다 (내용이 같으면 쓰지 않음).
+
+    Returns:
+        bool: 파일을 새로 썼는지 여부
+    """
+    path = os.path.join(data_root, SNAPSHOT_FILE)
+    combined = {}
+    for market in MARKETS:
+        snapshot = _read(os.path.join(data_root, market, SNAPSHOT_FILE))
+        if snapshot:
+            combined[market] = {key: value for key, value in snapshot.items() if key != 'market'}
+    with file_lock(path):
+        return write_if_changed(path, _dump(combined))
+
+
+class LatestSnapshot:
+    """
+    시장 하나의 최신 스냅샷 (실행 중 바뀐 종목만 모아 close()에서 반영)
+
+    여러 스레드에서 update()를 호출해도 됩니다.
+    """
+
+    def __init__(self, market, data_dir, data_root=None):
+        """
+        Args:
+            market (str): 'kr' 또는 'us'
+            data_dir (str): 종목 파일 폴더 (data/<market>)
+            data_root (str): 통합 스냅샷을 쓸 폴더 (None이면 data_dir의 상위 폴더)
+        """
+        self.market = market
+        self.data_dir = data_dir
+        self.data_root = data_root or os.path.dirname(os.path.abspath(data_dir))
+        self.path = os.path.join(data_dir, SNAPSHOT_FILE)
+        snapshot = _read(self.path)
+        self.known = set(snapshot.get('tickers', {})) if snapshot else set()
+        self.updates = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, code):
+        with self._lock:
+            return code in self.known or code in self.updates
+
+    def update(self, code, bars):
+        """
+        종목 하나의 항목을 새로 만듭니다.
+
+        Args:
+            code (str): 종목코드/티커
+            bars: 저장된 StockBar 리스트 (최신 날짜가 위, bar.ma 포함)
+        """
+        entry = snapshot_entry(bars, _state_values(self.data_dir, code))
+        if entry is None:
+            return
+        with self._lock:
+            self.updates[code] = entry
+
+    def _saved_codes(self):
+        codes = set()
+        for filename in os.listdir(self.data_dir):
+            name, ext = os.path.splitext(filename)
+            if name.startswith("stock_") and ext in ('.json', '.csv'):
+                codes.add(name[len("stock_"):])
+        return codes
+
+    def close(self):
+        """
+        바뀐 종목을 시장 스냅샷에 반영하고 통합 스냅샷을 다시 씁니다.
+
+        Returns:
+            int: 이번 실행에서 갱신한 종목 수
+        """
+        with file_lock(self.path):
+            # 다른 프로세스가 그사이 쓴 내용 위에 이번 실행의 종목만 덮어씀
+            snapshot = _read(self.path)
+            tickers = dict(snapshot.get('tickers', {})) if snapshot else {}
+            with self._lock:
+                tickers.update(self.updates)
+                updated = len(self.updates)
+
+            saved = self._saved_codes()
+            if not snapshot:
+                # 처음이면 이번에 갱신하지 않은 종목도 저장된 데이터로 채움
+                for code in sorted(saved - set(tickers)):
+                    entry = self._entry_from_files(code)
+                    if entry is not None:
+                        tickers[code] = entry
+            # 종목 파일이 지워진 종목은 제외
+            tickers = {code: tickers[code] for code in sorted(tickers) if code in saved}
+
+            write_if_changed(self.path, _dump({
+                'market': self.market,
+                'date': max((entry['date'] for entry in tickers.values()), default=None),
+                'count': len(tickers),
+                'tickers': tickers,
+            }))
+        write_combined(self.data_root)
+        return updated
+
+    def _entry_from_files(self, code):
+        from market_data import load_series
+        bars = load_series(self.market, code, self.data_dir, history=False, archive=False)
+        bars.reverse()
+        return snapshot_entry(bars, _state_values(self.data_dir, code))
+
+
+def rebuild(market, data_dir=None):
+    """
+    저장된 종목 파일로 시장 스냅샷 전체를 다시 만듭니다.
+
+    Returns:
+        int: 스냅샷에 들어간 종목 수
+    """
+    data_dir = data_dir or os.path.join(DATA_DIR, market)
+    snapshot = LatestSnapshot(market, data_dir)
+    for code in sorted(snapshot._saved_codes()):
+        entry = snapshot._entry_from_files(code)
+        if entry is not None:
+            snapshot.updates[code] = entry
+    snapshot.close()
+    return len(snapshot.updates)
+
+
+def main():
+    from cli_options import pop_option
+
+    args = sys.argv[1:]
+    market = pop_option(args, '--market', 'all')
+    if args or market not in MARKETS + ('all',):
+        print(__doc__)
+        sys.exit(1)
+
+    for name in (MARKETS if market == 'all' else (market,)):
+        if not os.path.isdir(os.path.join(DATA_DIR, name)):
+            continue
+        count = rebuild(name)
+        print(f"{name}: {count}개 종목 → {os.path.join(DATA_DIR, name, SNAPSHOT_FILE)}")
+    print(f"통합 스냅샷: {os.path.join(DATA_DIR, SNAPSHOT_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+저장된 국내/미국 일봉을 읽어 종목 × 날짜 행렬로 만드는 모듈
+
+스크리너/백테스트처럼 여러 종목을 한 번에 계산하는 도구가 사용합니다.
+data/<market>/stock_*.json(최근 20일)과, 있으면 data/<market>/archive/의 컬럼 아카이브와
+data/<market>/history/의 장기 이력을 합쳐 읽고, numpy 행렬(행: 종목, 열: 오래된 날짜 → 최신 날짜)로 정렬합니다.
+종목이 많으면 load_matrix()가 종목을 나눠 여러 프로세스에서 동시에 읽습니다.
+최근 일봉만 필요하면 align='tail'과 length로 종목마다 최근 length개 일봉만 읽어 행렬로 만듭니다.
+"""
+
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from columnar_archive import ColumnarArchive, archive_dir
+from history_store import HistoryStore
+from stock_record import from_kr_row, from_us_row
+from trading_calendar import KRX, NYSE
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 시장별 데이터 폴더와 행 변환 함수
+MARKETS = {
+    'kr': (os.path.join(BASE_DIR, "data", "kr"), from_kr_row),
+    'us': (os.path.join(BASE_DIR, "data", "us"), from_us_row),
+}
+
+# 시장별 거래일 달력 (sessions_only=True이면 주말/휴장일 행 제외)
+CALENDARS = {'kr': KRX, 'us': NYSE}
+
+
+def list_codes(market, data_dir=None):
+    """저장된 종목코드/티커 목록 (JSON, CSV, 장기 이력 중 하나라도 있으면 포함)"""
+    data_dir = data_dir or MARKETS[market][0]
+    codes = set()
+    for pattern in ("stock_*.json", "stock_*.csv"):
+        for path in glob.glob(os.path.join(data_dir, pattern)):
+            codes.add(os.path.splitext(os.path.basename(path))[0][len("stock_"):])
+    history_dir = os.path.join(data_dir, "history")
+    if os.path.isdir(history_dir):
+        codes.update(HistoryStore(history_dir).codes())
+    archive = ColumnarArchive.open_if_exists(archive_dir(data_dir))
+    if archive is not None:
+        codes.update(archive.codes())
+    return sorted(codes)
+
+
+def load_series(market, code, data_dir=None, history=True, archive=True, tail=None, sessions_only=False):
+    """
+    종목 하나의 일봉을 읽습니다.
+
+    Args:
+        market (str): 'kr' 또는 'us'
+        code (str): 종목코드/티커
+        data_dir (str): 데이터 폴더 (None이면 data/<market>)
+        history (bool): 장기 이력(history/)도 합칠지 여부
+        archive (bool): 컬럼 아카이브(archive/)도 합칠지 여부
+        tail (int): 지정하면 최근 tail개 일봉만 반환 (아카이브와 장기 이력도 최근 구간만 읽음)
+        sessions_only (bool): 주말/휴장일 날짜의 행을 제외할지 여부
+
+    Returns:
+        list: 오래된 날짜부터 정렬된 StockBar 리스트 (같은 날짜는 JSON/CSV → 장기 이력 → 아카이브 순으로 우선)
+    """
+    data_dir, from_row = (data_dir or MARKETS[market][0]), MARKETS[market][1]
+    calendar = CALENDARS[market] if sessions_only else None
+
+    def keep(bar):
+        return bar.close is not None and (calendar is None or calendar.is_session(bar.date))
+
+    # 소스마다 최근 tail개만 읽어도 합친 결과의 최근 tail개는 모두 포함됨
+    by_date = {}
+    if archive:
+        columns = ColumnarArchive.open_if_exists(archive_dir(data_dir))
+        if columns is not None:
+            start = None
+            if tail:
+                # mmap 날짜 열을 끝에서부터 훑어 최근 tail개 날짜의 시작만 찾고 그 구간만 StockBar로 변환
+                dates = (columns.columns(code) or {}).get('date')
+                if dates is not None:
+                    start = _tail_start(dates, tail, calendar)
+            for bar in columns.bars(code, start=start):
+                by_date[bar.date] = bar
+
+    history_dir = os.path.join(data_dir, "history")
+    if history and os.path.isdir(history_dir):
+        store = HistoryStore(history_dir)
+        # tail이면 기본 파일을 끝에서부터 최근 tail개까지만 읽음
+        for bar in (store.tail(code, tail, keep) if tail else store.load(code)):
+            by_date[bar.date] = bar
+
+    json_path = os.path.join(data_dir, f"stock_{code}.json")
+    csv_path = os.path.join(data_dir, f"stock_{code}.csv")
+    rows = []
+    try:
+        if os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = [rows]
+        elif os.path.exists(csv_path):
+            with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+                rows = list(csv.DictReader(f))
+    except (OSError, ValueError):
+        rows = []
+    for row in rows:
+        bar = from_row(row)
+        by_date[bar.date] = bar
+
+    bars = [by_date[day] for day in sorted(by_date) if keep(by_date[day])]
+    return bars[-tail:] if tail else bars
+
+
+def _tail_start(dates, tail, calendar=None):
+    """
+    YYYYMMDD 정수 배열(오름차순)에서 최근 tail개 날짜(calendar가 있으면 거래일만)의 첫 날짜를 반환합니다.
+
+    Returns:
+        str: YYYY-MM-DD (날짜가 tail개보다 적으면 None - 전체를 읽음)
+    """
+    found = 0
+    for i in range(len(dates) - 1, -1, -1):
+        value = int(dates[i])
+        day = f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+        if calendar is None or calendar.is_session(day):
+            found += 1
+            if found == tail:
+                return day if i > 0 else None
+    return None
+
+
+def load_market(market, codes=None, data_dir=None, history=True, tail=None, sessions_only=False):
+    """
+    여러 종목의 일봉을 읽습니다 (tail, sessions_only는 load_series와 같음).
+
+    Returns:
+        dict: {종목코드: 오래된 날짜부터 정렬된 StockBar 리스트} (데이터가 없는 종목 제외)
+    """
+    codes = codes if codes is not None else list_codes(market, data_dir)
+    series = {}
+    for code in codes:
+        bars = load_series(market, code, data_dir, history, tail=tail, sessions_only=sessions_only)
+        if bars:
+            series[code] = bars
+    return series
+
+
+class PriceMatrix:
+    """
+    종목 × 날짜 가격 행렬
+
+    open/high/low/close/volume은 (종목 수, 날짜 수) float64 배열이며 데이터가 없는 칸은 NaN입니다.
+    align='date'이면 열이 실제 날짜(dates)에 맞춰지고, align='tail'이면 종목마다
+    최근 length개 일봉을 오른쪽 끝에 맞춥니다 (마지막 열 = 각 종목의 최신 일봉).
+    """
+
+    FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, codes, names, dates, last_dates, open, high, low, close, volume):
+        self.codes = codes
+        self.names = names
+        self.dates = dates
+        self.last_dates = last_dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_series(cls, series, align='date', length=None):
+        """
+        {종목코드: StockBar 리스트(오래된 날짜부터)}로 행렬을 만듭니다.
+
+        Args:
+            series (dict): load_market() 결과
+            align (str): 'date' (날짜 기준 정렬) 또는 'tail' (최근 일봉 기준 정렬)
+            length (int): 열 수 ('tail'이면 필수, 'date'이면 최근 length개 날짜만 사용)
+
+        Raises:
+            ValueError: align 값이 올바르지 않거나 'tail'에 length가 없는 경우
+        """
+        codes = sorted(series)
+        if align == 'date':
+            dates = sorted({bar.date for bars in series.values() for bar in bars})
+            if length:
+                dates = dates[-length:]
+            column = {day: i for i, day in enumerate(dates)}
+            width = len(dates)
+        elif align == 'tail':
+            if not length:
+                raise ValueError("align='tail'에는 length가 필요합니다")
+            dates = None
+            width = length
+        else:
+            raise ValueError(f"align 값이 올바르지 않습니다: {align}")
+
+        arrays = {field: np.full((len(codes), width), np.nan) for field in cls.FIELDS}
+        names, last_dates = [], []
+        for row, code in enumerate(codes):
+            bars = series[code]
+            names.append(bars[-1].name)
+            last_dates.append(bars[-1].date)
+            if align == 'date':
+                cols = [column[bar.date] for bar in bars if bar.date in column]
+                bars = [bar for bar in bars if bar.date in column]
+            else:
+                bars = bars[-width:]
+                cols = range(width - len(bars), width)
+            # None은 float 변환 시 NaN이 됨
+            values = np.array([(bar.open, bar.high, bar.low, bar.close, bar.volume) for bar in bars],
+                              dtype=np.float64).reshape(-1, len(cls.FIELDS))
+            for k, field in enumerate(cls.FIELDS):
+                arrays[field][row, cols] = values[:, k]
+
+        return cls(codes, names, dates, last_dates, **arrays)
+
+    @classmethod
+    def concat(cls, matrices):
+        """
+        날짜 기준(align='date') 행렬 여러 개를 날짜 합집합으로 이어 붙입니다.
+        최근 일봉 기준(align='tail') 행렬은 열 수가 같으므로 행만 이어 붙입니다.
+
+        Returns:
+            PriceMatrix (모두 비어 있으면 None)
+        """
+        matrices = [m for m in matrices if m is not None and m.codes]
+        if not matrices:
+            return None
+        if all(m.dates is None for m in matrices):
+            arrays = {field: np.vstack([getattr(m, field) for m in matrices]) for field in cls.FIELDS}
+            return cls([code for m in matrices for code in m.codes], [name for m in matrices for name in m.names],
+                       None, [day for m in matrices for day in m.last_dates], **arrays)
+        dates = sorted(set().union(*(m.dates for m in matrices)))
+        column = {day: i for i, day in enumerate(dates)}
+        total = sum(len(m.codes) for m in matrices)
+
+        arrays = {field: np.full((total, len(dates)), np.nan) for field in cls.FIELDS}
+        codes, names, last_dates = [], [], []
+        row = 0
+        for m in matrices:
+            cols = [column[day] for day in m.dates]
+            for field in cls.FIELDS:
+                arrays[field][row:row + len(m.codes), cols] = getattr(m, field)
+            codes.extend(m.codes)
+            names.extend(m.names)
+            last_dates.extend(m.last_dates)
+            row += len(m.codes)
+        return cls(codes, names, dates, last_dates, **arrays)
+
+
+def _load_chunk(market, codes, data_dir, history, align='date', length=None, sessions_only=False):
+    """프로세스 풀 작업 단위: 종목 일부를 읽어 행렬로 만듭니다 (align='tail'이면 최근 length개만 읽음)."""
+    tail = length if align == 'tail' else None
+    series = load_market(market, codes, data_dir, history, tail=tail, sessions_only=sessions_only)
+    if not series:
+        return None
+    return PriceMatrix.from_series(series, align=align, length=tail)
+
+
+def load_matrix(market, codes=None, data_dir=None, history=True, workers=None, chunk_size=64,
+                align='date', length=None, sessions_only=False):
+    """
+    여러 종목을 PriceMatrix로 읽습니다.
+
+    종목이 chunk_size보다 많으면 chunk_size개씩 나눠 프로세스 풀에서 동시에 읽고
+    (JSON 파싱이 GIL에 묶이지 않도록), 결과를 날짜 합집합(align='tail'이면 행 순서대로)으로 합칩니다.
+
+    Args:
+        workers (int): 프로세스 수 (None이면 CPU 수, 1이면 현재 프로세스에서 읽음)
+        align (str): 'date' (날짜 기준 정렬) 또는 'tail' (종목마다 최근 length개 일봉만 읽어 정렬)
+        length (int): align='tail'의 열 수 (필수)
+        sessions_only (bool): 주말/휴장일 날짜의 행을 제외할지 여부
+
+    Returns:
+        PriceMatrix (데이터가 없으면 None)
+
+    Raises:
+        ValueError: align 값이 올바르지 않거나 'tail'에 length가 없는 경우
+    """
+    if align not in ('date', 'tail'):
+        raise ValueError(f"align 값이 올바르지 않습니다: {align}")
+    if align == 'tail' and not length:
+        raise ValueError("align='tail'에는 length가 필요합니다")
+    codes = codes if codes is not None else list_codes(market, data_dir)
+    chunks = [codes[i:i + chunk_size] for i in range(0, len(codes), chunk_size)]
+    options = (history, align, length, sessions_only)
+    if workers == 1 or len(chunks) <= 1:
+        return PriceMatrix.concat([_load_chunk(market, chunk, data_dir, *options) for chunk in chunks])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_load_chunk, market, chunk, data_dir, *options) for chunk in chunks]
+        return PriceMatrix.concat([future.result() for future in futures])
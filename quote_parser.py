@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+네이버 금융 종목 페이지(item/main.nhn)에서 현재가 정보를 추출하는 모듈
+
+페이지 전체 중 필요한 값은 종목명, 현재가(.no_today .blind), 시가/고가/저가/거래량
+(.new_totalinfo dl dd) 몇 개뿐이고 모두 페이지 앞쪽의 .new_totalinfo 영역 안에 있습니다.
+lxml이 있으면 페이지를 조각 단위로 스트리밍 파싱하다가 이 영역이 닫히는 즉시 멈추고
+XPath로 값만 꺼내며(나머지 뉴스/재무 표 등은 파싱하지 않음), 없으면
+BeautifulSoup(html.parser)으로 전체 페이지를 파싱해 같은 값을 추출합니다.
+"""
+
+from stock_record import parse_int, parse_number
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml은 선택 패키지
+    lxml_etree = None
+
+# 스트리밍 파싱 시 한 번에 넣을 글자 수
+STREAM_CHUNK = 8192
+
+# totalinfo 항목 이름 → (필드, 변환 함수) (전일가, 거래대금 등은 사용하지 않음)
+TOTALINFO_FIELDS = {
+    '시가': ('open', parse_number),
+    '고가': ('high', parse_number),
+    '저가': ('low', parse_number),
+    '거래량': ('volume', parse_int),
+}
+
+
+def _has_class(name):
+    """class 속성에 name이 포함된 요소를 찾는 XPath 조건"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_NAME_XPATH = f".//*[{_has_class('wrap_company')}]//h2//a"
+_PRICE_XPATH = f".//*[{_has_class('no_today')}]//*[{_has_class('blind')}]"
+_TOTALINFO_XPATH = f"descendant-or-self::*[{_has_class('new_totalinfo')}]"
+
+
+def _apply_totalinfo(quote, texts):
+    """'시가 160,100' 형태의 dd 텍스트들을 quote 딕셔너리에 채웁니다."""
+    for text in texts:
+        for label, (field, convert) in TOTALINFO_FIELDS.items():
+            if text.startswith(label):
+                quote[field] = convert(text.replace(label, '').strip().split()[0])
+                break
+
+
+def _stream_totalinfo(page, chunk_size=STREAM_CHUNK):
+    """
+    페이지를 조각 단위로 파싱하다가 .new_totalinfo 영역이 닫히면 멈춥니다.
+
+    Returns:
+        (영역 요소 또는 None, 파서, 다음에 넣을 위치)
+    """
+    parser = lxml_etree.HTMLPullParser(events=('end',), tag='div')
+    offset = 0
+    while offset < len(page):
+        parser.feed(page[offset:offset + chunk_size])
+        offset += chunk_size
+        for _, element in parser.read_events():
+            if 'new_totalinfo' in (element.get('class') or '').split():
+                return element, parser, offset
+    return None, parser, offset
+
+
+def parse_quote_lxml(page):
+    """
+    lxml 스트리밍 파싱 + XPath로 현재가 정보를 추출합니다.
+
+    .new_totalinfo 영역 안에서 종목명/현재가를 찾지 못하면 나머지를 마저 파싱해
+    페이지 전체에서 찾습니다.
+
+    Args:
+        page (str): 종목 페이지 HTML
+
+    Returns:
+        dict: name, close, open, high, low, volume (찾지 못한 값은 빠지거나 None)
+    """
+    scope, parser, offset = _stream_totalinfo(page)
+    if scope is None or not (scope.xpath(_NAME_XPATH) and scope.xpath(_PRICE_XPATH)):
+        if offset < len(page):
+            parser.feed(page[offset:])
+        try:
+            scope = parser.close()
+        except lxml_etree.XMLSyntaxError:
+            # 빈 페이지
+            return {'name': "알 수 없음", 'close': None}
+    quote = {}
+
+    name = scope.xpath(_NAME_XPATH)
+    quote['name'] = name[0].xpath('string()').strip() if name else "알 수 없음"
+
+    price = scope.xpath(_PRICE_XPATH)
+    quote['close'] = parse_number(price[0].xpath('string()').strip()) if price else None
+
+    totalinfo = scope.xpath(_TOTALINFO_XPATH)
+    if totalinfo:
+        # BeautifulSoup의 get_text(strip=True)와 같은 결과 (조각마다 strip 후 이어 붙임)
+        texts = (''.join(piece.strip() for piece in dd.itertext()) for dd in totalinfo[0].iterfind('.//dl//dd'))
+        _apply_totalinfo(quote, texts)
+    return quote
+
+
+def parse_quote_soup(page):
+    """
+    BeautifulSoup(html.parser)으로 현재가 정보를 추출합니다. lxml이 없을 때 사용합니다.
+
+    Args:
+        page (str): 종목 페이지 HTML
+
+    Returns:
+        dict: name, close, open, high, low, volume (찾지 못한 값은 빠지거나 None)
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, 'html.parser')
+    quote = {}
+
+    name = soup.select_one('.wrap_company h2 a')
+    quote['name'] = name.text.strip() if name else "알 수 없음"
+
+    price = soup.select_one('.no_today .blind')
+    quote['close'] = parse_number(price.text.strip()) if price else None
+
+    totalinfo = soup.select_one('.new_totalinfo')
+    if totalinfo:
+        _apply_totalinfo(quote, (dd.get_text(strip=True) for dd in totalinfo.select('dl dd')))
+    return quote
+
+
+PARSERS = {
+    'lxml': parse_quote_lxml,
+    'soup': parse_quote_soup,
+}
+
+# lxml이 설치되어 있으면 빠른 파서를 기본으로 사용
+DEFAULT_PARSER = 'lxml' if lxml_etree is not None else 'soup'
+
+
+def parse_quote(page, parser=None):
+    """
+    종목 페이지에서 현재가 정보를 추출합니다.
+
+    Args:
+        page (str): 종목 페이지 HTML
+        parser (str): 'lxml' 또는 'soup' (None이면 DEFAULT_PARSER)
+
+    Raises:
+        ValueError: 알 수 없는 파서이거나 lxml이 없는데 'lxml'을 지정한 경우
+    """
+    parser = parser or DEFAULT_PARSER
+    if parser not in PARSERS:
+        raise ValueError(f"알 수 없는 파서입니다: {parser} (lxml, soup)")
+    if parser == 'lxml' and lxml_etree is None:
+        raise ValueError("lxml이 설치되어 있지 않습니다 (pip install lxml)")
+    return PARSERS[parser](page)
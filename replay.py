@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+녹화된 응답(fixture) 저장 및 로컬 재생 서버
+
+fetcher를 --record DIR로 실행하면 실제 응답이 fixture로 저장되고, 이 스크립트의
+재생 서버를 띄운 뒤 --base-url로 fetcher를 연결하면 네트워크 없이 같은 응답을
+받을 수 있습니다. 지연/오류/처리량 제한을 흉내 내 성능 측정에도 사용합니다.
+
+사용법:
+    python replay.py <fixture 폴더> [--port 8765] [--latency 0.05] [--jitter 0.02]
+                     [--error-rate 0.01] [--rate-limit 50]
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from cli_options import pop_option
+
+# 요청마다 달라질 수 있는 파라미터 (fixture 검색 시 다른 값도 허용)
+VARIABLE_PARAMS = frozenset({'count', 'range', 'period1', 'period2'})
+
+INDEX_FILE = "index.json"
+
+
+def _split_request(url, params=None):
+    """URL과 파라미터를 (path, {query}) 형태로 정규화합니다."""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update({key: str(value) for key, value in (params or {}).items()})
+    return parts.path, query
+
+
+class FixtureStore:
+    """
+    fixture 폴더: index.json(요청 목록) + bodies/<sha256>.bin(응답 본문)
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self.entries = []
+        index_path = os.path.join(root_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def add(self, path, query, status, content_type, content):
+        """응답 하나를 저장합니다 (같은 요청이 있으면 교체)."""
+        digest = hashlib.sha256(content).hexdigest()
+        body_dir = os.path.join(self.root_dir, "bodies")
+        os.makedirs(body_dir, exist_ok=True)
+        body_path = os.path.join(body_dir, f"{digest}.bin")
+        if not os.path.exists(body_path):
+            with open(body_path, 'wb') as f:
+                f.write(content)
+
+        entry = {
+            'path': path,
+            'query': query,
+            'status': status,
+            'content_type': content_type,
+            'body': f"bodies/{digest}.bin",
+        }
+        with self._lock:
+            self.entries = [e for e in self.entries if not (e['path'] == path and e['query'] == query)]
+            self.entries.append(entry)
+            self._write_index()
+
+    def _write_index(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        index_path = os.path.join(self.root_dir, INDEX_FILE)
+        with open(index_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(index_path + ".tmp", index_path)
+
+    def lookup(self, path, query):
+        """
+        요청에 맞는 fixture를 찾습니다.
+
+        정확히 같은 요청이 없으면 같은 경로 중 VARIABLE_PARAMS 외의 파라미터가
+        모두 같은 항목을 사용합니다 (예: count=10 요청에 count=20 응답).
+
+        Returns:
+            (entry, body bytes) 또는 None
+        """
+        best = None
+        for entry in self.entries:
+            if entry['path'] != path:
+                continue
+            if entry['query'] == query:
+                best = entry
+                break
+            fixed = {k: v for k, v in query.items() if k not in VARIABLE_PARAMS}
+            entry_fixed = {k: v for k, v in entry['query'].items() if k not in VARIABLE_PARAMS}
+            if fixed == entry_fixed and best is None:
+                best = entry
+        if best is None:
+            return None
+        with open(os.path.join(self.root_dir, best['body']), 'rb') as f:
+            return best, f.read()
+
+
+class FixtureRecorder:
+    """fetcher가 받은 실제 응답을 FixtureStore에 기록합니다."""
+
+    def __init__(self, root_dir):
+        self.store = FixtureStore(root_dir)
+
+    def record(self, url, params, response):
+        path, query = _split_request(url, params)
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        self.store.add(path, query, response.status_code, content_type, response.content)
+
+
+class _RateLimiter:
+    """최근 1초 동안의 요청 수로 처리량을 제한합니다."""
+
+    def __init__(self, per_second):
+        self.per_second = per_second
+        self.times = deque()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.times and now - self.times[0] > 1.0:
+                self.times.popleft()
+            if len(self.times) >= self.per_second:
+                return False
+            self.times.append(now)
+            return True
+
+
+class ReplayServer:
+    def __init__(self, fixture_dir, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit=None, seed=None):
+        """
+        Args:
+            fixture_dir (str): fixture 폴더
+            port (int): 포트 (0이면 임의의 빈 포트)
+            latency (float): 응답 전 대기 시간 (초)
+            jitter (float): 대기 시간에 더할 무작위 값의 최대치 (초)
+            error_rate (float): 500 오류를 반환할 확률 (0~1)
+            rate_limit (int): 초당 허용 요청 수 (초과 시 429), None이면 제한 없음
+            seed (int): 오류/지연 난수 시드
+        """
+        self.store = FixtureStore(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limiter = _RateLimiter(rate_limit) if rate_limit else None
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'served': 0, 'missing': 0, 'errors': 0, 'throttled': 0}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _send(self, handler, status, content_type, body):
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler):
+        self._count('requests')
+        if self.limiter and not self.limiter.allow():
+            self._count('throttled')
+            self._send(handler, 429, 'text/plain', b'Too Many Requests')
+            return
+
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self._count('errors')
+            self._send(handler, 500, 'text/plain', b'Injected Error')
+            return
+
+        path, query = _split_request(handler.path)
+        found = self.store.lookup(path, query)
+        if found is None:
+            self._count('missing')
+            self._send(handler, 404, 'text/plain', b'No fixture')
+            return
+
+        entry, body = found
+        self._count('served')
+        self._send(handler, entry['status'], entry['content_type'], body)
+
+    def start(self):
+        """백그라운드 스레드에서 서버를 시작합니다."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        port = pop_option(args, '--port', 8765, int)
+        latency = pop_option(args, '--latency', 0.0, float)
+        jitter = pop_option(args, '--jitter', 0.0, float)
+        error_rate = pop_option(args, '--error-rate', 0.0, float)
+        rate_limit = pop_option(args, '--rate-limit', None, int)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if len(args) != 1:
+        print(__doc__)
+        sys.exit(1)
+
+    server = ReplayServer(args[0], port=port, latency=latency, jitter=jitter,
+                          error_rate=error_rate, rate_limit=rate_limit)
+    print(f"재생 서버 시작: {server.url} (fixture {len(server.store.entries)}개)")
+    print(f"fetcher 연결: --base-url {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"\n요청 통계: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+실행 단계별 시간/카운터 계측과 실행 보고서 (--profile, --cprofile)
+
+fetcher는 단계마다 걸린 시간과 받은 바이트, 파싱/기록한 행 수를 종목별로 모읍니다.
+단계 시간은 자기 시간(self time)입니다. 예를 들어 fchart 스트리밍 파싱 중 본문을 받는 시간은
+parse가 아니라 network에 들어가므로, 단계 시간의 합은 실제 작업 시간을 넘지 않습니다.
+계측은 항상 켜져 있으며(단계마다 perf_counter 두 번), --profile을 주면 실행이 끝날 때
+합계를 JSON 보고서로 씁니다.
+
+단계:
+    network  HTTP 요청 (bytes: 받은 본문 크기)
+    cache    HTTP 응답 캐시에서 읽기 (bytes: 본문 크기)
+    parse    현재가 HTML / fchart XML / Yahoo JSON 파싱 (rows: 일봉 수)
+    load     저장된 JSON/CSV 읽기 (rows: 일봉 수)
+    merge    기존 데이터와 병합 + 지표 상태 갱신 (rows: 병합된 일봉 수)
+    changes  변경 피드 비교 (신호 계산 포함)
+    write    JSON/CSV 파일 쓰기 (rows: 실제로 쓴 행 수, 내용이 같아 건너뛰면 0)
+    snapshot 최신 스냅샷 항목 갱신 (규칙 판정 포함)
+    record   장기 이력/통합 저장소 기록 (rows: 기록한 일봉 수)
+
+--cprofile을 주면 메인 스레드와 배치 작업 스레드(run()으로 실행한 함수)의 cProfile 결과를
+합쳐 pstats 파일로 저장합니다 (python -m pstats PATH 또는 snakeviz로 확인).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+REPORT_VERSION = 1
+
+# 보고서에 나오는 단계 순서
+STAGES = ('network', 'cache', 'parse', 'load', 'merge', 'changes', 'write', 'snapshot', 'record')
+
+
+def _empty():
+    return {'calls': 0, 'seconds': 0.0, 'bytes': 0, 'rows': 0}
+
+
+class RunProfile:
+    """
+    실행 하나의 단계별 계측값
+
+    여러 스레드에서 같은 인스턴스에 기록해도 됩니다.
+    """
+
+    def __init__(self, cprofile=False):
+        """
+        Args:
+            cprofile (bool): run()으로 실행하는 함수와 메인 스레드를 cProfile로도 측정할지 여부
+        """
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.stages = {}
+        self.tickers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+        self._main_profile = None
+        if cprofile:
+            import cProfile
+            self._main_profile = cProfile.Profile()
+            self._main_profile.enable()
+
+    def add(self, stage, code=None, seconds=0.0, calls=1, nbytes=0, rows=0):
+        """단계 하나의 측정값을 더합니다 (code가 있으면 종목별 합계에도 더함)."""
+        with self._lock:
+            targets = [self.stages.setdefault(stage, _empty())]
+            if code is not None:
+                targets.append(self.tickers.setdefault(code, {}).setdefault(stage, _empty()))
+            for target in targets:
+                target['calls'] += calls
+                target['seconds'] += seconds
+                target['bytes'] += nbytes
+                target['rows'] += rows
+
+    def _begin(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        return time.perf_counter()
+
+    def _end(self, started):
+        """시작 이후 경과 시간에서 안쪽 단계 시간을 뺀 자기 시간을 돌려줍니다."""
+        elapsed = time.perf_counter() - started
+        stack = self._local.stack
+        inner = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        return elapsed - inner
+
+    @contextmanager
+    def stage(self, stage, code=None):
+        """
+        블록 실행 시간을 stage에 기록합니다.
+
+        블록 안에서 돌려받은 dict에 'bytes', 'rows'를 넣으면 함께 기록됩니다.
+        """
+        counts = {}
+        started = self._begin()
+        try:
+            yield counts
+        finally:
+            self.add(stage, code, self._end(started), nbytes=counts.get('bytes', 0), rows=counts.get('rows', 0))
+
+    def meter(self, iterable, stage, code=None, calls=1, count_bytes=False):
+        """
+        iterable에서 항목을 하나 꺼낼 때마다 걸린 시간을 stage에 기록하는 제너레이터입니다.
+
+        Args:
+            calls (int): 끝났을 때 더할 호출 수 (이미 다른 곳에서 센 요청의 본문이면 0)
+            count_bytes (bool): True면 항목 길이를 bytes로, 아니면 항목 수를 rows로 셈
+        """
+        iterator = iter(iterable)
+        seconds = 0.0
+        count = 0
+        try:
+            while True:
+                started = self._begin()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += self._end(started)
+                count += len(item) if count_bytes else 1
+                yield item
+        finally:
+            self.add(stage, code, seconds, calls,
+                     nbytes=count if count_bytes else 0, rows=0 if count_bytes else count)
+
+    def run(self, function, *args, **kwargs):
+        """function을 실행합니다 (--cprofile이면 이 호출도 cProfile로 측정, 작업 스레드용)."""
+        if self._main_profile is None:
+            return function(*args, **kwargs)
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+는 프로파일러를 프로세스에 하나만 켤 수 있음 (메인 스레드 결과만 남음)
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def dump_cprofile(self, path):
+        """모은 cProfile 결과를 합쳐 pstats 파일로 저장합니다."""
+        import pstats
+        self._main_profile.disable()
+        stats = pstats.Stats(self._main_profile)
+        with self._lock:
+            for profile in self._profiles:
+                stats.add(profile)
+        stats.dump_stats(path)
+
+    def report(self, **extra):
+        """
+        실행 보고서를 만듭니다.
+
+        Args:
+            extra: 보고서에 그대로 넣을 값 (market, 성공/실패 수, 전송 계층 통계 등)
+
+        Returns:
+            dict: JSON으로 직렬화할 수 있는 보고서
+        """
+        def rounded(values):
+            return dict(values, seconds=round(values['seconds'], 6))
+
+        def ordered(stages):
+            names = [name for name in STAGES if name in stages]
+            names += sorted(name for name in stages if name not in STAGES)
+            return {name: rounded(stages[name]) for name in names}
+
+        with self._lock:
+            report = {
+                'version': REPORT_VERSION,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.started)),
+                'wall_seconds': round(time.perf_counter() - self._clock, 6),
+                'stages': ordered(self.stages),
+                'tickers': {code: ordered(stages) for code, stages in sorted(self.tickers.items())},
+            }
+        report.update(extra)
+        return report
+
+    def write_report(self, path, **extra):
+        """
+        report()를 JSON으로 씁니다 (path가 '-'면 표준 출력).
+
+        Returns:
+            dict: 쓴 보고서
+        """
+        report = self.report(**extra)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if path == '-':
+            print(text)
+        else:
+            from atomic_file import atomic_write
+            with atomic_write(path) as f:
+                f.write(text + '\n')
+        return report
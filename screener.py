@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+저장된 국내/미국 일봉 전체에 운영 매뉴얼 규칙을 적용하는 스크리너
+
+모든 종목의 최근 일봉을 (종목 수, 날짜 수) 행렬로 읽어 정배열, 매수 조건 ①②③,
+위험 신호를 한 번에 계산하고, 신호별로 순위를 매긴 표를 출력합니다.
+종목마다 신호 계산에 필요한 최근 거래일만 읽고, 종목이 많으면 여러 프로세스에서 나눠 읽습니다.
+
+사용법:
+    python screener.py [--market kr|us|all] [--codes 005930,AAPL] [--all] [--no-history] [--workers N] [--json]
+"""
+
+import json
+import sys
+
+import numpy as np
+
+from cli_options import pop_flag, pop_option
+from market_data import MARKETS, load_matrix
+from strategy import StrategyParams, evaluate
+
+# 신호 이름과 정렬 순서 (작을수록 위)
+SIGNAL_ORDER = {'매수': 0, '위험': 1, '정배열': 2, '-': 3}
+
+
+def _value(array, row):
+    value = array[row, -1]
+    return None if np.isnan(value) else float(value)
+
+
+def screen(market, codes=None, params=None, data_dir=None, history=True, workers=None):
+    """
+    시장 하나의 모든 종목에 대해 최신 일봉 기준 신호를 계산합니다.
+
+    Args:
+        market (str): 'kr' 또는 'us'
+        codes (list): 대상 종목 (None이면 저장된 모든 종목)
+        params (StrategyParams): 규칙 기준값
+        data_dir (str): 데이터 폴더 (None이면 data/<market>)
+        history (bool): 장기 이력도 읽을지 여부
+        workers (int): 읽기 프로세스 수 (None이면 CPU 수, 1이면 현재 프로세스에서 읽음)
+
+    Returns:
+        list: 종목별 결과 딕셔너리 리스트
+    """
+    params = params or StrategyParams()
+    # 종목마다 최근 min_length개 거래일만 읽음 (주말/휴장일로 잘못 저장된 행은 최신 일봉으로 쓰지 않음)
+    matrix = load_matrix(market, codes, data_dir, history, workers=workers,
+                         align='tail', length=params.min_length, sessions_only=True)
+    if matrix is None:
+        return []
+
+    signals = evaluate(matrix.close, matrix.volume, params)
+    last = {key: values[:, -1] for key, values in signals.items()}
+
+    rows = []
+    for i, code in enumerate(matrix.codes):
+        if last['buy'][i]:
+            signal = '매수'
+        elif last['danger'][i]:
+            signal = '위험'
+        elif last['aligned'][i]:
+            signal = '정배열'
+        else:
+            signal = '-'
+        rows.append({
+            'market': market,
+            'code': code,
+            'name': matrix.names[i],
+            'date': matrix.last_dates[i],
+            'close': _value(matrix.close, i),
+            'ma_short': _value(signals['ma_short'], i),
+            'ma_mid': _value(signals['ma_mid'], i),
+            'ma_long': _value(signals['ma_long'], i),
+            'mid_gap': _value(signals['mid_gap'], i),
+            'volume_ratio': _value(signals['volume_ratio'], i),
+            'conditions': [bool(last['below_short'][i]), bool(last['near_mid'][i]), bool(last['volume_dry'][i])],
+            'signal': signal,
+        })
+    return rows
+
+
+def rank(rows):
+    """신호 순서 → 충족 조건 수(많은 순) → MA10 괴리율(작은 순)로 정렬하고 순위를 매깁니다."""
+    def key(row):
+        gap = abs(row['mid_gap']) if row['mid_gap'] is not None else float('inf')
+        return SIGNAL_ORDER[row['signal']], -sum(row['conditions']), gap
+
+    ranked = sorted(rows, key=key)
+    for i, row in enumerate(ranked, 1):
+        row['rank'] = i
+    return ranked
+
+
+def _fmt(value, digits=0):
+    if value is None:
+        return "N/A"
+    return f"{value:,.{digits}f}"
+
+
+def print_table(rows, params):
+    short, mid, long = params.ma_windows
+    print(f"{'순위':>4} {'시장':<4} {'종목':<8} {'종목명':<16} {'날짜':<10} {'종가':>12} "
+          f"{f'MA{short}':>12} {f'MA{mid}':>12} {f'MA{long}':>12} {f'MA{mid}괴리':>9} {'거래량/고점':>10} "
+          f"{'①②③':<6} 신호")
+    for row in rows:
+        digits = 0 if row['market'] == 'kr' else 2
+        gap = f"{row['mid_gap'] * 100:+.2f}%" if row['mid_gap'] is not None else "N/A"
+        ratio = f"{row['volume_ratio'] * 100:.0f}%" if row['volume_ratio'] is not None else "N/A"
+        marks = ''.join('O' if ok else 'x' for ok in row['conditions'])
+        print(f"{row['rank']:>4} {row['market']:<4} {row['code']:<8} {(row['name'] or '')[:16]:<16} "
+              f"{row['date']:<10} {_fmt(row['close'], digits):>12} {_fmt(row['ma_short'], digits):>12} "
+              f"{_fmt(row['ma_mid'], digits):>12} {_fmt(row['ma_long'], digits):>12} {gap:>9} {ratio:>10} "
+              f"{marks:<6} {row['signal']}")
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        market = pop_option(args, '--market', 'all')
+        codes = pop_option(args, '--codes')
+        show_all = pop_flag(args, '--all')
+        no_history = pop_flag(args, '--no-history')
+        as_json = pop_flag(args, '--json')
+        workers = pop_option(args, '--workers', None, int)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args or market not in ('kr', 'us', 'all'):
+        print(__doc__)
+        sys.exit(1)
+
+    codes = [code.strip() for code in codes.split(',') if code.strip()] if codes else None
+    params = StrategyParams()
+    rows = []
+    for name in MARKETS:
+        if market in (name, 'all'):
+            market_codes = [c for c in codes if (c.isdigit() == (name == 'kr'))] if codes else None
+            rows.extend(screen(name, market_codes, params, history=not no_history, workers=workers))
+
+    ranked = rank(rows)
+    if not show_all:
+        ranked = [row for row in ranked if row['signal'] != '-']
+
+    if as_json:
+        print(json.dumps(ranked, ensure_ascii=False, indent=2))
+        return
+
+    counts = {signal: sum(1 for row in rows if row['signal'] == signal) for signal in SIGNAL_ORDER}
+    print(f"스크리닝: {len(rows)}종목 - 매수 {counts['매수']}, 위험 {counts['위험']}, 정배열 {counts['정배열']}")
+    if ranked:
+        print_table(ranked, params)
+
+
+if __name__ == "__main__":
+    main()
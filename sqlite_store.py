@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+국내/미국 일봉 통합 SQLite 저장소 (선택 사항)
+
+모든 종목의 일봉을 하나의 데이터베이스(bars 테이블)에 (market, code, date) 기본 키로 저장하고,
+(market, date) 인덱스로 날짜별 단면을 조회합니다. fetcher에 --db를 지정하면 JSON/CSV 저장과 함께
+새 일봉이 upsert되며, 한 번의 실행(배치 갱신 등)에서 모인 일봉은 트랜잭션 하나로 기록됩니다.
+MA는 파생값이므로 저장하지 않고 조회 시 필요한 구간만 읽어 계산합니다.
+JSON/CSV 파일은 그대로 유지되며 export 명령으로 데이터베이스에서 다시 만들 수 있습니다.
+
+사용법:
+    python sqlite_store.py import [--market kr|us|all] [--db PATH] [--no-history]
+    python sqlite_store.py export [--market kr|us|all] [--db PATH] [--out DIR] [--days 20]
+    python sqlite_store.py query --date 2026-01-28 [--market kr] [--aligned] [--db PATH]
+    python sqlite_store.py query --code 005930 [--market kr] [--start D] [--end D] [--db PATH]
+"""
+
+import contextlib
+import os
+import sqlite3
+import sys
+import threading
+
+from cli_options import pop_flag, pop_option
+from indicators import DEFAULT_MA_WINDOWS, apply_moving_averages
+from stock_record import StockBar, write_export
+
+# 기본 데이터베이스 위치 (git 제외)
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "stocks.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    market TEXT NOT NULL,
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL NOT NULL,
+    volume INTEGER,
+    PRIMARY KEY (market, code, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bars_by_date ON bars (market, date);
+"""
+
+_UPSERT = """
+INSERT INTO bars (market, code, date, name, open, high, low, close, volume)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (market, code, date) DO UPDATE SET
+    name = excluded.name, open = excluded.open, high = excluded.high,
+    low = excluded.low, close = excluded.close, volume = excluded.volume
+"""
+
+_COLUMNS = "code, name, date, open, high, low, close, volume"
+
+
+def _to_bar(market, row):
+    code, name, day, open_price, high, low, close, volume = row
+    if market == 'kr':
+        # 국내 가격은 정수 (JSON/CSV와 같은 표현)
+        open_price, high, low, close = (int(v) if v is not None else None for v in (open_price, high, low, close))
+    return StockBar(code, name, day, open=open_price, high=high, low=low, close=close, volume=volume)
+
+
+class SqliteStore:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        """
+        Args:
+            path (str): 데이터베이스 파일 경로 (없으면 생성)
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 배치 갱신의 워커 스레드들이 연결 하나를 공유 (쓰기는 _lock으로 직렬화)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = None
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def upsert(self, market, bars):
+        """
+        일봉을 추가하거나 같은 날짜의 값을 갱신합니다. batch() 안에서는 모아 두었다가 한 번에 기록합니다.
+
+        Args:
+            market (str): 'kr' 또는 'us'
+            bars: StockBar 리스트 (종가가 없는 일봉은 제외)
+
+        Returns:
+            int: 기록(예약)한 일봉 수
+        """
+        rows = [(market, bar.code, bar.date, bar.name, bar.open, bar.high, bar.low, bar.close, bar.volume)
+                for bar in bars if bar.close is not None]
+        if not rows:
+            return 0
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(rows)
+            else:
+                with self.conn:
+                    self.conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def flush(self):
+        """batch()에서 모아 둔 일봉을 트랜잭션 하나로 기록합니다."""
+        with self._lock:
+            rows, self._pending = self._pending, ([] if self._pending is not None else None)
+            if rows:
+                with self.conn:
+                    self.conn.executemany(_UPSERT, rows)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        이 블록 안의 upsert를 모아 블록이 끝날 때 트랜잭션 하나로 기록합니다.
+
+        일부 종목이 실패해 블록이 예외로 끝나더라도 이미 받은 일봉은 기록합니다.
+        """
+        with self._lock:
+            nested = self._pending is not None
+            if not nested:
+                self._pending = []
+        try:
+            yield self
+        finally:
+            if not nested:
+                self.flush()
+                with self._lock:
+                    self._pending = None
+
+    def codes(self, market):
+        """저장된 종목코드/티커 목록"""
+        cursor = self.conn.execute("SELECT DISTINCT code FROM bars WHERE market = ? ORDER BY code", (market,))
+        return [code for code, in cursor]
+
+    def dates(self, market, start=None, end=None):
+        """저장된 거래일 목록 (오래된 날짜부터)"""
+        cursor = self.conn.execute(
+            "SELECT DISTINCT date FROM bars WHERE market = ? AND date >= ? AND date <= ? ORDER BY date",
+            (market, start or '', end or '9999-12-31'))
+        return [day for day, in cursor]
+
+    def series(self, market, code, start=None, end=None, ma_windows=None):
+        """
+        종목 하나의 일봉을 기간으로 조회합니다 (기본 키 범위 검색, 다른 종목은 읽지 않음).
+
+        Args:
+            start (str): 시작 날짜 (포함), None이면 처음부터
+            end (str): 종료 날짜 (포함), None이면 끝까지
+            ma_windows: 계산할 MA 윈도우 (None이면 계산 안 함, 시작일 이전 일봉을 필요한 만큼 더 읽음)
+
+        Returns:
+            list: 오래된 날짜부터 정렬된 StockBar 리스트
+        """
+        lookback = max(ma_windows) - 1 if ma_windows else 0
+        first = start or ''
+        if start and lookback:
+            row = self.conn.execute(
+                "SELECT date FROM bars WHERE market = ? AND code = ? AND date < ? ORDER BY date DESC LIMIT 1 OFFSET ?",
+                (market, code, start, lookback - 1)).fetchone()
+            first = row[0] if row else ''
+        cursor = self.conn.execute(
+            f"SELECT {_COLUMNS} FROM bars WHERE market = ? AND code = ? AND date >= ? AND date <= ? ORDER BY date",
+            (market, code, first, end or '9999-12-31'))
+        bars = [_to_bar(market, row) for row in cursor]
+        if ma_windows:
+            apply_moving_averages(bars, ma_windows)
+            bars = [bar for bar in bars if not start or bar.date >= start]
+        return bars
+
+    def cross_section(self, market, day, ma_windows=DEFAULT_MA_WINDOWS):
+        """
+        특정 거래일의 전체 종목 일봉을 조회합니다 (날짜 인덱스로 MA 계산에 필요한 구간만 읽음).
+
+        Args:
+            day (str): 거래일 (YYYY-MM-DD)
+            ma_windows: 계산할 MA 윈도우 (None이면 해당 날짜 일봉만 읽음)
+
+        Returns:
+            list: 종목코드 순 StockBar 리스트 (그날 일봉이 있는 종목만)
+        """
+        first = day
+        if ma_windows:
+            row = self.conn.execute(
+                "SELECT date FROM (SELECT DISTINCT date FROM bars WHERE market = ? AND date <= ? "
+                "ORDER BY date DESC LIMIT ?) ORDER BY date LIMIT 1",
+                (market, day, max(ma_windows))).fetchone()
+            first = row[0] if row else day
+        cursor = self.conn.execute(
+            f"SELECT {_COLUMNS} FROM bars WHERE market = ? AND date >= ? AND date <= ? ORDER BY code, date",
+            (market, first, day))
+
+        by_code = {}
+        for row in cursor:
+            by_code.setdefault(row[0], []).append(_to_bar(market, row))
+        result = []
+        for bars in by_code.values():
+            if bars[-1].date != day:
+                continue
+            if ma_windows:
+                apply_moving_averages(bars, ma_windows)
+            result.append(bars[-1])
+        return result
+
+    def import_market(self, market, codes=None, data_dir=None, history=True):
+        """
+        data/<market>의 JSON/CSV(와 장기 이력) 파일을 트랜잭션 하나로 가져옵니다.
+
+        Returns:
+            dict: {종목코드: 가져온 일봉 수}
+        """
+        from market_data import load_market
+
+        series = load_market(market, codes, data_dir, history)
+        with self.batch():
+            return {code: self.upsert(market, bars) for code, bars in series.items()}
+
+    def export_market(self, market, out_dir, codes=None, days=None, ma_windows=DEFAULT_MA_WINDOWS):
+        """
+        데이터베이스 내용을 fetcher와 같은 형식의 JSON(국내는 CSV도) 파일로 씁니다.
+
+        Args:
+            out_dir (str): 출력 폴더
+            days (int): 종목별로 쓸 최근 일봉 수 (None이면 전체)
+
+        Returns:
+            dict: {종목코드: 쓴 일봉 수}
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        written = {}
+        for code in codes or self.codes(market):
+            bars = self.series(market, code)
+            apply_moving_averages(bars, ma_windows)
+            bars = bars[::-1][:days] if days else bars[::-1]
+            if bars:
+                written[code] = write_export(market, out_dir, code, bars, ma_windows)
+        return written
+
+
+def _is_aligned(bar, ma_windows):
+    values = [bar.ma.get(window) for window in sorted(ma_windows)]
+    return all(value is not None for value in values) and all(a > b for a, b in zip(values, values[1:]))
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        market = pop_option(args, '--market', 'all')
+        db_path = pop_option(args, '--db', DEFAULT_DB_PATH)
+        out_dir = pop_option(args, '--out')
+        days = pop_option(args, '--days', None, int)
+        day = pop_option(args, '--date')
+        code = pop_option(args, '--code')
+        start = pop_option(args, '--start')
+        end = pop_option(args, '--end')
+        aligned = pop_flag(args, '--aligned')
+        no_history = pop_flag(args, '--no-history')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    command = args.pop(0) if args else None
+    if args or command not in ('import', 'export', 'query') or market not in ('kr', 'us', 'all'):
+        print(__doc__)
+        sys.exit(1)
+
+    from market_data import MARKETS
+
+    store = SqliteStore(db_path)
+    markets = [name for name in MARKETS if market in (name, 'all')]
+    try:
+        if command == 'import':
+            for name in markets:
+                imported = store.import_market(name, history=not no_history)
+                print(f"[{name}] {len(imported)}종목, {sum(imported.values())}일봉 → {db_path}")
+
+        elif command == 'export':
+            for name in markets:
+                written = store.export_market(name, out_dir or MARKETS[name][0], days=days)
+                print(f"[{name}] {len(written)}종목 파일 생성 → {out_dir or MARKETS[name][0]}")
+
+        elif day:
+            for name in markets:
+                bars = store.cross_section(name, day)
+                if aligned:
+                    bars = [bar for bar in bars if _is_aligned(bar, DEFAULT_MA_WINDOWS)]
+                print(f"[{name}] {day} {len(bars)}종목" + (" (정배열)" if aligned else ""))
+                for bar in bars:
+                    ma = ", ".join(f"MA{w} {bar.ma[w]:,.2f}" if bar.ma.get(w) is not None else f"MA{w} N/A"
+                                   for w in DEFAULT_MA_WINDOWS)
+                    print(f"  {bar.code:<8} {bar.name or '':<16} 종가 {bar.close:,} 거래량 {bar.volume or 0:,}  {ma}")
+
+        elif code:
+            name = 'kr' if code.isdigit() else 'us'
+            for bar in store.series(name, code, start, end, DEFAULT_MA_WINDOWS):
+                print(f"{bar.date}: 시가 {bar.open}, 고가 {bar.high}, 저가 {bar.low}, 종가 {bar.close}, "
+                      f"거래량 {bar.volume}, MA5 {bar.ma.get(5)}, MA10 {bar.ma.get(10)}, MA20 {bar.ma.get(20)}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
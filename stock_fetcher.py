@@ -2,29 +2,190 @@
 # -*- coding: utf-8 -*-
 """
 네이버 금융에서 주식 정보를 가져오는 스크립트
+
+시작 시간을 줄이기 위해 응답 캐시/장기 이력 저장소, lxml/BeautifulSoup(quote_parser), XML 파서,
+csv, 스레드 풀은 해당 기능을 처음 쓰는 함수 안에서 import합니다 (requests는 transport가 첫 요청 때
+import). --version/--help는 이 모듈의 최상위 import만으로 끝납니다.
 """
 
-import requests
-from bs4 import BeautifulSoup
+import contextlib
 import json
-import csv
+from collections import deque
 from datetime import datetime, timedelta
 import sys
-import xml.etree.ElementTree as ET
 import os
+import time
+
+from atomic_file import file_lock, write_if_changed
+from cli_options import VERSION, pop_flag, pop_option
+from indicator_state import captured_at, merge_bars, state_path
+from indicators import DEFAULT_MA_WINDOWS, apply_moving_averages
+from run_profile import RunProfile
+from stock_record import KR_FIELDS, StockBar, from_kr_row, to_kr_row
+from trading_calendar import KRX
+from transport import Transport
+
+# 배치 모드 동시 조회 기본 워커 수
+DEFAULT_MAX_WORKERS = 4
+
+# data/kr 폴더: 스크립트 위치 기준으로 설정 (국내 주식)
+KR_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "kr")
+
+# 네이버 금융 / fchart 기본 주소 (--base-url 또는 STOCK_TRACKER_BASE_URL 환경변수로 재정의)
+NAVER_FINANCE_URL = "https://finance.naver.com"
+NAVER_FCHART_URL = "https://fchart.stock.naver.com"
+
+# HTTP 응답 캐시 폴더 (git 제외)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http")
+# 장중에 받은 응답의 캐시 TTL (초) - 현재가 페이지는 실시간 시세, fchart 일봉은 당일 일봉만 바뀜
+# (장 마감 후에 받은 응답은 엔드포인트와 관계없이 다음 장 시작까지 사용)
+QUOTE_CACHE_TTL = 60
+CHART_CACHE_TTL = 5 * 60
+
+# JSON/CSV에 유지하는 최근 거래일 수
+SAVED_DAYS = 20
+# fchart 응답을 읽는 단위 (바이트) / backfill 중 저장소에 한 번에 기록할 일봉 수
+FCHART_CHUNK = 64 * 1024
+BACKFILL_CHUNK = 500
+
+
+def iter_fchart_bars(chunks, stock_code):
+    """
+    fchart XML 응답 조각(EUC-KR 바이트)을 받는 대로 파싱해 일봉을 하나씩 돌려줍니다.
+
+    expat은 EUC-KR을 직접 읽지 못하므로 조각 단위로 디코딩해 XMLPullParser에 넣고,
+    처리한 item 요소는 바로 버려 응답 크기와 관계없이 메모리 사용량이 일정합니다.
+
+    Args:
+        chunks: 응답 본문 바이트 조각 iterable
+        stock_code (str): 종목 코드
+
+    Yields:
+        StockBar: 일봉 (응답 순서)
+
+    Raises:
+        LookupError: 차트 데이터(chartdata)가 없는 경우
+        xml.etree.ElementTree.ParseError: XML 형식 오류
+        UnicodeDecodeError: EUC-KR이 아닌 본문
+    """
+    import codecs
+    import xml.etree.ElementTree as ET
+
+    decoder = codecs.getincrementaldecoder('euc-kr')()
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    chartdata = None
+    stock_name = '알 수 없음'
+
+    def parse(text):
+        nonlocal chartdata, stock_name
+        parser.feed(text)
+        for event, element in parser.read_events():
+            if element.tag == 'chartdata':
+                if event == 'start':
+                    chartdata = element
+                    stock_name = element.get('name', stock_name)
+                continue
+            if event != 'end' or element.tag != 'item':
+                continue
+
+            # 형식: 날짜|시가|고가|저가|종가|거래량
+            parts = (element.get('data') or '').split('|')
+            if chartdata is not None:
+                chartdata.remove(element)
+            if len(parts) >= 6:
+                date_str = parts[0]
+                # YYYYMMDD -> YYYY-MM-DD
+                yield StockBar(
+                    stock_code, stock_name, f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}",
+                    open=int(parts[1]),
+                    high=int(parts[2]),
+                    low=int(parts[3]),
+                    close=int(parts[4]),
+                    volume=int(parts[5]),
+                )
+
+    for chunk in chunks:
+        yield from parse(decoder.decode(chunk))
+    yield from parse(decoder.decode(b'', final=True))
+    parser.close()
+    if chartdata is None:
+        raise LookupError("차트 데이터를 찾을 수 없습니다")
 
 
 class NaverStockFetcher:
-    def __init__(self):
-        self.base_url = "https://finance.naver.com/item/main.nhn"
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, ma_windows=DEFAULT_MA_WINDOWS, history=None,
+                 cache=None, offline=False, base_url=None, data_dir=None, recorder=None, quote_parser=None,
+                 transport=None, store=None, changes=None, profile=None, snapshot=None):
+        # base_url을 지정하면 두 호스트 모두 해당 주소로 보냄 (로컬 재생 서버 등)
+        base_url = (base_url or os.environ.get('STOCK_TRACKER_BASE_URL') or '').rstrip('/')
+        self.base_url = f"{base_url or NAVER_FINANCE_URL}/item/main.nhn"
+        self.chart_url = f"{base_url or NAVER_FCHART_URL}/sise.nhn"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        # data/kr 폴더: 스크립트 위치 기준으로 설정 (국내 주식)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.data_dir = os.path.join(script_dir, "data", "kr")
+        self.max_workers = max(1, max_workers)
+        # 계산할 이동평균 윈도우 (예: (5, 10, 20, 60, 120))
+        self.ma_windows = tuple(ma_windows)
+
+        # finance.naver.com / fchart.stock.naver.com 요청이 keep-alive 세션을 공유하고
+        # 호스트별 속도 제한, 타임아웃, 재시도, circuit breaker를 거침 (transport.Transport)
+        self.transport = transport or Transport(self.headers, pool_size=self.max_workers)
+        self.data_dir = data_dir or KR_DATA_DIR
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
+        # 장기 이력 저장소 (HistoryStore, None이면 JSON/CSV의 최근 20일만 유지)
+        self.history = history
+        # 국내/미국 통합 SQLite 저장소 (sqlite_store.SqliteStore, None이면 사용 안 함)
+        self.store = store
+        # 이번 실행의 변경 피드 (change_feed.ChangeFeed, None이면 기록 안 함)
+        self.changes = changes
+        # 시장 최신 스냅샷 (latest_snapshot.LatestSnapshot, None이면 갱신 안 함)
+        self.snapshot = snapshot
+        # 단계별 시간/바이트/행 수 계측 (run_profile.RunProfile, --profile 보고서)
+        self.profile = profile or RunProfile()
+        # 거래일 판정 (누락 거래일 계산, 휴장일 데이터 저장 방지)
+        self.calendar = KRX
+        # HTTP 응답 캐시 (HttpCache, None이면 캐시 없음) / offline이면 캐시만 사용
+        self.cache = cache
+        self.offline = offline
+        # 실제 응답을 fixture로 기록 (replay.FixtureRecorder, None이면 기록 안 함)
+        self.recorder = recorder
+        # 현재가 페이지 파서 ('lxml' 또는 'soup', None이면 lxml이 있을 때 lxml)
+        self.quote_parser = quote_parser
+        # load_saved로 읽은 시점의 저장 파일 상태 {종목코드: (수정 시각, 크기)}
+        self._loaded = {}
+        # 종목별 마지막 응답을 받은 시각 {종목코드: ISO 8601} - 저장할 때 지표 상태에 기록
+        self._captured = {}
+
+    def _get(self, url, stream=False, code=None, ttl=QUOTE_CACHE_TTL):
+        """
+        공유 전송 계층으로 GET 요청합니다. 캐시가 있으면 저장 시각의 장 운영 상태로 정한 만료 시각까지 캐시를 먼저 사용합니다.
+
+        ttl은 장중에 받은 응답의 캐시 TTL(초)로, 엔드포인트별로 넘깁니다.
+
+        stream=True이면 캐시/녹화를 쓰지 않을 때 본문을 나눠 받습니다 (response.iter_content).
+        이때 본문 크기와 받는 시간은 본문을 읽는 쪽에서 network 단계로 기록합니다.
+        """
+        started = time.perf_counter()
+        if self.cache is None:
+            response = self.transport.get(url, stream=stream)
+        else:
+            response = self.cache.fetch(self.transport, url, ttl=ttl, offline=self.offline, calendar=self.calendar)
+        if self.recorder is not None and not getattr(response, 'from_cache', False):
+            self.recorder.record(url, None, response)
+        if code is not None:
+            # 캐시 응답이면 원래 받은 시각 (장중에 받은 시세를 마감 시세로 취급하지 않도록)
+            stored_at = getattr(response, 'stored_at', None)
+            captured = datetime.fromtimestamp(stored_at, self.calendar.tz) if stored_at else self.calendar.now()
+            self._captured[code] = captured.isoformat(timespec='seconds')
+        self.profile.add('cache' if getattr(response, 'from_cache', False) else 'network', code,
+                         time.perf_counter() - started,
+                         nbytes=0 if stream and self._streams() else len(response.content))
+        return response
+
+    def _streams(self):
+        """stream=True 요청의 본문을 실제로 나눠 받는지 (캐시/녹화는 본문 전체를 먼저 읽음)"""
+        return self.cache is None and self.recorder is None
 
     def fetch_stock_info(self, stock_code):
         """
@@ -34,506 +195,771 @@ class NaverStockFetcher:
             stock_code (str): 종목 코드 (예: 005930 - 삼성전자)
 
         Returns:
-            dict: 주식 정보 딕셔너리
+            StockBar: 현재가 데이터 (실패 시 None)
         """
         try:
             url = f"{self.base_url}?code={stock_code}"
-            response = requests.get(url, headers=self.headers)
+            response = self._get(url, code=stock_code)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 종목명 가져오기
-            stock_name = soup.select_one('.wrap_company h2 a')
-            stock_name = stock_name.text.strip() if stock_name else "알 수 없음"
-
-            # 종가 (현재가)
-            current_price = soup.select_one('.no_today .blind')
-            current_price = current_price.text.strip() if current_price else "N/A"
-
-            # 기본 정보
-            stock_data = {
-                "종목코드": stock_code,
-                "종목명": stock_name,
-                "날짜": datetime.now().strftime("%Y-%m-%d")
-            }
-
-            # 시가, 고가, 저가, 거래량 파싱 - new_totalinfo 영역에서 추출
-            volume = None  # 거래량을 임시 저장
-            totalinfo = soup.select_one('.new_totalinfo')
-            if totalinfo:
-                # 첫 번째 dl 안의 dd 요소들을 확인
-                dd_elements = totalinfo.select('dl dd')
-
-                for dd in dd_elements:
-                    text = dd.get_text(strip=True)
-
-                    # 각 항목별로 파싱 (전일가, 거래대금 제외)
-                    if text.startswith('시가'):
-                        stock_data['시가'] = text.replace('시가', '').strip().split()[0]
-                    elif text.startswith('고가'):
-                        stock_data['고가'] = text.replace('고가', '').strip().split()[0]
-                    elif text.startswith('저가'):
-                        stock_data['저가'] = text.replace('저가', '').strip().split()[0]
-                    elif text.startswith('거래량'):
-                        volume = text.replace('거래량', '').strip().split()[0]
-
-            # 종가 추가 (시가, 고가, 저가 다음)
-            stock_data['종가'] = current_price
-
-            # 거래량을 마지막에 추가
-            if volume:
-                stock_data['거래량'] = volume
-
-            return stock_data
-
-        except requests.RequestException as e:
+            # 종목명, 현재가, 시가/고가/저가/거래량만 추출 (lxml이 있으면 XPath 빠른 경로)
+            with self.profile.stage('parse', stock_code) as counts:
+                from quote_parser import parse_quote
+                quote = parse_quote(response.text, self.quote_parser)
+                counts['rows'] = 1 if quote['close'] is not None else 0
+
+            # 현재가가 없는 페이지(점검, 거래정지 등)는 저장하지 않음
+            if quote['close'] is None:
+                print(f"현재가를 찾을 수 없습니다: {stock_code}")
+                return None
+
+            # 날짜는 시세가 속한 거래일: 장 시작 전/휴장일이면 직전 거래일
+            return StockBar(stock_code, quote['name'], self.calendar.current_session().isoformat(),
+                            open=quote.get('open'), high=quote.get('high'), low=quote.get('low'),
+                            close=quote['close'], volume=quote.get('volume'))
+
+        except OSError as e:
+            # requests.RequestException, CacheMiss, CircuitOpenError 모두 OSError 하위 클래스
             print(f"네트워크 오류: {e}")
             return None
         except Exception as e:
             print(f"데이터 파싱 오류: {e}")
             return None
 
-    def fetch_historical_data(self, stock_code, target_date=None, days=30):
+    def iter_historical_data(self, stock_code, days=30):
         """
-        과거 주식 정보를 가져옵니다.
+        fchart 일봉을 응답을 받는 대로 파싱해 하나씩 돌려주는 제너레이터입니다 (fchart 순서, 오래된 날짜부터).
+
+        응답 전체를 문자열/트리로 만들지 않으므로 days가 커져도 메모리 사용량이 거의 늘지 않습니다.
+        캐시를 쓰지 않으면 본문도 스트리밍으로 받습니다.
 
         Args:
             stock_code (str): 종목 코드
-            target_date (str): 조회할 날짜 (YYYY-MM-DD 형식), None이면 최근 데이터
-            days (int): 가져올 일수 (기본 30일)
+            days (int): 가져올 일수
 
-        Returns:
-            dict or list: target_date가 지정되면 해당 날짜 데이터, 아니면 전체 리스트
+        Yields:
+            StockBar: 일봉
+
+        Raises:
+            OSError: 네트워크/HTTP 오류
+            LookupError: 응답에 차트 데이터가 없는 경우
+            xml.etree.ElementTree.ParseError: XML 형식 오류
         """
+        url = f'{self.chart_url}?symbol={stock_code}&timeframe=day&count={days}&requestType=0'
+        response = self._get(url, stream=True, code=stock_code, ttl=CHART_CACHE_TTL)
         try:
-            url = f'https://fchart.stock.naver.com/sise.nhn?symbol={stock_code}&timeframe=day&count={days}&requestType=0'
-            response = requests.get(url, headers=self.headers)
             response.raise_for_status()
+            # 본문 조각을 받는 시간은 network, 나머지(디코딩 + XML 파싱)는 parse로 기록
+            chunks = response.iter_content(FCHART_CHUNK)
+            if self._streams():
+                chunks = self.profile.meter(chunks, 'network', stock_code, calls=0, count_bytes=True)
+            yield from self.profile.meter(iter_fchart_bars(chunks, stock_code), 'parse', stock_code)
+        finally:
+            response.close()
 
-            # XML 파싱
-            # EUC-KR 인코딩 처리
-            content = response.content.decode('euc-kr')
-            root = ET.fromstring(content)
-
-            # 종목명 가져오기
-            chartdata = root.find('chartdata')
-            if chartdata is None:
-                print("차트 데이터를 찾을 수 없습니다.")
-                return None
-
-            stock_name = chartdata.get('name', '알 수 없음')
+    def fetch_historical_data(self, stock_code, target_date=None, days=30):
+        """
+        과거 주식 정보를 가져옵니다.
 
-            # 데이터 파싱
-            items = chartdata.findall('item')
-            historical_data = []
+        Args:
+            stock_code (str): 종목 코드
+            target_date (str): 조회할 날짜 (YYYY-MM-DD 형식), None이면 최근 데이터
+            days (int): 가져올 일수 (기본 30일)
 
-            for item in items:
-                data_str = item.get('data')
-                if not data_str:
-                    continue
+        Returns:
+            StockBar or list: target_date가 지정되면 해당 날짜 데이터, 아니면 전체 리스트 (최신 날짜가 위)
+        """
+        import xml.etree.ElementTree as ET
 
-                # 형식: 날짜|시가|고가|저가|종가|거래량
-                parts = data_str.split('|')
-                if len(parts) >= 6:
-                    date_str = parts[0]
-                    # YYYYMMDD -> YYYY-MM-DD
-                    formatted_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
-
-                    stock_info = {
-                        "종목코드": stock_code,
-                        "종목명": stock_name,
-                        "날짜": formatted_date,
-                        "시가": parts[1],
-                        "고가": parts[2],
-                        "저가": parts[3],
-                        "종가": parts[4],
-                        "거래량": parts[5]
-                    }
-                    historical_data.append(stock_info)
-
-            # 최신 데이터가 먼저 오므로 역순 정렬 (오래된 날짜부터)
-            historical_data.reverse()
+        try:
+            bars = self.iter_historical_data(stock_code, days)
 
-            # 특정 날짜 지정시 해당 날짜 데이터만 반환
+            # 특정 날짜 지정시 해당 날짜 데이터만 반환 (목록을 만들지 않음)
             if target_date:
-                for data in historical_data:
-                    if data['날짜'] == target_date:
+                for data in bars:
+                    if data.date == target_date:
                         return data
                 print(f"경고: {target_date}의 데이터를 찾을 수 없습니다. 주말이나 공휴일일 수 있습니다.")
                 return None
 
+            # 오래된 날짜부터 오므로 역순 정렬 (최신 날짜가 위)
+            historical_data = list(bars)
+            historical_data.reverse()
             return historical_data
 
-        except requests.RequestException as e:
+        except LookupError as e:
+            print(f"{e}.")
+            return None
+        except ET.ParseError as e:
+            print(f"XML 파싱 오류: {e}")
+            return None
+        except OSError as e:
             print(f"네트워크 오류: {e}")
             return None
+        except Exception as e:
+            print(f"데이터 처리 오류: {e}")
+            return None
+
+    def backfill(self, stock_code, days):
+        """
+        긴 기간의 일봉을 스트리밍으로 받아 저장합니다 (--history).
+
+        받은 일봉은 BACKFILL_CHUNK개씩 장기 이력/통합 저장소에 바로 기록하고, JSON/CSV에 필요한
+        최근 SAVED_DAYS일과 이동평균 계산에 필요한 앞쪽 일봉만 메모리에 남깁니다. 따라서 days와
+        관계없이 메모리 사용량이 일정합니다.
+
+        Args:
+            stock_code (str): 종목 코드
+            days (int): 가져올 일수
+
+        Returns:
+            list: 저장된 StockBar 리스트 (최신 날짜가 위, MA 포함), 실패 시 None
+        """
+        import xml.etree.ElementTree as ET
+
+        tail = deque(maxlen=SAVED_DAYS + max(self.ma_windows, default=1) - 1)
+        chunk = []
+        count = 0
+        try:
+            for bar in self.iter_historical_data(stock_code, days):
+                if not self.calendar.is_session(bar.date):
+                    continue
+                tail.append(bar)
+                chunk.append(bar)
+                count += 1
+                if len(chunk) >= BACKFILL_CHUNK:
+                    self._flush_backfill(stock_code, chunk)
+                    chunk = []
+            self._flush_backfill(stock_code, chunk)
+        except LookupError as e:
+            print(f"{e}.")
+            return None
         except ET.ParseError as e:
             print(f"XML 파싱 오류: {e}")
             return None
+        except OSError as e:
+            print(f"네트워크 오류: {e}")
+            return None
         except Exception as e:
             print(f"데이터 처리 오류: {e}")
             return None
 
+        if not tail:
+            return None
+        print(f"{count}일 일봉 수신")
+        # 장기 이력/통합 저장소에는 이미 기록했으므로 JSON/CSV만 갱신
+        return self.save(list(tail), record=False)
+
+    def _flush_backfill(self, stock_code, bars):
+        """backfill 중 모은 일봉을 기록하고, 배치 실행 중이어도 통합 저장소에 바로 씁니다 (메모리 일정)."""
+        with file_lock(os.path.join(self.data_dir, f"stock_{stock_code}")):
+            self._record(stock_code, bars)
+        if self.store is not None:
+            with self.profile.stage('record', stock_code):
+                self.store.flush()
+
+    def _record(self, stock_code, bars):
+        """새 일봉을 장기 이력(추가)과 통합 저장소(upsert)에 기록합니다."""
+        if not bars or (self.history is None and self.store is None):
+            return
+        with self.profile.stage('record', stock_code) as counts:
+            if self.history is not None:
+                self.history.append(stock_code, bars)
+            if self.store is not None:
+                self.store.upsert('kr', bars)
+            counts['rows'] = len(bars)
+
     def calculate_moving_averages(self, data_list):
         """
-        이동평균(MA5, MA10, MA20)을 계산하여 데이터에 추가
+        이동평균(기본 MA5, MA10, MA20)을 계산하여 데이터에 추가
 
         Args:
-            data_list: 날짜순으로 정렬된 데이터 리스트 (최신 날짜가 위)
+            data_list: 날짜순으로 정렬된 StockBar 리스트 (최신 날짜가 위)
 
         Returns:
-            MA가 추가된 데이터 리스트
+            MA(bar.ma)가 채워진 StockBar 리스트
         """
         if not data_list or len(data_list) == 0:
             return data_list
 
         # 날짜 오름차순으로 정렬 (오래된 날짜부터)
-        sorted_data = sorted(data_list, key=lambda x: x['날짜'])
-
-        # 각 항목에 MA 계산
-        for i, item in enumerate(sorted_data):
-            # 종가를 숫자로 변환 (콤마 제거)
-            close_prices = []
-            for j in range(max(0, i - 19), i + 1):  # 최대 20일치 데이터
-                close_str = sorted_data[j]['종가'].replace(',', '')
-                close_prices.append(float(close_str))
-
-            # MA5 계산
-            if len(close_prices) >= 5:
-                ma5 = sum(close_prices[-5:]) / 5
-                item['MA5'] = f"{int(round(ma5)):,}원"
-            else:
-                item['MA5'] = "N/A"
-
-            # MA10 계산
-            if len(close_prices) >= 10:
-                ma10 = sum(close_prices[-10:]) / 10
-                item['MA10'] = f"{int(round(ma10)):,}원"
-            else:
-                item['MA10'] = "N/A"
+        sorted_data = sorted(data_list, key=lambda x: x.date)
 
-            # MA20 계산
-            if len(close_prices) >= 20:
-                ma20 = sum(close_prices[-20:]) / 20
-                item['MA20'] = f"{int(round(ma20)):,}원"
-            else:
-                item['MA20'] = "N/A"
+        # 전체 구간을 한 번에 계산 (종가는 이미 숫자)
+        apply_moving_averages(sorted_data, self.ma_windows)
 
         # 다시 최신 날짜 순으로 정렬
         sorted_data.reverse()
         return sorted_data
 
-    def save_to_json(self, data, filename=None):
+    def load_saved(self, stock_code):
         """
-        JSON 파일로 저장 (기존 파일에 날짜별로 append 및 정렬)
+        저장된 데이터를 읽습니다 (JSON 우선, 없으면 CSV).
 
         Args:
-            data: dict (단일 데이터) 또는 list (여러 데이터)
-            filename: 파일명 (지정하지 않으면 종목코드 기반으로 자동 생성)
+            stock_code (str): 종목 코드
+
+        Returns:
+            list: StockBar 리스트 (최신 날짜가 위), 파일이 없으면 빈 리스트
         """
-        if not data:
-            print("저장할 데이터가 없습니다.")
-            return
+        json_path = os.path.join(self.data_dir, f"stock_{stock_code}.json")
+        csv_path = os.path.join(self.data_dir, f"stock_{stock_code}.csv")
+        self._loaded[stock_code] = self._saved_signature(stock_code)
+
+        with self.profile.stage('load', stock_code) as counts:
+            if os.path.exists(json_path):
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    rows = json.load(f)
+                    # 단일 dict가 저장되어 있을 수도 있음
+                    if isinstance(rows, dict):
+                        rows = [rows]
+            elif os.path.exists(csv_path):
+                import csv
+                with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+                    rows = list(csv.DictReader(f))
+            else:
+                return []
 
-        # data가 리스트인지 dict인지 확인
-        is_list = isinstance(data, list)
-        new_data_list = data if is_list else [data]
+            bars = [from_kr_row(row) for row in rows]
+            bars.sort(key=lambda x: x.date, reverse=True)
+            counts['rows'] = len(bars)
+        return bars
 
-        if not new_data_list:
-            print("저장할 데이터가 없습니다.")
-            return
+    def _state_path(self, stock_code):
+        """종목별 지표 상태 파일 경로 (data/kr/state/stock_<코드>.json)"""
+        return state_path(self.data_dir, stock_code)
 
-        # 종목코드 추출
-        stock_code = new_data_list[0]['종목코드']
+    def _history_loader(self, stock_code):
+        """지표를 다시 계산할 때 쓸 장기 이력 로더 (장기 이력을 쓰지 않으면 None)"""
+        if self.history is None:
+            return None
+        return lambda: self.history.load(stock_code)
 
-        if filename is None:
-            filename = f"stock_{stock_code}.json"
+    def is_final_saved(self, stock_code, day):
+        """
+        저장된 day 일봉이 장 마감 후 받은 확정 시세인지 확인합니다.
 
-        # data 폴더 안에 저장
-        filepath = os.path.join(self.data_dir, filename)
+        장중에 받은 일봉이나 받은 시각 기록이 없는 일봉(이전 버전에서 저장)은 False입니다.
+        """
+        captured = captured_at(self._state_path(stock_code), day)
+        return captured is not None and self.calendar.is_final(day, now=captured)
 
-        try:
-            # 기존 파일이 있으면 읽기
-            existing_data = []
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    # 단일 dict가 저장되어 있을 수도 있음
-                    if isinstance(existing_data, dict):
-                        existing_data = [existing_data]
+    def _saved_signature(self, stock_code):
+        """저장 파일(JSON 우선)의 (수정 시각, 크기) - 읽은 뒤 다른 작업자가 바꿨는지 확인용"""
+        for ext in ('json', 'csv'):
+            try:
+                stat = os.stat(os.path.join(self.data_dir, f"stock_{stock_code}.{ext}"))
+            except OSError:
+                continue
+            return stat.st_mtime_ns, stat.st_size
+        return None
 
-            # 기존 데이터와 새 데이터 병합 (날짜를 키로 사용)
-            data_dict = {}
-            for item in existing_data:
-                data_dict[item['날짜']] = item
+    def save(self, data, existing=None, formats=('json', 'csv'), filename=None, record=True):
+        """
+        기존 데이터와 병합 → 이동평균 계산 → JSON/CSV 저장을 한 번에 수행합니다.
 
-            # 새 데이터로 업데이트 (같은 날짜면 덮어쓰기)
-            for item in new_data_list:
-                data_dict[item['날짜']] = item
+        병합과 MA 계산은 한 번만 하고, 같은 시계열로 모든 형식을 씁니다.
 
-            # 리스트로 변환 후 날짜 역순 정렬 (최신 날짜가 위)
-            merged_data = sorted(data_dict.values(), key=lambda x: x['날짜'], reverse=True)
+        Args:
+            data: StockBar (단일 데이터) 또는 list (여러 데이터)
+            existing: 이미 읽어 둔 기존 데이터 (None이면 파일에서 읽음)
+            formats: 저장할 형식 ('json', 'csv')
+            filename: 파일명 (형식이 하나일 때만 사용, 지정하지 않으면 종목코드 기반)
+            record: 새 일봉을 장기 이력/통합 저장소에도 기록할지 여부 (backfill은 이미 기록함)
 
-            # 이동평균 계산 (자르기 전에 먼저 계산)
-            merged_data = self.calculate_moving_averages(merged_data)
+        Returns:
+            list: 저장된 StockBar 리스트 (최신 날짜가 위, MA 포함), 실패 시 None
+        """
+        if not data:
+            print("저장할 데이터가 없습니다.")
+            return None
+
+        # data가 리스트인지 단일 데이터인지 확인
+        is_list = isinstance(data, list)
+        new_data_list = data if is_list else [data]
 
-            # 최근 20일 데이터만 유지 (MA 계산 후)
-            merged_data = merged_data[:20]
+        if not new_data_list:
+            print("저장할 데이터가 없습니다.")
+            return None
 
-            # 파일에 저장
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(merged_data, f, ensure_ascii=False, indent=2)
+        # 종목코드 추출
+        stock_code = new_data_list[0].code
 
-            print(f"JSON 파일 저장 완료: {filepath} (총 {len(merged_data)}개 날짜)")
+        try:
+            # 같은 종목의 읽기 → 병합 → 쓰기는 다른 스레드/프로세스와 겹치지 않게 잠금
+            with file_lock(os.path.join(self.data_dir, f"stock_{stock_code}")):
+                # 기존 데이터가 없거나, 읽은 뒤 다른 작업자가 파일을 바꿨으면 잠근 상태에서 다시 읽기
+                if existing is None or self._saved_signature(stock_code) != self._loaded.get(stock_code):
+                    existing = self.load_saved(stock_code)
+
+                # 기존 데이터와 새 데이터를 날짜 기준으로 병합 (같은 날짜면 새 데이터, 휴장일 데이터는 제외)
+                # 이동평균은 종목별 지표 상태로 새 일봉만 증분 계산 (과거 일봉이 바뀌면 전체 재계산)
+                with self.profile.stage('merge', stock_code) as counts:
+                    merged_data = merge_bars(
+                        self._state_path(stock_code),
+                        [item for item in existing if self.calendar.is_session(item.date)],
+                        [item for item in new_data_list if self.calendar.is_session(item.date)],
+                        self.ma_windows,
+                        load_history=self._history_loader(stock_code),
+                        captured_at=self._captured.get(stock_code))
+                    counts['rows'] = len(merged_data)
+
+                # 최근 20일 데이터만 유지 (MA 계산 후)
+                merged_data = merged_data[:SAVED_DAYS]
+
+                # 장기 이력에는 새 일봉만 덧붙이고 (기존 이력 재작성 없음), 통합 저장소에도 새 일봉만 upsert
+                # (배치 실행 중에는 모았다가 한 트랜잭션으로 기록)
+                if record:
+                    self._record(stock_code, [item for item in new_data_list if self.calendar.is_session(item.date)])
+
+                if self.changes is not None:
+                    with self.profile.stage('changes', stock_code):
+                        self.changes.record(stock_code, existing, merged_data)
+
+                # 파일에 저장 (표시 형식 변환은 직렬화 시점에만), 내용이 같으면 다시 쓰지 않음
+                written = False
+                with self.profile.stage('write', stock_code) as counts:
+                    rows = [to_kr_row(item, self.ma_windows) for item in merged_data]
+
+                    if 'json' in formats:
+                        filepath = os.path.join(self.data_dir, filename or f"stock_{stock_code}.json")
+                        if write_if_changed(filepath, json.dumps(rows, ensure_ascii=False, indent=2)):
+                            counts['rows'] = counts.get('rows', 0) + len(rows)
+                            written = True
+                            print(f"JSON 파일 저장 완료: {filepath} (총 {len(rows)}개 날짜)")
+                        else:
+                            print(f"JSON 파일 변경 없음: {filepath}")
+
+                    if 'csv' in formats and rows:
+                        import csv
+                        import io
+                        filepath = os.path.join(self.data_dir, filename or f"stock_{stock_code}.csv")
+                        fieldnames = KR_FIELDS + [f"MA{window}" for window in self.ma_windows]
+                        buffer = io.StringIO(newline='')
+                        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+                        writer.writeheader()
+                        writer.writerows(rows)
+                        if write_if_changed(filepath, buffer.getvalue(), encoding='utf-8-sig'):
+                            counts['rows'] = counts.get('rows', 0) + len(rows)
+                            written = True
+                            print(f"CSV 파일 저장 완료: {filepath} (총 {len(rows)}개 날짜)")
+                        else:
+                            print(f"CSV 파일 변경 없음: {filepath}")
+
+                # 최신 스냅샷은 내용이 바뀐 종목(또는 아직 없는 종목)만 갱신 (파일명을 지정한 저장은 제외)
+                if self.snapshot is not None and filename is None and (written or stock_code not in self.snapshot):
+                    with self.profile.stage('snapshot', stock_code):
+                        self.snapshot.update(stock_code, merged_data)
+
+                self._loaded[stock_code] = self._saved_signature(stock_code)
+                return merged_data
         except Exception as e:
-            print(f"JSON 저장 오류: {e}")
+            print(f"저장 오류: {e}")
+            return None
+
+    def save_to_json(self, data, filename=None):
+        """
+        JSON 파일로만 저장 (save()의 JSON 전용 버전)
+
+        Args:
+            data: StockBar (단일 데이터) 또는 list (여러 데이터)
+            filename: 파일명 (지정하지 않으면 종목코드 기반으로 자동 생성)
+        """
+        return self.save(data, formats=('json',), filename=filename)
 
     def save_to_csv(self, data, filename=None):
         """
-        CSV 파일로 저장 (기존 파일에 날짜별로 append 및 정렬)
+        CSV 파일로만 저장 (save()의 CSV 전용 버전)
 
         Args:
-            data: dict (단일 데이터) 또는 list (여러 데이터)
+            data: StockBar (단일 데이터) 또는 list (여러 데이터)
             filename: 파일명 (지정하지 않으면 종목코드 기반으로 자동 생성)
         """
-        if not data:
-            print("저장할 데이터가 없습니다.")
-            return
+        return self.save(data, formats=('csv',), filename=filename)
+
+
+def update_stock(fetcher, stock_code):
+    """
+    종목 하나를 최신 상태로 갱신합니다 (자동 초기화 → gap 보완 → 현재가 저장).
+
+    Args:
+        fetcher: NaverStockFetcher 인스턴스
+        stock_code (str): 종목 코드
+
+    Returns:
+        bool: 현재가 조회 및 저장 성공 여부 (저장에 실패하면 False)
+    """
+    print(f"종목 코드 {stock_code}의 정보를 가져오는 중...")
+
+    # 파일 존재 여부 확인 및 자동 초기화 (기존 데이터는 여기서 한 번만 읽음)
+    filepath = os.path.join(fetcher.data_dir, f"stock_{stock_code}.json")
+    calendar = fetcher.calendar
+    needs_init = False
+    init_days = 20
+    gap_days = 0
+    # 마지막 저장일 일봉이 장중에 받은 것이면 확정 시세로 다시 받음
+    refetch_latest = False
+    existing = []
+
+    if not os.path.exists(filepath):
+        needs_init = True
+        print(f"\n새 종목입니다. 최근 20일(워킹데이) 데이터를 먼저 수집합니다...")
+    else:
+        # 기존 데이터 확인
+        try:
+            existing = fetcher.load_saved(stock_code)
+            # 휴장일로 잘못 저장된 행은 무시하고 마지막 거래일 기준으로 판단
+            sessions = [item for item in existing if calendar.is_session(item.date)]
+            if len(sessions) < 20:
+                needs_init = True
+                # 마지막 저장일 이후 누락분이 20일보다 많으면 그만큼 수집
+                missing = calendar.missing_sessions(sessions[0].date) if sessions else []
+                if missing:
+                    init_days = max(init_days, calendar.sessions_since(missing[0]))
+                print(f"\n기존 데이터({len(sessions)}일)가 부족합니다. {init_days}일 데이터를 수집합니다...")
+            else:
+                # 거래일 달력으로 누락된 거래일을 계산해 필요한 만큼만 요청
+                missing = calendar.missing_sessions(sessions[0].date)
+                refetch_latest = not fetcher.is_final_saved(stock_code, sessions[0].date)
+                if missing:
+                    # 마지막 저장일 일봉이 장중에 받은 것이면 그 날짜부터 받아 확정 시세로 교체
+                    gap_days = calendar.sessions_since(sessions[0].date if refetch_latest else missing[0])
+                    print(f"\n마지막 업데이트: {sessions[0].date}")
+                    print(f"누락된 거래일 {len(missing)}일의 데이터를 수집합니다...")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            existing = []
+            needs_init = True
+            print(f"\n데이터 파일에 문제가 있습니다 ({e}). 20일 데이터를 다시 수집합니다...")
+
+    # 자동 초기화: 20 워킹데이 수집
+    if needs_init:
+        historical_data = fetcher.fetch_historical_data(stock_code, days=init_days)
+        if historical_data:
+            existing = fetcher.save(historical_data, existing) or existing
+            print(f"초기 데이터 수집 완료 ({len(historical_data)}일)\n")
+        else:
+            print("경고: 과거 데이터 수집에 실패했습니다. 현재가만 조회합니다.\n")
+    # Gap 메우기: 누락된 거래일만큼만 가져와서 병합
+    elif gap_days:
+        historical_data = fetcher.fetch_historical_data(stock_code, days=gap_days)
+        if historical_data:
+            existing_dates = set(item.date for item in existing)
+
+            # 새로운 날짜만 찾기
+            new_dates = [item.date for item in historical_data if item.date not in existing_dates]
+
+            if new_dates or refetch_latest:
+                # 새로운 데이터가 있으면 병합 (장중에 받은 마지막 저장일 일봉도 교체)
+                existing = fetcher.save(historical_data, existing) or existing
+                print(f"누락 데이터 보완 완료: {len(new_dates)}일 추가됨\n")
+            else:
+                # 새로운 데이터가 없으면 이미 최신 상태
+                print(f"데이터가 이미 최신 상태입니다.\n")
+
+    # 장 마감 후 받은 마지막 거래일 일봉이 이미 저장되어 있으면 현재가 조회 생략
+    # (장중에 저장한 일봉이면 마감 후 한 번 더 받아 확정 시세로 교체)
+    latest = existing[0] if existing else None
+    if (latest and latest.date == calendar.current_session().isoformat()
+            and fetcher.is_final_saved(stock_code, latest.date)):
+        print(f"\n{latest.date} 장 마감 데이터가 이미 저장되어 있습니다. (현재가 조회 생략)")
+        row = to_kr_row(latest, fetcher.ma_windows)
+        print("\n=== 주식 정보 ===")
+        for key, value in row.items():
+            print(f"{key}: {value}")
+        return True
+
+    stock_data = fetcher.fetch_stock_info(stock_code)
+
+    if stock_data:
+        print("\n=== 주식 정보 ===")
+        for key, value in to_kr_row(stock_data).items():
+            print(f"{key}: {value}")
+
+        # JSON과 CSV로 저장 (저장된 시계열을 그대로 받아 MA 출력, 파일 재읽기 없음)
+        saved_data = fetcher.save(stock_data, existing)
+        if saved_data is None:
+            print("주식 정보를 저장하지 못했습니다.")
+            return False
+        today_data = next((item for item in saved_data if item.date == stock_data.date), None)
+
+        if today_data and today_data.ma:
+            row = to_kr_row(today_data, fetcher.ma_windows)
+            print(f"\n=== 이동평균 ===")
+            for window in fetcher.ma_windows:
+                print(f"MA{window}: {row[f'MA{window}']}")
+        return True
+
+    print("주식 정보를 가져오는데 실패했습니다.")
+    return False
+
+
+def run_batch(fetcher, stock_codes):
+    """
+    여러 종목을 한 프로세스에서 동시에 갱신합니다.
+
+    Args:
+        fetcher: NaverStockFetcher 인스턴스 (세션 공유)
+        stock_codes (list): 종목 코드 리스트
+
+    Returns:
+        dict: {종목코드: 성공 여부}
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    results = {}
+    workers = max(1, min(fetcher.max_workers, len(stock_codes)))
+
+    # 통합 저장소를 쓰면 배치에서 받은 일봉을 끝날 때 트랜잭션 하나로 기록
+    batch = fetcher.store.batch() if fetcher.store is not None else contextlib.nullcontext()
+    with batch, ThreadPoolExecutor(max_workers=workers) as executor:
+        # --cprofile이면 작업 스레드도 측정 (RunProfile.run)
+        futures = {executor.submit(fetcher.profile.run, update_stock, fetcher, code): code for code in stock_codes}
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                results[code] = future.result()
+            except Exception as e:
+                print(f"[{code}] 처리 중 오류: {e}")
+                results[code] = False
+
+    return results
+
+
+def batch_main(args, fetcher_options=None):
+    """
+    배치 모드 진입점. 종목코드가 없으면 docs/kr/PORTFOLIO.md의 관심 종목을 사용합니다.
+
+    Args:
+        args (list): --batch 뒤의 인자 (종목코드, 쉼표 구분 가능 / --workers N)
+        fetcher_options (dict): NaverStockFetcher 생성 인자 (공통 옵션)
+    """
+    try:
+        max_workers = pop_option(args, '--workers', DEFAULT_MAX_WORKERS, int)
+    except ValueError as e:
+        print(e)
+        print("사용법: python stock_fetcher.py --batch [종목코드 ...] [--workers N]")
+        sys.exit(1)
 
-        # data가 리스트인지 dict인지 확인
-        is_list = isinstance(data, list)
-        new_data_list = data if is_list else [data]
+    stock_codes = [code.strip() for arg in args for code in arg.split(',') if code.strip()]
+    if not stock_codes:
+        from extract_watchlist import extract_stock_codes
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        stock_codes = extract_stock_codes(os.path.join(script_dir, "docs", "kr", "PORTFOLIO.md"))
+        if not stock_codes:
+            print("관심 종목을 찾을 수 없습니다. 종목코드를 지정하거나 PORTFOLIO.md를 확인해주세요.")
+            sys.exit(1)
 
-        if not new_data_list:
-            print("저장할 데이터가 없습니다.")
-            return
+    # 중복 제거 (순서 유지)
+    stock_codes = list(dict.fromkeys(stock_codes))
 
-        # 종목코드 추출
-        stock_code = new_data_list[0]['종목코드']
+    fetcher = NaverStockFetcher(max_workers=max_workers, **(fetcher_options or {}))
+    print(f"배치 갱신 시작: {len(stock_codes)}개 종목 (동시 {min(fetcher.max_workers, len(stock_codes))}개)\n")
+    results = run_batch(fetcher, stock_codes)
 
-        if filename is None:
-            filename = f"stock_{stock_code}.csv"
+    failed = [code for code in stock_codes if not results.get(code)]
+    print("\n=== 배치 결과 ===")
+    for code in stock_codes:
+        print(f"{code}: {'성공' if results.get(code) else '실패'}")
+    print(f"성공 {len(stock_codes) - len(failed)}개 / 실패 {len(failed)}개")
 
-        # data 폴더 안에 저장
-        filepath = os.path.join(self.data_dir, filename)
+    if failed:
+        sys.exit(1)
 
-        try:
-            # 기존 파일이 있으면 읽기
-            existing_data = []
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
-                    reader = csv.DictReader(f)
-                    existing_data = list(reader)
-
-            # 기존 데이터와 새 데이터 병합 (날짜를 키로 사용)
-            data_dict = {}
-            for item in existing_data:
-                data_dict[item['날짜']] = item
-
-            # 새 데이터로 업데이트 (같은 날짜면 덮어쓰기)
-            for item in new_data_list:
-                data_dict[item['날짜']] = item
-
-            # 리스트로 변환 후 날짜 역순 정렬 (최신 날짜가 위)
-            merged_data = sorted(data_dict.values(), key=lambda x: x['날짜'], reverse=True)
-
-            # 이동평균 계산 (자르기 전에 먼저 계산)
-            merged_data = self.calculate_moving_averages(merged_data)
-
-            # 최근 20일 데이터만 유지 (MA 계산 후)
-            merged_data = merged_data[:20]
-
-            # 파일에 저장
-            if merged_data:
-                with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=merged_data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(merged_data)
-
-                print(f"CSV 파일 저장 완료: {filepath} (총 {len(merged_data)}개 날짜)")
-        except Exception as e:
-            print(f"CSV 저장 오류: {e}")
+
+def print_usage():
+    """사용법을 출력합니다."""
+    print("사용법:")
+    print("  python stock_fetcher.py <종목코드>                    # 현재가 조회")
+    print("  python stock_fetcher.py <종목코드> --date YYYY-MM-DD  # 특정 날짜 조회")
+    print("  python stock_fetcher.py <종목코드> --history [일수]   # 과거 데이터 조회 (기본 30일)")
+    print("  python stock_fetcher.py --batch [종목코드 ...] [--workers N]  # 여러 종목 일괄 갱신")
+    print("  python stock_fetcher.py --compact [--retention 5y]    # 장기 이력 로그 정리")
+    print("\n예시:")
+    print("  python stock_fetcher.py 005930                        # 삼성전자 현재가")
+    print("  python stock_fetcher.py 005930 --date 2024-12-31      # 2024년 12월 31일 데이터")
+    print("  python stock_fetcher.py 005930 --history 10           # 최근 10일 데이터")
+    print("  python stock_fetcher.py --batch                       # PORTFOLIO.md 관심 종목 전체")
+    print("  python stock_fetcher.py --batch 005930,000660         # 지정 종목 일괄 갱신")
+    print("\n주요 종목 코드:")
+    print("  005930 - 삼성전자")
+    print("  000660 - SK하이닉스")
+    print("  035420 - NAVER")
+    print("  005380 - 현대차")
+    print("  051910 - LG화학")
+    print("\n공통 옵션:")
+    print("  --retention unlimited|90d|5y                          # 장기 이력 저장 (보존 기간)")
+    print("  --offline                                             # 네트워크 없이 캐시된 응답만 사용")
+    print("  --no-cache                                            # HTTP 응답 캐시 사용 안 함")
+    print("  --base-url URL                                        # 요청 주소 재정의 (로컬 재생 서버 등)")
+    print("  --record DIR                                          # 실제 응답을 fixture로 기록")
+    print("  --db PATH                                             # 통합 SQLite 저장소에도 기록")
+    print("  --changes PATH                                        # 변경 피드 경로 (기본 data/kr/changes.jsonl)")
+    print("  --profile PATH                                        # 단계별 시간/바이트/행 수 JSON 보고서 ('-'면 화면)")
+    print("  --cprofile PATH                                       # cProfile 결과(pstats) 저장")
+    print("  --version / --help                                    # 버전 / 사용법 출력")
 
 
 def main():
     """메인 함수"""
-    if len(sys.argv) < 2:
-        print("사용법:")
-        print("  python stock_fetcher.py <종목코드>                    # 현재가 조회")
-        print("  python stock_fetcher.py <종목코드> --date YYYY-MM-DD  # 특정 날짜 조회")
-        print("  python stock_fetcher.py <종목코드> --history [일수]   # 과거 데이터 조회 (기본 30일)")
-        print("\n예시:")
-        print("  python stock_fetcher.py 005930                        # 삼성전자 현재가")
-        print("  python stock_fetcher.py 005930 --date 2024-12-31      # 2024년 12월 31일 데이터")
-        print("  python stock_fetcher.py 005930 --history 10           # 최근 10일 데이터")
-        print("\n주요 종목 코드:")
-        print("  005930 - 삼성전자")
-        print("  000660 - SK하이닉스")
-        print("  035420 - NAVER")
-        print("  005380 - 현대차")
-        print("  051910 - LG화학")
+    args = sys.argv[1:]
+
+    # 버전/도움말은 다른 준비(캐시 폴더, 저장소 등) 없이 바로 출력
+    if '--version' in args:
+        print(f"stock_fetcher {VERSION}")
+        return
+    if '--help' in args or '-h' in args:
+        print_usage()
+        return
+
+    # 위치와 무관한 공통 옵션
+    try:
+        retention = pop_option(args, '--retention')
+        compact = pop_flag(args, '--compact')
+        offline = pop_flag(args, '--offline')
+        no_cache = pop_flag(args, '--no-cache')
+        base_url = pop_option(args, '--base-url')
+        record_dir = pop_option(args, '--record')
+        db_path = pop_option(args, '--db')
+        changes_path = pop_option(args, '--changes', os.path.join(KR_DATA_DIR, "changes.jsonl"))
+        profile_path = pop_option(args, '--profile')
+        cprofile_path = pop_option(args, '--cprofile')
+        if offline and no_cache:
+            raise ValueError("--offline은 캐시를 사용하므로 --no-cache와 함께 쓸 수 없습니다")
+        # 단계별 계측은 항상 모으고, --profile/--cprofile이면 끝날 때 보고서로 씀
+        profile = RunProfile(cprofile=bool(cprofile_path))
+        fetcher_options = {'offline': offline, 'base_url': base_url, 'profile': profile}
+        if db_path:
+            from sqlite_store import SqliteStore
+            fetcher_options['store'] = SqliteStore(db_path)
+        if record_dir:
+            from replay import FixtureRecorder
+            fetcher_options['recorder'] = FixtureRecorder(record_dir)
+        if not no_cache:
+            from http_cache import HttpCache
+            fetcher_options['cache'] = HttpCache(CACHE_DIR)
+        if retention is not None or compact:
+            from history_store import HistoryStore
+            fetcher_options['history'] = HistoryStore(os.path.join(KR_DATA_DIR, "history"), retention)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    # 장기 이력 compaction만 수행
+    if compact:
+        # 실행 중인 fetcher와 겹치지 않게 종목 잠금을 잡고 정리
+        results = fetcher_options['history'].compact_all(lock_dir=KR_DATA_DIR)
+        for code, count in results.items():
+            print(f"{code}: {count}개 일봉 보존")
+        print(f"이력 정리 완료: {len(results)}개 종목 ({fetcher_options['history'].retention})")
+        return
+
+    if len(args) < 1:
+        print_usage()
         sys.exit(1)
 
-    stock_code = sys.argv[1]
-    fetcher = NaverStockFetcher()
+    # 이번 실행에서 바뀐 일봉/신호만 모아 끝날 때 변경 피드로 기록 (실패로 종료해도 기록)
+    from change_feed import ChangeFeed
+    from latest_snapshot import LatestSnapshot
+    changes = fetcher_options['changes'] = ChangeFeed(changes_path, 'kr')
+    # 바뀐 종목만 시장/통합 최신 스냅샷(data/kr/latest.json, data/latest.json)에 반영
+    snapshot = fetcher_options['snapshot'] = LatestSnapshot('kr', KR_DATA_DIR)
+
+    # 통합 저장소를 쓰면 이번 실행에서 받은 일봉을 끝날 때 트랜잭션 하나로 기록
+    store = fetcher_options.get('store')
+    try:
+        with store.batch() if store is not None else contextlib.nullcontext():
+            run_command(args, fetcher_options)
+    finally:
+        count = changes.close()
+        print(f"변경 피드: {changes.path} ({count}건)")
+        count = snapshot.close()
+        print(f"최신 스냅샷: {snapshot.path} ({count}개 종목 갱신)")
+        # WAL 체크포인트 후 연결 종료
+        if store is not None:
+            store.close()
+        if cprofile_path:
+            profile.dump_cprofile(cprofile_path)
+            print(f"cProfile 결과: {cprofile_path}")
+        if profile_path:
+            profile.write_report(profile_path, market='kr', argv=sys.argv[1:])
+            if profile_path != '-':
+                print(f"실행 보고서: {profile_path}")
+
+
+def run_command(args, fetcher_options):
+    """공통 옵션을 꺼낸 나머지 인자로 배치/날짜/과거/현재가 조회를 실행합니다."""
+    # 배치 모드: 여러 종목을 한 프로세스에서 갱신
+    if args[0] == '--batch':
+        batch_main(args[1:], fetcher_options)
+        return
+
+    stock_code = args[0]
+    fetcher = NaverStockFetcher(**fetcher_options)
 
     # 특정 날짜 조회
-    if len(sys.argv) >= 4 and sys.argv[2] == '--date':
-        target_date = sys.argv[3]
+    if len(args) >= 3 and args[1] == '--date':
+        target_date = args[2]
         print(f"종목 코드 {stock_code}의 {target_date} 정보를 가져오는 중...")
 
-        stock_data = fetcher.fetch_historical_data(stock_code, target_date=target_date, days=100)
+        # 휴장일이면 네트워크 요청 없이 종료, 거래일이면 해당 날짜까지 필요한 만큼만 요청
+        try:
+            is_session = fetcher.calendar.is_session(target_date)
+        except ValueError:
+            print("날짜 형식(YYYY-MM-DD)이 올바르지 않습니다.")
+            sys.exit(1)
+        if not is_session:
+            print(f"{target_date}은(는) 휴장일(주말/공휴일)입니다.")
+            sys.exit(1)
+        days = fetcher.calendar.sessions_since(target_date)
+        if days == 0:
+            print(f"{target_date}의 시세가 아직 없습니다.")
+            sys.exit(1)
+
+        stock_data = fetcher.fetch_historical_data(stock_code, target_date=target_date, days=days)
 
         if stock_data:
-            # JSON과 CSV로 저장 (먼저 저장해야 MA가 계산됨)
-            fetcher.save_to_json(stock_data)
-            fetcher.save_to_csv(stock_data)
-
-            # MA 정보와 함께 출력 (파일에서 읽어옴)
-            filepath = os.path.join(fetcher.data_dir, f"stock_{stock_code}.json")
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    saved_data = json.load(f)
-                    # 해당 날짜 데이터 찾기
-                    target_data = None
-                    for item in saved_data:
-                        if item['날짜'] == target_date:
-                            target_data = item
-                            break
-
-                    if target_data:
-                        print("\n=== 주식 정보 ===")
-                        for key, value in target_data.items():
-                            print(f"{key}: {value}")
+            # JSON과 CSV로 저장 (저장된 시계열에서 MA 포함 데이터 출력)
+            saved_data = fetcher.save(stock_data) or []
+            target_data = next((item for item in saved_data if item.date == target_date), None)
+
+            if target_data:
+                print("\n=== 주식 정보 ===")
+                for key, value in to_kr_row(target_data, fetcher.ma_windows).items():
+                    print(f"{key}: {value}")
         else:
             print(f"{target_date}의 주식 정보를 가져오는데 실패했습니다.")
             print("주말이나 공휴일이 아닌지, 날짜 형식(YYYY-MM-DD)이 올바른지 확인해주세요.")
             sys.exit(1)
 
     # 과거 데이터 조회
-    elif len(sys.argv) >= 3 and sys.argv[2] == '--history':
-        days = int(sys.argv[3]) if len(sys.argv) >= 4 else 30
+    elif len(args) >= 2 and args[1] == '--history':
+        days = int(args[2]) if len(args) >= 3 else 30
         print(f"종목 코드 {stock_code}의 최근 {days}일 데이터를 가져오는 중...")
 
-        stock_data = fetcher.fetch_historical_data(stock_code, days=days)
-
-        if stock_data and len(stock_data) > 0:
-            # JSON과 CSV로 저장 (기존 파일에 병합, MA 계산 포함)
-            fetcher.save_to_json(stock_data)
-            fetcher.save_to_csv(stock_data)
-
-            # MA 정보와 함께 출력 (파일에서 읽어옴)
-            filepath = os.path.join(fetcher.data_dir, f"stock_{stock_code}.json")
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    saved_data = json.load(f)
-
-                    print(f"\n=== 최근 {len(saved_data)}일 주식 정보 (최근 10개) ===")
-                    # 최신 10개만 출력
-                    for data in saved_data[:10]:
-                        ma_info = ""
-                        if 'MA5' in data and data['MA5'] != 'N/A':
-                            ma_info = f" | MA5: {data['MA5']}, MA10: {data['MA10']}, MA20: {data['MA20']}"
-                        print(f"{data['날짜']}: 시가 {data['시가']}, 고가 {data['고가']}, 저가 {data['저가']}, 종가 {data['종가']}, 거래량 {data['거래량']}{ma_info}")
-
-                    if len(saved_data) > 10:
-                        print(f"... (총 {len(saved_data)}개 데이터)")
-                    print()
+        # 응답을 스트리밍으로 파싱해 장기 이력/통합 저장소에 바로 기록하고 JSON/CSV는 최근 일봉만 병합
+        stock_data = fetcher.backfill(stock_code, days)
+
+        if stock_data:
+            saved_data = [to_kr_row(item, fetcher.ma_windows) for item in stock_data]
+
+            print(f"\n=== 최근 {len(saved_data)}일 주식 정보 (최근 10개) ===")
+            # 최신 10개만 출력
+            for data in saved_data[:10]:
+                ma_info = ""
+                if 'MA5' in data and data['MA5'] != 'N/A':
+                    ma_info = f" | MA5: {data['MA5']}, MA10: {data['MA10']}, MA20: {data['MA20']}"
+                print(f"{data['날짜']}: 시가 {data['시가']}, 고가 {data['고가']}, 저가 {data['저가']}, 종가 {data['종가']}, 거래량 {data['거래량']}{ma_info}")
+
+            if len(saved_data) > 10:
+                print(f"... (총 {len(saved_data)}개 데이터)")
+            print()
         else:
             print("주식 정보를 가져오는데 실패했습니다.")
             sys.exit(1)
 
     # 현재가 조회 (기본)
     else:
-        print(f"종목 코드 {stock_code}의 정보를 가져오는 중...")
-
-        # 파일 존재 여부 확인 및 자동 초기화
-        filepath = os.path.join(fetcher.data_dir, f"stock_{stock_code}.json")
-        needs_init = False
-        needs_gap_fill = False
-        today_str = datetime.now().strftime("%Y-%m-%d")
-
-        if not os.path.exists(filepath):
-            needs_init = True
-            print(f"\n새 종목입니다. 최근 20일(워킹데이) 데이터를 먼저 수집합니다...")
-        else:
-            # 기존 데이터 확인
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing = json.load(f)
-                    if len(existing) < 20:
-                        needs_init = True
-                        print(f"\n기존 데이터({len(existing)}일)가 부족합니다. 20일 데이터를 수집합니다...")
-                    elif existing[0]['날짜'] != today_str:
-                        # 최신 데이터가 오늘이 아니면 gap이 있을 수 있음
-                        needs_gap_fill = True
-                        print(f"\n마지막 업데이트: {existing[0]['날짜']}")
-                        print(f"누락된 데이터를 확인하기 위해 최근 10일 데이터를 수집합니다...")
-            except:
-                needs_init = True
-                print(f"\n데이터 파일에 문제가 있습니다. 20일 데이터를 다시 수집합니다...")
-
-        # 자동 초기화: 20 워킹데이 수집
-        if needs_init:
-            historical_data = fetcher.fetch_historical_data(stock_code, days=20)
-            if historical_data:
-                fetcher.save_to_json(historical_data)
-                fetcher.save_to_csv(historical_data)
-                print(f"초기 데이터 수집 완료 ({len(historical_data)}일)\n")
-            else:
-                print("경고: 과거 데이터 수집에 실패했습니다. 현재가만 조회합니다.\n")
-        # Gap 메우기: 최근 10일 데이터를 가져와서 기존 데이터와 비교
-        elif needs_gap_fill:
-            historical_data = fetcher.fetch_historical_data(stock_code, days=10)
-            if historical_data:
-                # 기존 파일 읽기
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    existing_dates = set(item['날짜'] for item in existing_data)
-
-                # 새로운 날짜만 찾기
-                new_dates = [item['날짜'] for item in historical_data if item['날짜'] not in existing_dates]
-
-                if new_dates:
-                    # 새로운 데이터가 있으면 병합
-                    fetcher.save_to_json(historical_data)
-                    fetcher.save_to_csv(historical_data)
-                    print(f"누락 데이터 보완 완료: {len(new_dates)}일 추가됨\n")
-                else:
-                    # 새로운 데이터가 없으면 이미 최신 상태
-                    print(f"데이터가 이미 최신 상태입니다.\n")
-
-        stock_data = fetcher.fetch_stock_info(stock_code)
-
-        if stock_data:
-            print("\n=== 주식 정보 ===")
-            for key, value in stock_data.items():
-                print(f"{key}: {value}")
-
-            # JSON과 CSV로 저장
-            fetcher.save_to_json(stock_data)
-            fetcher.save_to_csv(stock_data)
-
-            # MA 정보 출력 (파일에서 읽어옴)
-            filepath = os.path.join(fetcher.data_dir, f"stock_{stock_code}.json")
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    saved_data = json.load(f)
-                    # 오늘 날짜 데이터 찾기
-                    today_data = None
-                    for item in saved_data:
-                        if item['날짜'] == stock_data['날짜']:
-                            today_data = item
-                            break
-
-                    if today_data and 'MA5' in today_data:
-                        print(f"\n=== 이동평균 ===")
-                        print(f"MA5: {today_data.get('MA5', 'N/A')}")
-                        print(f"MA10: {today_data.get('MA10', 'N/A')}")
-                        print(f"MA20: {today_data.get('MA20', 'N/A')}")
-        else:
-            print("주식 정보를 가져오는데 실패했습니다.")
+        if not update_stock(fetcher, stock_code):
             sys.exit(1)
 
 
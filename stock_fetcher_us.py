@@ -1,175 +1,309 @@
 #!/usr/bin/env python3
 """
 US 주식 정보를 Yahoo Finance에서 수집하는 스크립트
+
+응답 캐시/장기 이력 저장소와 스레드 풀은 실제로 쓰는 함수 안에서, requests는 transport가 첫 요청 때
+import합니다 (캐시만 쓰는 실행은 requests를 읽지 않고, --version/--help는 최상위 import만으로 끝남).
 """
+from __future__ import annotations
+
+import contextlib
+import functools
 import json
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable
+
+from atomic_file import file_lock, write_if_changed
+from cli_options import VERSION, pop_flag, pop_option
+from indicator_state import captured_at, merge_bars, state_path
+from indicators import DEFAULT_MA_WINDOWS
+from run_profile import RunProfile
+from stock_record import StockBar, from_us_row, to_us_row
+from trading_calendar import NYSE
+from transport import Transport
+
+if TYPE_CHECKING:
+    from history_store import HistoryStore
+    from http_cache import HttpCache
+
+# 워치리스트 동시 조회 기본 워커 수
+DEFAULT_MAX_WORKERS = 8
 
-import requests
+# Yahoo chart API range 값과 포함되는 대략적인 거래일 수 (작은 것부터)
+YAHOO_RANGES = (('5d', 5), ('1mo', 21), ('3mo', 63), ('6mo', 126), ('1y', 252),
+                ('2y', 504), ('5y', 1260), ('10y', 2520))
+
+# 과거 일봉 채우기(--backfill)에서 요청 한 번에 받을 기간 (달력 일수, 약 500 거래일)
+BACKFILL_CHUNK_DAYS = 730
+
+# data/us 폴더: 스크립트 위치 기준으로 설정 (미국 주식)
+US_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "us")
+
+# Yahoo Finance 기본 주소 (--base-url 또는 STOCK_TRACKER_BASE_URL 환경변수로 재정의)
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com"
+
+# HTTP 응답 캐시 폴더 (git 제외)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http")
+# 장중에 받은 차트 응답의 캐시 TTL (초) - 과거 일봉은 그대로이고 당일 일봉만 바뀜
+# (장 마감 후에 받은 응답은 다음 장 시작까지 사용)
+CHART_CACHE_TTL = 5 * 60
 
 
 class YahooStockFetcher:
-    def __init__(self):
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 ma_windows: tuple[int, ...] = DEFAULT_MA_WINDOWS,
+                 history: HistoryStore | None = None,
+                 cache: HttpCache | None = None,
+                 offline: bool = False,
+                 base_url: str | None = None,
+                 data_dir: str | None = None,
+                 recorder=None,
+                 transport: Transport | None = None,
+                 store=None,
+                 changes=None,
+                 profile: RunProfile | None = None,
+                 snapshot=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        # data/us 폴더: 스크립트 위치 기준으로 설정 (미국 주식)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.data_dir = os.path.join(script_dir, "data", "us")
+        self.max_workers = max(1, max_workers)
+        # base_url을 지정하면 해당 주소로 요청 (로컬 재생 서버 등)
+        base_url = (base_url or os.environ.get('STOCK_TRACKER_BASE_URL') or '').rstrip('/')
+        self.base_url = base_url or YAHOO_CHART_URL
+        # 계산할 이동평균 윈도우 (예: (5, 10, 20, 60, 120))
+        self.ma_windows = tuple(ma_windows)
+
+        # 모든 요청이 하나의 keep-alive 커넥션 풀을 공유 (티커마다 TLS 핸드셰이크 방지)하고
+        # 호스트별 속도 제한, 타임아웃, 재시도, circuit breaker를 거침 (transport.Transport)
+        self.transport = transport or Transport(self.headers, pool_size=self.max_workers)
+
+        self.data_dir = data_dir or US_DATA_DIR
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
+        # 장기 이력 저장소 (None이면 JSON의 최근 20일만 유지)
+        self.history = history
+        # 국내/미국 통합 SQLite 저장소 (sqlite_store.SqliteStore, None이면 사용 안 함)
+        self.store = store
+        # 이번 실행의 변경 피드 (change_feed.ChangeFeed, None이면 기록 안 함)
+        self.changes = changes
+        # 시장 최신 스냅샷 (latest_snapshot.LatestSnapshot, None이면 갱신 안 함)
+        self.snapshot = snapshot
+        # 단계별 시간/바이트/행 수 계측 (--profile 보고서)
+        self.profile = profile or RunProfile()
+        # 거래일 판정 (누락 거래일 계산, 휴장일 데이터 저장 방지)
+        self.calendar = NYSE
+        # HTTP 응답 캐시 (None이면 캐시 없음) / offline이면 캐시만 사용
+        self.cache = cache
+        self.offline = offline
+        # 실제 응답을 fixture로 기록 (replay.FixtureRecorder, None이면 기록 안 함)
+        self.recorder = recorder
+        # load_saved로 읽은 시점의 저장 파일 상태 {티커: (수정 시각, 크기)}
+        self._loaded: dict[str, tuple[int, int] | None] = {}
+
+    def _get(self, url: str, params: dict | None = None, code: str | None = None,
+             ttl: int = CHART_CACHE_TTL):
+        """
+        공유 전송 계층으로 GET 요청합니다. 캐시가 있으면 저장 시각의 장 운영 상태로 정한 만료 시각까지 캐시를 먼저 사용합니다.
 
-    def fetch_stock_info(self, ticker: str) -> dict | None:
+        ttl은 장중에 받은 응답의 캐시 TTL(초)로, 엔드포인트별로 넘깁니다.
+        """
+        started = perf_counter()
+        if self.cache is None:
+            response = self.transport.get(url, params)
+        else:
+            response = self.cache.fetch(self.transport, url, params, ttl=ttl, offline=self.offline,
+                                        calendar=self.calendar)
+        if self.recorder is not None and not getattr(response, 'from_cache', False):
+            self.recorder.record(url, params, response)
+        self.profile.add('cache' if getattr(response, 'from_cache', False) else 'network', code,
+                         perf_counter() - started, nbytes=len(response.content))
+        return response
+
+    def fetch_stock_info(self, ticker: str, sessions: int | None = None) -> dict | None:
         """
         Yahoo Finance에서 주식 정보를 가져옵니다.
 
         Args:
             ticker: 주식 티커 (예: AAPL, NVDA)
+            sessions: 필요한 최근 거래일 수 (None이면 1개월)
 
         Returns:
             주식 정보 딕셔너리 또는 None
         """
         try:
-            # Yahoo Finance API 엔드포인트
-            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
-            params = {
-                'range': '1mo',
-                'interval': '1d',
-                'includePrePost': 'false'
-            }
-
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-
-            if 'chart' not in data or 'result' not in data['chart'] or not data['chart']['result']:
-                print(f"Error: No data found for {ticker}")
-                return None
-
-            result = data['chart']['result'][0]
-            meta = result['meta']
-            timestamps = result['timestamp']
-            indicators = result['indicators']['quote'][0]
-
-            # 최근 거래일 데이터 추출
-            stock_data = []
-            for i in range(len(timestamps)):
-                ts = timestamps[i]
-                date = datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
-
-                open_price = indicators['open'][i]
-                high = indicators['high'][i]
-                low = indicators['low'][i]
-                close = indicators['close'][i]
-                volume = indicators['volume'][i]
-
-                if close is None:
-                    continue
-
-                stock_data.append({
-                    'date': date,
-                    'open': round(open_price, 2) if open_price else None,
-                    'high': round(high, 2) if high else None,
-                    'low': round(low, 2) if low else None,
-                    'close': round(close, 2) if close else None,
-                    'volume': volume
-                })
-
-            # MA 계산
-            closes = [d['close'] for d in stock_data if d['close'] is not None]
-            volumes = [d['volume'] for d in stock_data if d['volume'] is not None]
-
-            for i, d in enumerate(stock_data):
-                if d['close'] is None:
-                    continue
-
-                # 최신 데이터 기준으로 인덱스 계산 (stock_data는 오래된 순)
-                idx = len(stock_data) - 1 - i
-                recent_closes = closes[-(idx+1):] if idx + 1 <= len(closes) else closes
-
-                # MA5
-                if len(recent_closes) >= 5:
-                    ma5 = sum(recent_closes[-5:]) / 5
-                    d['MA5'] = round(ma5, 2)
-                else:
-                    d['MA5'] = None
+            return self._fetch_chart(ticker, sessions)
+        except LookupError as e:
+            print(f"Error: {e}")
+            return None
+        except OSError as e:
+            # requests.RequestException, CacheMiss, CircuitOpenError 모두 OSError 하위 클래스
+            print(f"Error fetching {ticker}: {e}")
+            return None
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Error parsing {ticker} data: {e}")
+            return None
 
-                # MA10
-                if len(recent_closes) >= 10:
-                    ma10 = sum(recent_closes[-10:]) / 10
-                    d['MA10'] = round(ma10, 2)
-                else:
-                    d['MA10'] = None
+    def _period_params(self, start: date, end: date) -> dict:
+        """
+        start~end(양끝 포함) 거래일을 요청하는 period1/period2 파라미터를 만듭니다.
 
-                # MA20
-                if len(recent_closes) >= 20:
-                    ma20 = sum(recent_closes[-20:]) / 20
-                    d['MA20'] = round(ma20, 2)
-                else:
-                    d['MA20'] = None
-
-            # 역순 정렬 (최신 데이터가 먼저)
-            stock_data.reverse()
-
-            # MA 재계산 (역순 정렬 후)
-            closes_reversed = [d['close'] for d in reversed(stock_data) if d['close'] is not None]
-            for i, d in enumerate(stock_data):
-                if d['close'] is None:
-                    continue
-
-                # 현재 인덱스 기준으로 과거 데이터 추출
-                # stock_data[0]이 최신, stock_data[-1]이 가장 오래됨
-                # closes_reversed[0]이 가장 오래됨, closes_reversed[-1]이 최신
-                # 현재 위치에서 과거 데이터만 사용해야 함
-                end_idx = len(closes_reversed) - i
-                recent_closes = closes_reversed[:end_idx]
-
-                # MA5
-                if len(recent_closes) >= 5:
-                    ma5 = sum(recent_closes[-5:]) / 5
-                    d['MA5'] = round(ma5, 2)
-                else:
-                    d['MA5'] = None
+        거래소 시간대 자정 기준이므로 같은 기간은 하루 동안 같은 URL이 되어 응답 캐시를 그대로 씁니다.
+        """
+        period1 = datetime.combine(start, time(0), self.calendar.tz)
+        period2 = datetime.combine(end + timedelta(days=1), time(0), self.calendar.tz)
+        return {'period1': str(int(period1.timestamp())), 'period2': str(int(period2.timestamp()))}
 
-                # MA10
-                if len(recent_closes) >= 10:
-                    ma10 = sum(recent_closes[-10:]) / 10
-                    d['MA10'] = round(ma10, 2)
-                else:
-                    d['MA10'] = None
+    def _fetch_chart(self, ticker: str, sessions: int | None = None,
+                     start: date | None = None, end: date | None = None) -> dict:
+        """
+        차트 API를 호출하고 응답을 파싱합니다. 실패 시 예외를 그대로 전달합니다.
 
-                # MA20
-                if len(recent_closes) >= 20:
-                    ma20 = sum(recent_closes[-20:]) / 20
-                    d['MA20'] = round(ma20, 2)
-                else:
-                    d['MA20'] = None
+        Args:
+            ticker: 주식 티커
+            sessions: 필요한 최근 거래일 수 (이를 포함하는 가장 작은 range로 요청)
+            start: 지정하면 range 대신 start~end 기간만 요청 (period1/period2)
+            end: 기간의 마지막 날짜 (None이면 현재 거래일)
+
+        Raises:
+            LookupError: 응답에 차트 데이터가 없는 경우
+            OSError: 네트워크/HTTP 오류 (requests.RequestException, CacheMiss, CircuitOpenError)
+        """
+        # Yahoo Finance API 엔드포인트
+        url = f"{self.base_url}/v8/finance/chart/{ticker}"
+        if start is not None:
+            params = self._period_params(start, end or self.calendar.current_session())
+        else:
+            params = {'range': choose_range(sessions) if sessions else '1mo'}
+        params.update({'interval': '1d', 'includePrePost': 'false'})
+
+        response = self._get(url, params, code=ticker, ttl=CHART_CACHE_TTL)
+        response.raise_for_status()
+
+        with self.profile.stage('parse', ticker) as counts:
+            stock_info = self._parse_chart(ticker, response.json())
+            counts['rows'] = len(stock_info['data'])
+        # 응답을 받은 시각 (캐시 응답이면 원래 받은 시각) - 장중에 받은 일봉을 마감 시세로 취급하지 않도록
+        stored_at = getattr(response, 'stored_at', None)
+        captured = datetime.fromtimestamp(stored_at, self.calendar.tz) if stored_at else self.calendar.now()
+        stock_info['captured_at'] = captured.isoformat(timespec='seconds')
+        return stock_info
+
+    def _parse_chart(self, ticker: str, data: dict) -> dict:
+        """
+        차트 API 응답(JSON)을 주식 정보 딕셔너리로 변환합니다.
+
+        Raises:
+            LookupError: 응답에 차트 데이터가 없는 경우
+        """
+        if 'chart' not in data or 'result' not in data['chart'] or not data['chart']['result']:
+            raise LookupError(f"No data found for {ticker}")
+
+        result = data['chart']['result'][0]
+        meta = result['meta']
+        name = meta.get('shortName', ticker)
+        # 상장 전 기간 등 거래가 없는 기간이면 timestamp가 없음
+        timestamps = result.get('timestamp') or []
+        indicators = result['indicators']['quote'][0]
+
+        # 최근 거래일 데이터 추출
+        stock_data = []
+        for i in range(len(timestamps)):
+            ts = timestamps[i]
+            # 거래소 시간대 기준 날짜 (실행 환경 시간대와 무관)
+            date = datetime.fromtimestamp(ts, self.calendar.tz).strftime('%Y-%m-%d')
+
+            open_price = indicators['open'][i]
+            high = indicators['high'][i]
+            low = indicators['low'][i]
+            close = indicators['close'][i]
+            volume = indicators['volume'][i]
+
+            if close is None or not self.calendar.is_session(date):
+                continue
 
-            return {
-                'ticker': ticker,
-                'name': meta.get('shortName', ticker),
-                'currency': meta.get('currency', 'USD'),
-                'data': stock_data
-            }
+            stock_data.append(StockBar(
+                ticker, name, date,
+                open=round(open_price, 2) if open_price else None,
+                high=round(high, 2) if high else None,
+                low=round(low, 2) if low else None,
+                close=round(close, 2),
+                volume=int(volume) if volume is not None else None,
+            ))
+
+        # 역순 정렬 (최신 데이터가 먼저)
+        stock_data.reverse()
+
+        return {
+            'ticker': ticker,
+            'name': name,
+            'currency': meta.get('currency', 'USD'),
+            'first_trade_date': meta.get('firstTradeDate'),
+            'data': stock_data
+        }
 
-        except requests.RequestException as e:
-            print(f"Error fetching {ticker}: {e}")
+    def load_saved(self, ticker: str) -> list[StockBar]:
+        """
+        저장된 JSON 데이터를 읽습니다.
+
+        Returns:
+            StockBar 리스트 (최신 날짜가 위), 파일이 없거나 손상되었으면 빈 리스트
+        """
+        file_path = os.path.join(self.data_dir, f"stock_{ticker}.json")
+        self._loaded[ticker] = self._saved_signature(ticker)
+        if not os.path.exists(file_path):
+            return []
+        with self.profile.stage('load', ticker) as counts:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    existing_data = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                return []
+            bars = [from_us_row(d) for d in existing_data]
+            bars.sort(key=lambda x: x.date, reverse=True)
+            counts['rows'] = len(bars)
+        return bars
+
+    def _state_path(self, ticker: str) -> str:
+        """티커별 지표 상태 파일 경로 (data/us/state/stock_<티커>.json)"""
+        return state_path(self.data_dir, ticker)
+
+    def _history_loader(self, ticker: str) -> Callable[[], list[StockBar]] | None:
+        """지표를 다시 계산할 때 쓸 장기 이력 로더 (장기 이력을 쓰지 않으면 None)"""
+        if self.history is None:
             return None
-        except (KeyError, IndexError, TypeError) as e:
-            print(f"Error parsing {ticker} data: {e}")
+        return lambda: self.history.load(ticker)
+
+    def is_final_saved(self, ticker: str, day: str) -> bool:
+        """
+        저장된 day 일봉이 장 마감 후 받은 확정 시세인지 확인합니다.
+
+        장중에 받은 일봉이나 받은 시각 기록이 없는 일봉(이전 버전에서 저장)은 False입니다.
+        """
+        captured = captured_at(self._state_path(ticker), day)
+        return captured is not None and self.calendar.is_final(day, now=captured)
+
+    def _saved_signature(self, ticker: str) -> tuple[int, int] | None:
+        """저장 파일의 (수정 시각, 크기) - 읽은 뒤 다른 작업자가 바꿨는지 확인용"""
+        try:
+            stat = os.stat(os.path.join(self.data_dir, f"stock_{ticker}.json"))
+        except OSError:
             return None
+        return stat.st_mtime_ns, stat.st_size
 
-    def save_stock_data(self, ticker: str, stock_info: dict) -> bool:
+    def save_stock_data(self, ticker: str, stock_info: dict, existing: list[StockBar] | None = None,
+                        record: bool = True) -> bool:
         """
-        주식 데이터를 JSON 파일로 저장합니다.
+        주식 데이터를 기존 데이터와 병합하고 이동평균을 계산해 JSON 파일로 저장합니다.
 
         Args:
             ticker: 주식 티커
             stock_info: 주식 정보 딕셔너리
+            existing: 이미 읽어 둔 기존 데이터 (None이면 파일에서 읽음)
+            record: 새 일봉을 장기 이력/통합 저장소에도 기록할지 여부 (backfill은 이미 기록함)
 
         Returns:
             저장 성공 여부
@@ -179,50 +313,191 @@ class YahooStockFetcher:
 
         file_path = os.path.join(self.data_dir, f"stock_{ticker}.json")
 
-        # 기존 데이터 로드
-        existing_data = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                existing_data = []
+        # 같은 티커의 읽기 → 병합 → 쓰기는 다른 스레드/프로세스와 겹치지 않게 잠금
+        with file_lock(os.path.join(self.data_dir, f"stock_{ticker}")):
+            # 기존 데이터 로드 (휴장일로 잘못 저장된 행은 제외) - 없거나 읽은 뒤 다른 작업자가 바꿨으면 다시 읽기
+            if existing is None or self._saved_signature(ticker) != self._loaded.get(ticker):
+                existing = self.load_saved(ticker)
+            new_bars = [bar for bar in stock_info['data'] if bar.close is not None]
+
+            # 장기 이력에는 새 일봉만 덧붙이고 (기존 이력 재작성 없음), 통합 저장소에도 새 일봉만 upsert
+            # (watchlist 갱신 중에는 모았다가 한 트랜잭션으로 기록)
+            if record:
+                self._record(ticker, new_bars)
+
+            # 새 데이터 추가/업데이트 후 날짜 역순 정렬 - MA는 티커별 지표 상태로 새 일봉만 증분 계산
+            # (과거 일봉이 바뀌었을 때만 전체 재계산)
+            with self.profile.stage('merge', ticker) as counts:
+                sorted_data = merge_bars(self._state_path(ticker),
+                                         [bar for bar in existing if self.calendar.is_session(bar.date)],
+                                         new_bars, self.ma_windows,
+                                         load_history=self._history_loader(ticker),
+                                         captured_at=stock_info.get('captured_at'))
+                counts['rows'] = len(sorted_data)
+
+            # 최근 20개만 유지
+            sorted_data = sorted_data[:20]
+            if self.changes is not None:
+                with self.profile.stage('changes', ticker):
+                    self.changes.record(ticker, existing, sorted_data)
+
+            # JSON 저장 (내용이 같으면 다시 쓰지 않음)
+            with self.profile.stage('write', ticker) as counts:
+                rows = [to_us_row(bar, self.ma_windows) for bar in sorted_data]
+                written = write_if_changed(file_path, json.dumps(rows, ensure_ascii=False, indent=2))
+                if written:
+                    counts['rows'] = len(rows)
+                    print(f"Saved {ticker} data to {file_path}")
+                else:
+                    print(f"No changes for {ticker} ({file_path})")
+
+            # 최신 스냅샷은 내용이 바뀐 티커(또는 아직 없는 티커)만 갱신
+            if self.snapshot is not None and (written or ticker not in self.snapshot):
+                with self.profile.stage('snapshot', ticker):
+                    self.snapshot.update(ticker, sorted_data)
+            self._loaded[ticker] = self._saved_signature(ticker)
+            return True
+
+    def _record(self, ticker: str, bars: list[StockBar]):
+        """새 일봉을 장기 이력(추가)과 통합 저장소(upsert)에 기록합니다."""
+        if self.history is None and self.store is None:
+            return
+        with self.profile.stage('record', ticker) as counts:
+            if self.history is not None:
+                self.history.append(ticker, bars)
+            if self.store is not None:
+                self.store.upsert('us', bars)
+            counts['rows'] = len(bars)
+
+    def refresh_watchlist(self, tickers: list[str], max_workers: int | None = None,
+                          task: Callable[[str], dict] | None = None) -> tuple[dict, dict]:
+        """
+        여러 티커를 동시에 조회하고 저장합니다.
 
-        # 기존 데이터를 날짜 기준으로 딕셔너리로 변환
-        existing_by_date = {d['날짜']: d for d in existing_data}
+        스레드 풀 크기만큼 요청이 동시에 진행되고 모두 같은 세션(커넥션 풀)을 사용하므로,
+        전체 소요 시간은 티커 수가 아니라 가장 느린 요청에 의해 결정됩니다.
 
-        # 새 데이터 추가/업데이트
-        for d in stock_info['data']:
-            if d['close'] is None:
-                continue
+        Args:
+            tickers: 티커 리스트
+            max_workers: 동시 요청 수 (None이면 생성 시 지정한 값)
+            task: 티커 하나를 처리하는 함수 (None이면 일일 갱신, backfill 등)
+
+        Returns:
+            (results, failures) - {티커: stock_info}, {티커: 실패 사유}
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        workers = max(1, min(max_workers or self.max_workers, len(tickers) or 1))
+        results = {}
+        failures = {}
+
+        # 통합 저장소를 쓰면 이번 갱신에서 받은 일봉을 끝날 때 트랜잭션 하나로 기록
+        batch = self.store.batch() if self.store is not None else contextlib.nullcontext()
+        with batch, ThreadPoolExecutor(max_workers=workers) as executor:
+            # --cprofile이면 작업 스레드도 측정 (RunProfile.run)
+            futures = {executor.submit(self.profile.run, task or self._refresh_one, ticker): ticker
+                       for ticker in tickers}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    results[ticker] = future.result()
+                except Exception as e:
+                    failures[ticker] = str(e) or e.__class__.__name__
+
+        return results, failures
+
+    def _refresh_one(self, ticker: str) -> dict:
+        """
+        티커 하나를 조회하고 저장합니다. 실패 시 예외를 발생시킵니다.
 
-            record = {
-                '티커': ticker,
-                '종목명': stock_info['name'],
-                '날짜': d['date'],
-                '시가': d['open'],
-                '고가': d['high'],
-                '저가': d['low'],
-                '종가': d['close'],
-                '거래량': d['volume'],
-                'MA5': d.get('MA5'),
-                'MA10': d.get('MA10'),
-                'MA20': d.get('MA20')
-            }
-            existing_by_date[d['date']] = record
+        거래일 달력으로 누락된 거래일을 계산해 그 기간만 period1/period2로 요청하고, 마지막 거래일의
+        마감 데이터(장 마감 후 받은 일봉)가 이미 저장되어 있으면 네트워크 요청 없이 저장된 데이터를
+        반환합니다. 저장된 데이터가 20일 미만이면 최근 1개월을 받습니다.
+        """
+        existing = self.load_saved(ticker)
+        start = None
+        if len(existing) >= 20:
+            latest = existing[0].date
+            missing = self.calendar.missing_sessions(latest)
+            if not self.is_final_saved(ticker, latest):
+                # 장중이거나 장중에 받은 일봉: 그 날짜부터 다시 받아 확정 시세로 교체
+                start = date.fromisoformat(latest)
+            elif missing:
+                start = missing[0]
+            else:
+                return {
+                    'ticker': ticker,
+                    'name': existing[0].name,
+                    'currency': 'USD',
+                    'data': existing,
+                    'up_to_date': True,
+                }
+
+        stock_info = self._fetch_chart(ticker, start=start)
+        if not self.save_stock_data(ticker, stock_info, existing):
+            raise RuntimeError(f"Failed to save {ticker}")
+        return stock_info
+
+    def backfill(self, ticker: str, start: date | None = None, chunk_days: int = BACKFILL_CHUNK_DAYS) -> dict:
+        """
+        여러 해의 일봉을 최근 기간부터 chunk_days씩 나눠 요청하고, 받는 대로 장기 이력/통합 저장소에 기록합니다.
 
-        # 날짜 기준 정렬 (최신순)
-        sorted_data = sorted(existing_by_date.values(), key=lambda x: x['날짜'], reverse=True)
+        JSON 파일에는 가장 최근 기간의 일봉을 기존 데이터와 병합해 최근 20일만 저장합니다.
+        메모리에는 한 기간 분량만 유지합니다.
 
-        # 최근 20개만 유지
-        sorted_data = sorted_data[:20]
+        Args:
+            ticker: 주식 티커
+            start: 가장 오래된 날짜 (None이면 상장일까지)
+            chunk_days: 요청 한 번의 기간 (달력 일수)
 
-        # JSON 저장
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(sorted_data, f, ensure_ascii=False, indent=2)
+        Returns:
+            최근 기간의 주식 정보 딕셔너리 ('backfilled': 받은 일봉 수)
 
-        print(f"Saved {ticker} data to {file_path}")
-        return True
+        Raises:
+            LookupError / OSError: 첫 요청(최근 기간)이 실패한 경우
+        """
+        end = self.calendar.current_session()
+        latest_info = None
+        count = 0
+        while start is None or end >= start:
+            chunk_start = end - timedelta(days=chunk_days - 1)
+            if start is not None:
+                chunk_start = max(chunk_start, start)
+            stock_info = self._fetch_chart(ticker, start=chunk_start, end=end)
+            # 요청 기간 밖의 일봉은 인접 기간에서 받으므로 제외
+            bars = [bar for bar in stock_info['data']
+                    if chunk_start.isoformat() <= bar.date <= end.isoformat()]
+            if not bars:
+                break
+            with file_lock(os.path.join(self.data_dir, f"stock_{ticker}")):
+                self._record(ticker, bars)
+            if self.store is not None:
+                # 받은 기간마다 바로 기록 (배치 중에도 모아 두지 않음)
+                with self.profile.stage('record', ticker):
+                    self.store.flush()
+            count += len(bars)
+            if latest_info is None:
+                latest_info = dict(stock_info, data=bars)
+
+            end = chunk_start - timedelta(days=1)
+            # 상장일 이전은 요청하지 않음
+            first_trade = stock_info.get('first_trade_date')
+            if first_trade and end < datetime.fromtimestamp(first_trade, self.calendar.tz).date():
+                break
+
+        if latest_info is None:
+            raise LookupError(f"No data found for {ticker}")
+        if not self.save_stock_data(ticker, latest_info, record=False):
+            raise RuntimeError(f"Failed to save {ticker}")
+        return dict(latest_info, backfilled=count)
+
+
+def choose_range(sessions: int) -> str:
+    """필요한 거래일 수를 포함하는 가장 작은 Yahoo range 값을 반환합니다."""
+    for range_value, count in YAHOO_RANGES:
+        if sessions <= count:
+            return range_value
+    return 'max'
 
 
 def extract_us_watchlist(portfolio_path: str = "docs/us/PORTFOLIO_US.md") -> list[str]:
@@ -266,37 +541,172 @@ def extract_us_watchlist(portfolio_path: str = "docs/us/PORTFOLIO_US.md") -> lis
     return tickers
 
 
+def print_latest(ticker: str, stock_info: dict):
+    """최신 거래일 데이터를 출력합니다."""
+    if not stock_info['data']:
+        return
+    latest = to_us_row(stock_info['data'][0], (5, 10, 20))
+    print(f"  {stock_info['name']} ({ticker})")
+    print(f"  Date: {latest['날짜']}")
+    print(f"  Close: ${latest['종가']}")
+    print(f"  MA5: {latest['MA5'] or 'N/A'}")
+    print(f"  MA10: {latest['MA10'] or 'N/A'}")
+    print(f"  MA20: {latest['MA20'] or 'N/A'}")
+
+
+def print_usage():
+    """사용법을 출력합니다."""
+    print("Usage: python stock_fetcher_us.py [TICKER ...] [options]")
+    print("  Without tickers, the watchlist in docs/us/PORTFOLIO_US.md is used.")
+    print("\nOptions:")
+    print("  --workers N                    # concurrent requests (default 8)")
+    print("  --retention unlimited|90d|5y   # keep long-term history (retention period)")
+    print("  --compact                      # compact the long-term history logs only")
+    print("  --offline                      # use cached responses only, no network")
+    print("  --no-cache                     # disable the HTTP response cache")
+    print("  --base-url URL                 # override the request host (local replay server etc.)")
+    print("  --record DIR                   # record real responses as fixtures")
+    print("  --db PATH                      # also write to the consolidated SQLite store")
+    print("  --backfill unlimited|90d|5y    # fetch past bars in chunks into --retention/--db storage")
+    print("  --changes PATH                 # change feed of new/modified bars and signal events")
+    print("                                 # (default data/us/changes.jsonl)")
+    print("  --profile PATH                 # per-stage time/bytes/rows JSON run report ('-' for stdout)")
+    print("  --cprofile PATH                # save cProfile stats (pstats)")
+    print("  --version / --help             # print version / usage")
+
+
 def main():
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+
+    # 버전/도움말은 다른 준비(캐시 폴더, 저장소 등) 없이 바로 출력
+    if '--version' in args:
+        print(f"stock_fetcher_us {VERSION}")
+        return
+    if '--help' in args or '-h' in args:
+        print_usage()
+        return
+
+    try:
+        # --workers N: 동시 요청 수
+        max_workers = pop_option(args, '--workers', DEFAULT_MAX_WORKERS, int)
+        # --retention SPEC: 장기 이력 저장 (unlimited, 90d, 5y)
+        retention = pop_option(args, '--retention')
+        compact = pop_flag(args, '--compact')
+        # --offline: 캐시된 응답만 사용 / --no-cache: 캐시 사용 안 함
+        offline = pop_flag(args, '--offline')
+        no_cache = pop_flag(args, '--no-cache')
+        # --base-url URL: 요청 주소 재정의 / --record DIR: 실제 응답을 fixture로 기록
+        base_url = pop_option(args, '--base-url')
+        record_dir = pop_option(args, '--record')
+        # --db PATH: 국내/미국 통합 SQLite 저장소에도 기록
+        db_path = pop_option(args, '--db')
+        # --backfill SPEC: 과거 일봉 채우기 (unlimited, 90d, 5y)
+        backfill = pop_option(args, '--backfill')
+        # --changes PATH: 이번 실행에서 바뀐 일봉/신호만 모은 변경 피드
+        changes_path = pop_option(args, '--changes', os.path.join(US_DATA_DIR, "changes.jsonl"))
+        # --profile PATH: 단계별 시간/바이트/행 수 JSON 보고서 / --cprofile PATH: cProfile 결과 저장
+        profile_path = pop_option(args, '--profile')
+        cprofile_path = pop_option(args, '--cprofile')
+        if offline and no_cache:
+            raise ValueError("--offline requires the cache; do not combine it with --no-cache")
+        history = None
+        if retention is not None or compact:
+            from history_store import HistoryStore
+            history = HistoryStore(os.path.join(US_DATA_DIR, "history"), retention)
+        backfill_start = None
+        if backfill is not None:
+            from history_store import Retention
+            try:
+                cutoff = Retention.parse(backfill).cutoff(NYSE.current_session().isoformat())
+            except ValueError:
+                raise ValueError(f"Invalid --backfill value: {backfill} (e.g. unlimited, 90d, 5y)")
+            backfill_start = date.fromisoformat(cutoff) if cutoff else None
+    except ValueError as e:
+        print(e)
+        print("Usage: python stock_fetcher_us.py [TICKER ...] [--workers N] [--retention SPEC] [--compact]"
+              " [--offline | --no-cache] [--base-url URL] [--record DIR] [--db PATH] [--backfill SPEC]"
+              " [--changes PATH] [--profile PATH] [--cprofile PATH]")
+        sys.exit(1)
+
+    # 장기 이력 compaction만 수행
+    if compact:
+        # 실행 중인 fetcher와 겹치지 않게 티커 잠금을 잡고 정리
+        results = history.compact_all(lock_dir=US_DATA_DIR)
+        for ticker, count in results.items():
+            print(f"{ticker}: {count} bars kept")
+        print(f"Compacted {len(results)} tickers ({history.retention})")
+        return
+
+    if not args:
         # 인수 없으면 PORTFOLIO_US.md에서 읽기
         tickers = extract_us_watchlist()
         if not tickers:
             print("No tickers found. Please provide ticker as argument or check PORTFOLIO_US.md")
             sys.exit(1)
     else:
-        tickers = [sys.argv[1].upper()]
-
-    fetcher = YahooStockFetcher()
-
-    for ticker in tickers:
-        print(f"\nFetching {ticker}...")
-        stock_info = fetcher.fetch_stock_info(ticker)
-
-        if stock_info:
-            fetcher.save_stock_data(ticker, stock_info)
-
-            # 최신 데이터 출력
-            if stock_info['data']:
-                latest = stock_info['data'][0]
-                print(f"  {stock_info['name']} ({ticker})")
-                print(f"  Date: {latest['date']}")
-                print(f"  Close: ${latest['close']}")
-                print(f"  MA5: {latest.get('MA5', 'N/A')}")
-                print(f"  MA10: {latest.get('MA10', 'N/A')}")
-                print(f"  MA20: {latest.get('MA20', 'N/A')}")
-        else:
-            print(f"Failed to fetch {ticker}")
-
+        # 쉼표 구분 또는 공백 구분 모두 허용 (예: AAPL,NVDA 또는 AAPL NVDA)
+        tickers = [t.strip().upper() for arg in args for t in arg.split(',') if t.strip()]
+
+    from http_cache import HttpCache
+    cache = None if no_cache else HttpCache(CACHE_DIR)
+    recorder = None
+    if record_dir:
+        from replay import FixtureRecorder
+        recorder = FixtureRecorder(record_dir)
+    store = None
+    if db_path:
+        from sqlite_store import SqliteStore
+        store = SqliteStore(db_path)
+    from change_feed import ChangeFeed
+    changes = ChangeFeed(changes_path, 'us')
+    # 바뀐 티커만 시장/통합 최신 스냅샷(data/us/latest.json, data/latest.json)에 반영
+    from latest_snapshot import LatestSnapshot
+    snapshot = LatestSnapshot('us', US_DATA_DIR)
+    profile = RunProfile(cprofile=bool(cprofile_path))
+    fetcher = YahooStockFetcher(max_workers=max_workers, history=history, cache=cache, offline=offline,
+                                base_url=base_url, recorder=recorder, store=store, changes=changes,
+                                profile=profile, snapshot=snapshot)
+
+    task = None
+    if backfill is not None:
+        if history is None and store is None:
+            print("Warning: --backfill without --retention or --db keeps only the latest 20 bars")
+        task = functools.partial(fetcher.backfill, start=backfill_start)
+    print(f"Fetching {len(tickers)} tickers (workers: {min(fetcher.max_workers, len(tickers))})...")
+    results, failures = {}, {}
+    try:
+        results, failures = fetcher.refresh_watchlist(tickers, task=task)
+
+        # 결과는 워치리스트 순서대로 출력
+        for ticker in tickers:
+            if ticker in results:
+                if 'backfilled' in results[ticker]:
+                    print(f"\n{ticker} (backfilled {results[ticker]['backfilled']} bars)")
+                else:
+                    print(f"\n{ticker}" + (" (already up to date, no request)" if results[ticker].get('up_to_date') else ""))
+                print_latest(ticker, results[ticker])
+            else:
+                print(f"\nFailed to fetch {ticker}: {failures.get(ticker)}")
+
+        print(f"\nDone: {len(results)} succeeded, {len(failures)} failed")
+        # 일부 티커라도 실패하면 0이 아닌 종료 코드 (성공한 티커는 이미 저장됨)
+        if failures:
+            sys.exit(1)
+    finally:
+        print(f"Change feed: {changes.path} ({changes.close()} entries)")
+        print(f"Latest snapshot: {snapshot.path} ({snapshot.close()} tickers updated)")
+        # WAL 체크포인트 후 연결 종료
+        if store is not None:
+            store.close()
+        if cprofile_path:
+            profile.dump_cprofile(cprofile_path)
+            print(f"cProfile stats: {cprofile_path}")
+        if profile_path:
+            profile.write_report(profile_path, market='us', argv=sys.argv[1:],
+                                 succeeded=len(results), failed=len(failures),
+                                 transport=dict(fetcher.transport.stats))
+            if profile_path != '-':
+                print(f"Run report: {profile_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+국내/미국 주식 일봉 공통 레코드 및 직렬화 모듈
+
+fetcher는 응답을 파싱할 때 한 번만 숫자로 변환해 StockBar를 만들고,
+"160100" / "148,565원" 같은 표시 형식은 이 모듈의 직렬화 함수에서만 만듭니다.
+"""
+
+import json
+import os
+import re
+
+from atomic_file import atomic_write
+
+# 이동평균 컬럼 이름 (예: MA5, MA120)
+MA_KEY_PATTERN = re.compile(r'^MA(\d+)$')
+
+# 국내 주식 파일 컬럼 순서 (MA 컬럼은 뒤에 붙음)
+KR_FIELDS = ['종목코드', '종목명', '날짜', '시가', '고가', '저가', '종가', '거래량']
+
+# 미국 주식 파일 컬럼 순서 (MA 컬럼은 뒤에 붙음)
+US_FIELDS = ['티커', '종목명', '날짜', '시가', '고가', '저가', '종가', '거래량']
+
+
+class StockBar:
+    """
+    하루치 OHLCV 데이터
+
+    가격은 int(국내) 또는 float(미국), 거래량은 int로 저장합니다.
+    ma는 {윈도우: 값} 딕셔너리이며 데이터가 부족한 윈도우는 None입니다.
+    """
+
+    __slots__ = ('code', 'name', 'date', 'open', 'high', 'low', 'close', 'volume', 'ma')
+
+    def __init__(self, code, name, date, open=None, high=None, low=None, close=None,
+                 volume=None, ma=None):
+        self.code = code
+        self.name = name
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.ma = ma if ma is not None else {}
+
+    def __repr__(self):
+        return (f"StockBar({self.code!r}, {self.date!r}, open={self.open!r}, high={self.high!r}, "
+                f"low={self.low!r}, close={self.close!r}, volume={self.volume!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, StockBar):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+
+def parse_number(value):
+    """
+    "160,100", "148,565원", "255.16" 같은 값을 숫자로 변환합니다.
+
+    Returns:
+        int 또는 float (빈 값, "N/A"는 None)
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).replace(',', '').replace('원', '').strip()
+    if not text or text == 'N/A':
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_int(value):
+    """거래량처럼 정수여야 하는 값을 변환합니다."""
+    number = parse_number(value)
+    return int(number) if number is not None else None
+
+
+def _ma_from_row(row):
+    """행 딕셔너리의 MA 컬럼을 {윈도우: 값}으로 변환합니다."""
+    ma = {}
+    for key, value in row.items():
+        match = MA_KEY_PATTERN.match(key)
+        if match:
+            ma[int(match.group(1))] = parse_number(value)
+    return ma
+
+
+def from_kr_row(row):
+    """국내 주식 JSON/CSV 행을 StockBar로 변환합니다."""
+    return StockBar(
+        code=row['종목코드'],
+        name=row.get('종목명'),
+        date=row['날짜'],
+        open=parse_number(row.get('시가')),
+        high=parse_number(row.get('고가')),
+        low=parse_number(row.get('저가')),
+        close=parse_number(row.get('종가')),
+        volume=parse_int(row.get('거래량')),
+        ma=_ma_from_row(row),
+    )
+
+
+def from_us_row(row):
+    """미국 주식 JSON 행을 StockBar로 변환합니다."""
+    return StockBar(
+        code=row['티커'],
+        name=row.get('종목명'),
+        date=row['날짜'],
+        open=parse_number(row.get('시가')),
+        high=parse_number(row.get('고가')),
+        low=parse_number(row.get('저가')),
+        close=parse_number(row.get('종가')),
+        volume=parse_int(row.get('거래량')),
+        ma=_ma_from_row(row),
+    )
+
+
+def _format_krw(value):
+    """원화 가격을 파일 형식 문자열로 변환합니다 (예: 160100 -> "160100")."""
+    return str(int(round(value)))
+
+
+def to_kr_row(bar, ma_windows=()):
+    """
+    StockBar를 국내 주식 JSON/CSV 행으로 변환합니다.
+
+    Args:
+        bar: StockBar
+        ma_windows: 출력할 MA 윈도우 (값이 없으면 "N/A")
+
+    Returns:
+        dict: 한글 키 딕셔너리 (값이 없는 가격 컬럼은 생략)
+    """
+    row = {
+        '종목코드': bar.code,
+        '종목명': bar.name,
+        '날짜': bar.date,
+    }
+    for key, value in (('시가', bar.open), ('고가', bar.high), ('저가', bar.low),
+                       ('종가', bar.close), ('거래량', bar.volume)):
+        if value is not None:
+            row[key] = _format_krw(value)
+    for window in ma_windows:
+        value = bar.ma.get(window)
+        row[f'MA{window}'] = f"{int(round(value)):,}원" if value is not None else "N/A"
+    return row
+
+
+def to_us_row(bar, ma_windows=()):
+    """
+    StockBar를 미국 주식 JSON 행으로 변환합니다.
+
+    Args:
+        bar: StockBar
+        ma_windows: 출력할 MA 윈도우 (값이 없으면 None)
+
+    Returns:
+        dict: 한글 키 딕셔너리 (가격은 소수점 2자리 float)
+    """
+    row = {
+        '티커': bar.code,
+        '종목명': bar.name,
+        '날짜': bar.date,
+        '시가': bar.open,
+        '고가': bar.high,
+        '저가': bar.low,
+        '종가': bar.close,
+        '거래량': bar.volume,
+    }
+    for window in ma_windows:
+        value = bar.ma.get(window)
+        row[f'MA{window}'] = round(value, 2) if value is not None else None
+    return row
+
+
+def write_export(market, out_dir, code, bars, ma_windows=()):
+    """
+    fetcher와 같은 형식의 파일을 씁니다 (국내: stock_<code>.json/.csv, 미국: stock_<code>.json).
+
+    Args:
+        market (str): 'kr' 또는 'us'
+        out_dir (str): 출력 폴더
+        bars: 최신 날짜가 위인 StockBar 리스트 (MA 포함)
+        ma_windows: 출력할 MA 윈도우
+
+    Returns:
+        int: 쓴 행 수
+    """
+    if market == 'kr':
+        import csv
+        rows = [to_kr_row(bar, ma_windows) for bar in bars]
+        with atomic_write(os.path.join(out_dir, f"stock_{code}.csv"), encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=KR_FIELDS + [f"MA{window}" for window in ma_windows])
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        rows = [to_us_row(bar, ma_windows) for bar in bars]
+    with atomic_write(os.path.join(out_dir, f"stock_{code}.json")) as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    return len(rows)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+운영 매뉴얼(docs/kr/OPERATION_MANUAL.md)의 정배열 매매 규칙을 행렬 단위로 계산하는 모듈
+
+모든 계산은 (종목 수, 날짜 수) 배열 전체에 대해 한 번에 수행하므로 종목이
+수천 개여도 종목별 반복문 없이 모든 날짜의 신호를 구합니다.
+
+- 정배열: MA5 > MA10 > MA20
+- 매수: 정배열 + ① 종가 < MA5 ② 종가가 MA10 ±2% ③ 거래량이 10거래일 고점 대비 -10% 이상 감소
+- 위험 신호: 거래량 전일 대비 +50% 이상 AND 종가 전일 대비 -3% 이상 하락
+- 매도: 위험 신호 → 손절(-7%) → 익절(+15%) 순, 수익률은 거래세 0.5%를 뺀 실질 수익률
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class StrategyParams:
+    """
+    매매 규칙 기준값 (기본값은 운영 매뉴얼 v1.3)
+
+    비율은 소수로 표기합니다 (예: 0.02 = 2%).
+    """
+
+    def __init__(self, ma_windows=(5, 10, 20), ma10_band=0.02, volume_lookback=10, volume_drop=0.10,
+                 danger_volume=0.50, danger_drop=0.03, take_profit=0.15, stop_loss=0.07, tax=0.005,
+                 max_buys=2, max_positions=4):
+        """
+        Args:
+            ma_windows: (단기, 중기, 장기) 이동평균 윈도우 - 정배열 판정과 매수 조건 ①② 에 사용
+            ma10_band (float): 종가가 중기 이동평균 ± 이 비율 안이면 조건 ② 충족
+            volume_lookback (int): 거래량 고점을 찾을 거래일 수 (당일 포함)
+            volume_drop (float): 거래량이 고점 대비 이 비율 이상 줄면 조건 ③ 충족
+            danger_volume (float): 위험 신호 거래량 증가율 (전일 대비)
+            danger_drop (float): 위험 신호 주가 하락률 (전일 대비)
+            take_profit (float): 익절 기준 실질 수익률
+            stop_loss (float): 손절 기준 실질 손실률
+            tax (float): 매도 시 거래세 (실질 수익률 계산에 반영)
+            max_buys (int): 종목당 최대 매수 횟수
+            max_positions (int): 동시에 보유할 최대 종목 수
+        """
+        short, mid, long = ma_windows
+        if not 0 < short < mid < long:
+            raise ValueError(f"이동평균 윈도우는 단기 < 중기 < 장기여야 합니다: {ma_windows}")
+        self.ma_windows = (short, mid, long)
+        self.ma10_band = ma10_band
+        self.volume_lookback = volume_lookback
+        self.volume_drop = volume_drop
+        self.danger_volume = danger_volume
+        self.danger_drop = danger_drop
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.tax = tax
+        self.max_buys = max_buys
+        self.max_positions = max_positions
+
+    @property
+    def min_length(self):
+        """마지막 날짜의 모든 신호를 계산하는 데 필요한 최소 일봉 수"""
+        return max(self.ma_windows[-1], self.volume_lookback, 2)
+
+    def __repr__(self):
+        return (f"StrategyParams(ma_windows={self.ma_windows}, ma10_band={self.ma10_band}, "
+                f"volume_lookback={self.volume_lookback}, volume_drop={self.volume_drop}, "
+                f"danger_volume={self.danger_volume}, danger_drop={self.danger_drop}, "
+                f"take_profit={self.take_profit}, stop_loss={self.stop_loss}, tax={self.tax}, "
+                f"max_buys={self.max_buys}, max_positions={self.max_positions})")
+
+
+def rolling_mean_matrix(values, window):
+    """
+    행(종목)마다 열 방향 단순 이동평균을 계산합니다.
+
+    indicators.rolling_mean과 같은 누적합 계산을 (종목 수, 날짜 수) 배열 전체에 한 번에 적용한
+    행렬 버전입니다. 값이 모두 있는 행이면 indicators.rolling_mean과 같은 값이고, 다른 점은 다음과 같습니다.
+
+    - 데이터가 부족한 칸은 None 대신 NaN
+    - 종목마다 길이가 달라 비어 있는 칸(NaN)을 허용하고, 윈도우 안에 NaN이 있으면 그 칸도 NaN
+
+    Args:
+        values: (종목 수, 날짜 수) 배열
+        window (int): 윈도우 길이
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rows, cols = values.shape
+    result = np.full((rows, cols), np.nan)
+    if window > cols:
+        return result
+
+    missing = np.isnan(values)
+    sums = np.zeros((rows, cols + 1))
+    np.cumsum(np.where(missing, 0.0, values), axis=1, out=sums[:, 1:])
+    gaps = np.zeros((rows, cols + 1))
+    np.cumsum(missing, axis=1, out=gaps[:, 1:])
+
+    window_sum = sums[:, window:] - sums[:, :-window]
+    window_gaps = gaps[:, window:] - gaps[:, :-window]
+    result[:, window - 1:] = np.where(window_gaps == 0, window_sum / window, np.nan)
+    return result
+
+
+def rolling_max_matrix(values, window):
+    """행마다 열 방향 이동 최댓값 (데이터가 부족하거나 NaN이 있으면 NaN)"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, np.nan)
+    if window > values.shape[1]:
+        return result
+    result[:, window - 1:] = sliding_window_view(values, window, axis=1).max(axis=-1)
+    return result
+
+
+def shift(values, periods=1):
+    """열 방향으로 periods만큼 밀어 전일 값을 같은 칸에 맞춥니다 (앞쪽은 NaN)."""
+    result = np.full(values.shape, np.nan)
+    result[:, periods:] = values[:, :-periods]
+    return result
+
+
+def evaluate(close, volume, params=None, cache=None):
+    """
+    모든 종목/날짜에 대해 매뉴얼 규칙을 계산합니다.
+
+    Args:
+        close: (종목 수, 날짜 수) 종가 배열 (오래된 날짜부터)
+        volume: (종목 수, 날짜 수) 거래량 배열
+        params (StrategyParams): 기준값 (None이면 매뉴얼 기본값)
+        cache (dict): 이동평균/거래량 고점을 윈도우별로 재사용할 딕셔너리.
+            같은 close/volume으로 여러 기준값을 계산할 때(파라미터 탐색)만 넘깁니다.
+
+    Returns:
+        dict: 같은 모양의 배열들
+            ma_short / ma_mid / ma_long: 이동평균
+            aligned: 정배열 여부
+            below_short: 조건 ① / near_mid: 조건 ② / volume_dry: 조건 ③
+            buy: 매수 신호 (정배열 + ①②③)
+            danger: 위험 신호
+            mid_gap: 종가와 중기 이동평균의 괴리율 / volume_ratio: 거래량 / 거래량 고점
+    """
+    params = params or StrategyParams()
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    short, mid, long = params.ma_windows
+
+    def cached(kind, function, values, window):
+        if cache is None:
+            return function(values, window)
+        key = (kind, window)
+        if key not in cache:
+            cache[key] = function(values, window)
+        return cache[key]
+
+    ma_short = cached('ma', rolling_mean_matrix, close, short)
+    ma_mid = cached('ma', rolling_mean_matrix, close, mid)
+    ma_long = cached('ma', rolling_mean_matrix, close, long)
+    volume_high = cached('volume_high', rolling_max_matrix, volume, params.volume_lookback)
+    prev_close = cached('prev_close', shift, close, 1)
+    prev_volume = cached('prev_volume', shift, volume, 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mid_gap = close / ma_mid - 1.0
+        volume_ratio = volume / volume_high
+        volume_change = volume / prev_volume - 1.0
+        price_change = close / prev_close - 1.0
+
+    aligned = (ma_short > ma_mid) & (ma_mid > ma_long)
+    below_short = close < ma_short
+    near_mid = np.abs(mid_gap) <= params.ma10_band
+    volume_dry = volume_ratio <= 1.0 - params.volume_drop
+    buy = aligned & below_short & near_mid & volume_dry
+    danger = (volume_change >= params.danger_volume) & (price_change <= -params.danger_drop)
+
+    return {
+        'ma_short': ma_short,
+        'ma_mid': ma_mid,
+        'ma_long': ma_long,
+        'aligned': aligned,
+        'below_short': below_short,
+        'near_mid': near_mid,
+        'volume_dry': volume_dry,
+        'buy': buy,
+        'danger': danger,
+        'mid_gap': mid_gap,
+        'volume_ratio': volume_ratio,
+    }
+
+
+# 켜지고 꺼질 때 이벤트로 알리는 신호 (장중 모니터링, 변경 피드)
+EVENT_SIGNALS = ('buy', 'danger', 'aligned')
+
+
+def latest_signals(closes, volumes, params=None):
+    """
+    일봉 시계열(오래된 날짜부터)의 마지막 날 신호를 계산합니다.
+
+    Returns:
+        dict: {신호 이름: bool} (EVENT_SIGNALS), 일봉이 없으면 None
+    """
+    if not closes:
+        return None
+    signals = LiveSignals(closes[:-1], volumes[:-1], params)
+    result = signals.update(closes[-1], volumes[-1])
+    return {name: bool(result[name]) for name in EVENT_SIGNALS}
+
+
+class LiveSignals:
+    """
+    확정된 일봉 이력 + 장중 현재 일봉 하나로 당일 신호를 증분 계산합니다.
+
+    이력 쪽 합계(윈도우별 직전 w-1일 종가 합, 직전 거래량 고점, 전일 종가/거래량)는
+    거래일이 바뀔 때만 다시 계산하고, 시세가 들어올 때마다(update) 당일 값만 더해
+    evaluate()의 마지막 열과 같은 값을 O(윈도우 수)로 구합니다.
+    """
+
+    def __init__(self, closes, volumes, params=None):
+        """
+        Args:
+            closes: 확정된 일봉 종가 (오래된 날짜부터)
+            volumes: 확정된 일봉 거래량 (오래된 날짜부터)
+            params (StrategyParams): 기준값
+        """
+        self.params = params or StrategyParams()
+        keep = max(self.params.ma_windows[-1], self.params.volume_lookback)
+        self.closes = [float(c) for c in closes][-keep:]
+        self.volumes = [float(v) for v in volumes][-keep:]
+        self._prepare()
+
+    def _prepare(self):
+        self._sums = {}
+        for window in self.params.ma_windows:
+            prior = self.closes[-(window - 1):] if window > 1 else []
+            self._sums[window] = sum(prior) if len(prior) == window - 1 else None
+        lookback = self.params.volume_lookback - 1
+        prior_volumes = self.volumes[-lookback:] if lookback > 0 else []
+        self._volume_high = max(prior_volumes, default=0.0) if len(prior_volumes) == lookback else None
+        self._prev_close = self.closes[-1] if self.closes else None
+        self._prev_volume = self.volumes[-1] if self.volumes else None
+
+    def roll(self, close, volume):
+        """당일 일봉이 확정되면 이력에 추가합니다 (다음 거래일 계산 준비)."""
+        keep = max(self.params.ma_windows[-1], self.params.volume_lookback)
+        self.closes = (self.closes + [float(close)])[-keep:]
+        self.volumes = (self.volumes + [float(volume)])[-keep:]
+        self._prepare()
+
+    def update(self, close, volume):
+        """
+        장중 현재가/누적 거래량으로 당일 신호를 계산합니다.
+
+        Returns:
+            dict: evaluate()와 같은 키의 스칼라 값 (계산할 수 없는 값은 None/False)
+        """
+        params = self.params
+        close, volume = float(close), float(volume)
+        short, mid, long = params.ma_windows
+        ma = {window: (prior + close) / window if prior is not None else None
+              for window, prior in self._sums.items()}
+        ma_short, ma_mid, ma_long = ma[short], ma[mid], ma[long]
+
+        volume_high = max(self._volume_high, volume) if self._volume_high is not None else None
+        mid_gap = close / ma_mid - 1.0 if ma_mid else None
+        volume_ratio = volume / volume_high if volume_high else None
+
+        aligned = None not in (ma_short, ma_mid, ma_long) and ma_short > ma_mid > ma_long
+        below_short = ma_short is not None and close < ma_short
+        near_mid = mid_gap is not None and abs(mid_gap) <= params.ma10_band
+        volume_dry = volume_ratio is not None and volume_ratio <= 1.0 - params.volume_drop
+        danger = bool(self._prev_close and self._prev_volume
+                      and volume / self._prev_volume - 1.0 >= params.danger_volume
+                      and close / self._prev_close - 1.0 <= -params.danger_drop)
+
+        return {
+            'ma_short': ma_short,
+            'ma_mid': ma_mid,
+            'ma_long': ma_long,
+            'aligned': aligned,
+            'below_short': below_short,
+            'near_mid': near_mid,
+            'volume_dry': volume_dry,
+            'buy': aligned and below_short and near_mid and volume_dry,
+            'danger': danger,
+            'mid_gap': mid_gap,
+            'volume_ratio': volume_ratio,
+        }
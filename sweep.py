@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+운영 매뉴얼 기준값(이동평균 윈도우, MA10 범위, 거래량 감소율, 익절/손절, 위험 신호) 파라미터 탐색
+
+가격/거래량 행렬을 한 번만 읽어 공유 메모리(multiprocessing.shared_memory)에 올리고,
+워커 프로세스들은 파일을 다시 읽지 않고 같은 메모리를 참조해 조합마다
+신호 계산 → 포트폴리오 백테스트를 수행합니다. 결과는 수익률/낙폭 기준으로 정렬합니다.
+
+사용법:
+    python sweep.py [--market kr|us|all] [--samples N] [--seed 0] [--workers N] [--top 20]
+                    [--rank return|drawdown|ratio] [--start 2020-01-01] [--end 2026-12-31] [--json]
+"""
+
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from backtest import DEFAULT_CAPITAL, simulate
+from cli_options import pop_flag, pop_option
+from market_data import MARKETS, PriceMatrix, load_matrix
+from strategy import StrategyParams, evaluate
+
+# 탐색할 기준값 (첫 번째 값이 매뉴얼 기본값)
+DEFAULT_GRID = {
+    'ma_windows': [(5, 10, 20), (3, 10, 20), (5, 10, 30), (5, 20, 60)],
+    'ma10_band': [0.02, 0.01, 0.03],
+    'volume_drop': [0.10, 0.0, 0.20],
+    'take_profit': [0.15, 0.10, 0.20],
+    'stop_loss': [0.07, 0.05, 0.10],
+    'danger_volume': [0.50, 1.00],
+    'danger_drop': [0.03, 0.05],
+}
+
+# 정렬 기준: 결과 딕셔너리 → 정렬 키 (작을수록 위)
+RANK_KEYS = {
+    'return': lambda r: (-r['total_return'], -r['max_drawdown']),
+    'drawdown': lambda r: (-r['max_drawdown'], -r['total_return']),
+    'ratio': lambda r: (-(r['total_return'] / abs(r['max_drawdown']) if r['max_drawdown'] else r['total_return']),),
+}
+
+# 워커 프로세스 상태 (initializer에서 설정)
+_worker = {}
+
+
+def grid_combinations(grid=None, samples=None, seed=0):
+    """
+    기준값 조합 목록을 만듭니다.
+
+    Args:
+        grid (dict): {StrategyParams 인자 이름: 후보 리스트}
+        samples (int): 전체 조합 중 무작위로 고를 개수 (None이면 전체)
+
+    Returns:
+        list: StrategyParams 인자 딕셔너리 리스트 (이동평균 윈도우가 같은 조합끼리 모여 있음)
+    """
+    grid = grid or DEFAULT_GRID
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+        # 워커의 이동평균 캐시를 잘 활용하도록 윈도우별로 모음
+        combos.sort(key=lambda combo: tuple(combo.get('ma_windows', ())))
+    return combos
+
+
+def _share(matrix):
+    """가격 행렬을 공유 메모리로 복사합니다. (블록 리스트, 워커에 넘길 (이름, 모양, dtype))"""
+    blocks, specs = [], {}
+    for field in PriceMatrix.FIELDS:
+        array = getattr(matrix, field)
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        specs[field] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _init_worker(specs, codes, names, dates, market, capital, lot, start, end):
+    """워커 시작 시 공유 메모리에 연결해 복사 없이 행렬 뷰를 만듭니다."""
+    blocks = {field: SharedMemory(name=name) for field, (name, _, _) in specs.items()}
+    arrays = {field: np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[field].buf)
+              for field, (_, shape, dtype) in specs.items()}
+    _worker.update(
+        blocks=blocks,
+        matrix=PriceMatrix(codes, names, dates, None, **arrays),
+        market=market, capital=capital, lot=lot, start=start, end=end,
+        cache={},
+    )
+
+
+def _run_combo(values):
+    """조합 하나를 백테스트하고 요약 지표를 반환합니다."""
+    matrix = _worker['matrix']
+    params = StrategyParams(**values)
+    signals = evaluate(matrix.close, matrix.volume, params, cache=_worker['cache'])
+    result = simulate(matrix, signals, params, _worker['capital'], _worker['lot'],
+                      _worker['start'], _worker['end'], _worker['market'])
+    summary = result.summary()
+    return {
+        'params': values,
+        'total_return': summary['total_return'],
+        'max_drawdown': summary['max_drawdown'],
+        'trades': summary['trades'],
+        'win_rate': summary['win_rate'],
+    }
+
+
+def sweep(market, combos, capital=None, lot=None, start=None, end=None, workers=None, data_dir=None):
+    """
+    시장 하나에 대해 모든 조합을 병렬로 백테스트합니다.
+
+    Returns:
+        list: 조합별 결과 딕셔너리 (데이터가 없으면 빈 리스트)
+    """
+    # 주말/휴장일로 잘못 저장된 행은 거래일로 시뮬레이션하지 않음 (backtest.run과 같은 행렬)
+    matrix = load_matrix(market, data_dir=data_dir, workers=workers, sessions_only=True)
+    if matrix is None:
+        return []
+    default_capital, default_lot = DEFAULT_CAPITAL[market]
+    capital, lot = capital or default_capital, lot or default_lot
+
+    blocks, specs = _share(matrix)
+    try:
+        initargs = (specs, matrix.codes, matrix.names, matrix.dates, market, capital, lot, start, end)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+            chunksize = max(1, len(combos) // ((workers or os.cpu_count() or 1) * 4))
+            return list(executor.map(_run_combo, combos, chunksize=chunksize))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _format_params(values):
+    short, mid, long = values['ma_windows']
+    return (f"MA{short}/{mid}/{long} 범위±{values['ma10_band'] * 100:g}% 거래량-{values['volume_drop'] * 100:g}% "
+            f"익절+{values['take_profit'] * 100:g}% 손절-{values['stop_loss'] * 100:g}% "
+            f"위험+{values['danger_volume'] * 100:g}%/-{values['danger_drop'] * 100:g}%")
+
+
+def main():
+    args = sys.argv[1:]
+    try:
+        market = pop_option(args, '--market', 'all')
+        samples = pop_option(args, '--samples', None, int)
+        seed = pop_option(args, '--seed', 0, int)
+        workers = pop_option(args, '--workers', None, int)
+        top = pop_option(args, '--top', 20, int)
+        rank_by = pop_option(args, '--rank', 'return')
+        start = pop_option(args, '--start')
+        end = pop_option(args, '--end')
+        as_json = pop_flag(args, '--json')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args or market not in ('kr', 'us', 'all') or rank_by not in RANK_KEYS:
+        print(__doc__)
+        sys.exit(1)
+
+    combos = grid_combinations(samples=samples, seed=seed)
+    reports = {}
+    for name in MARKETS:
+        if market not in (name, 'all'):
+            continue
+        started = time.perf_counter()
+        results = sorted(sweep(name, combos, start=start, end=end, workers=workers), key=RANK_KEYS[rank_by])
+        elapsed = time.perf_counter() - started
+        reports[name] = results[:top]
+        if as_json:
+            continue
+
+        print(f"[{name}] {len(results)}개 조합, {elapsed:.1f}초 ({rank_by} 기준 상위 {min(top, len(results))}개)")
+        for i, result in enumerate(results[:top], 1):
+            print(f"  {i:>3}. 수익률 {result['total_return'] * 100:+8.2f}%  최대 낙폭 {result['max_drawdown'] * 100:7.2f}%  "
+                  f"매매 {result['trades']:>4}회  {_format_params(result['params'])}")
+
+    if as_json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+테스트 공통 설정
+
+저장소 최상위의 스크립트 모듈을 import할 수 있도록 경로를 추가하고,
+현재 시각을 고정한 거래일 달력을 만드는 fixture를 제공합니다.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_calendar import TradingCalendar  # noqa: E402
+
+
+class FixedClockCalendar(TradingCalendar):
+    """현재 시각을 바꿀 수 있는 거래일 달력 (clock에 거래소 현지 시각을 넣음)"""
+
+    def __init__(self, base, clock):
+        super().__init__(base.name, str(base.tz), base.open_time, base.close_time, base.holidays)
+        self.clock = clock
+
+    def now(self, now=None):
+        return super().now(now or self.clock)
+
+
+@pytest.fixture
+def fixed_calendar():
+    """fixed_calendar(KRX, datetime(...)) - naive datetime은 거래소 현지 시각으로 간주"""
+    return FixedClockCalendar
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+import atomic_file
+from atomic_file import LOCK_DIR, atomic_write, file_lock, write_if_changed
+from columnar_archive import ColumnarArchive
+from history_store import HistoryStore
+from stock_record import StockBar
+
+
+def test_atomic_write_replaces_whole_file(tmp_path):
+    path = tmp_path / 'stock_A.json'
+    path.write_text('old', encoding='utf-8')
+    with atomic_write(str(path)) as f:
+        f.write('new')
+        # 블록이 끝나기 전에는 기존 파일 그대로
+        assert path.read_text(encoding='utf-8') == 'old'
+    assert path.read_text(encoding='utf-8') == 'new'
+    assert os.listdir(tmp_path) == ['stock_A.json']
+    # 임시 파일(0600)이 아니라 일반 파일 권한
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~atomic_file._UMASK
+
+
+def test_atomic_write_failure_keeps_old_file(tmp_path):
+    path = tmp_path / 'stock_A.json'
+    path.write_text('old', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write('partial')
+            raise RuntimeError('killed')
+    assert path.read_text(encoding='utf-8') == 'old'
+    assert os.listdir(tmp_path) == ['stock_A.json']
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = str(tmp_path / 'latest.json')
+    assert write_if_changed(path, '{"a": 1}')
+    mtime = os.stat(path).st_mtime_ns
+    assert not write_if_changed(path, '{"a": 1}')
+    assert os.stat(path).st_mtime_ns == mtime
+    assert write_if_changed(path, '{"a": 2}')
+
+
+def test_file_lock_is_reentrant_and_serializes_threads(tmp_path):
+    target = str(tmp_path / 'stock_A')
+    events = []
+
+    def worker():
+        with file_lock(target):
+            events.append('worker')
+
+    with file_lock(target):
+        # 같은 스레드는 다시 잠가도 기다리지 않음
+        with file_lock(target):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            time.sleep(0.05)
+            events.append('main')
+    thread.join()
+    assert events == ['main', 'worker']
+    assert os.listdir(tmp_path / LOCK_DIR) == ['stock_A.lock']
+
+
+def test_compactions_leave_no_temporary_files(tmp_path):
+    history = HistoryStore(str(tmp_path / 'history'))
+    history.append('A', [StockBar('A', 'A', '2026-10-16', close=1.0)])
+    history.compact('A')
+    assert sorted(os.listdir(tmp_path / 'history')) == ['stock_A.base.jsonl']
+
+    root = tmp_path / 'archive'
+    archive = ColumnarArchive(str(root), 'us', (5,), writable=True)
+    archive.append('A', [StockBar('A', 'A', '2026-10-16', close=1.0)])
+    archive.close()
+    # 이전 compaction이 중단되어 남은 임시 폴더는 새로 시작할 때 지움
+    os.makedirs(tmp_path / '.archive.tmp')
+    (tmp_path / '.archive.tmp' / 'index.json').write_text('stale', encoding='utf-8')
+    archive.compact()
+    assert sorted(os.listdir(tmp_path)) == ['archive', 'history']
+    assert not [name for name in os.listdir(root) if name.endswith('.tmp')]
+    assert [bar.close for bar in archive.bars('A')] == [1.0]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from backtest import run, simulate
+from history_store import HistoryStore
+from market_data import PriceMatrix
+from stock_record import StockBar, write_export
+from strategy import StrategyParams
+from trading_calendar import KRX
+
+
+def row(values):
+    return np.array([values], dtype=np.float64)
+
+
+def matrix_of(dates, open_, low, close):
+    return PriceMatrix(['000001'], ['A'], dates, [dates[-1]], row(open_), row(close), row(low), row(close),
+                       row([1000] * len(dates)))
+
+
+def test_limit_buy_then_take_profit_at_next_open():
+    dates = ['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15']
+    matrix = matrix_of(dates, open_=[100, 101, 110, 121], low=[99, 99, 108, 119], close=[100, 105, 120, 122])
+    signals = {
+        'buy': np.array([[True, False, False, False]]),
+        'danger': np.zeros((1, 4), dtype=bool),
+        'mid_gap': np.zeros((1, 4)),
+    }
+    result = simulate(matrix, signals, StrategyParams(), capital=1000, lot=500)
+    [trade] = result.trades
+    # 신호일 종가(100) 지정가가 다음 날 저가(99)에 체결, 실질 수익률 +15% 이상 → 다음 날 시가(121)에 매도
+    assert (trade['entry_date'], trade['exit_date'], trade['reason']) == ('2026-10-13', '2026-10-15', 'take')
+    assert (trade['shares'], trade['avg_price'], trade['exit_price']) == (5, 100.0, 121.0)
+    assert result.equity[-1] == pytest.approx(500 + 5 * 121 * (1 - 0.005))
+
+
+def test_gap_up_cancels_limit_order():
+    dates = ['2026-10-12', '2026-10-13', '2026-10-14']
+    matrix = matrix_of(dates, open_=[100, 110, 110], low=[99, 105, 105], close=[100, 110, 110])
+    signals = {'buy': np.array([[True, False, False]]), 'danger': np.zeros((1, 3), dtype=bool),
+               'mid_gap': np.zeros((1, 3))}
+    result = simulate(matrix, signals, StrategyParams(), capital=1000, lot=500)
+    assert result.trades == [] and result.equity.tolist() == [1000, 1000, 1000]
+
+
+def test_run_ignores_non_session_rows(tmp_path):
+    sessions = [day.isoformat() for day in KRX.sessions_between('2026-08-03', '2026-10-16')]
+    bars = [StockBar('000001', 'A', day, open=100 + i, high=101 + i, low=99 + i, close=100 + i, volume=1000)
+            for i, day in enumerate(sessions)]
+    HistoryStore(str(tmp_path / 'history')).append('000001', bars)
+    # 토요일로 잘못 저장된 금요일 일봉 복사본
+    saturday = StockBar('000001', 'A', '2026-10-17', open=bars[-1].open, high=bars[-1].high, low=bars[-1].low,
+                        close=bars[-1].close, volume=bars[-1].volume)
+    write_export('kr', str(tmp_path), '000001', [saturday] + bars[::-1][:19])
+
+    result = run('kr', data_dir=str(tmp_path), workers=1)
+    assert result.dates == sessions
+    assert result.summary()['end'] == '2026-10-16'
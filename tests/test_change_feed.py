@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import json
+
+from change_feed import ChangeFeed
+from stock_record import StockBar
+
+DAYS = [f"2026-09-{day:02d}" for day in range(1, 31)]
+
+
+def series(code, closes):
+    """오래된 날짜부터의 종가로 최신 날짜가 위인 일봉 리스트를 만듭니다."""
+    return [StockBar(code, code, day, close=close, volume=1000) for day, close in zip(DAYS, closes)][::-1]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_new_and_modified_bars_only(tmp_path):
+    feed = ChangeFeed(str(tmp_path / 'changes.jsonl'), 'us')
+    old = series('AAA', [10.0, 11.0, 12.0])
+    new = series('AAA', [10.0, 11.5, 12.0, 13.0])
+    assert feed.record('AAA', old, new) >= 2
+    changes = [(e['date'], e['change']) for e in feed.entries if e['change'] != 'signal']
+    assert changes == [(DAYS[3], 'new'), (DAYS[1], 'modified')]
+    # 바뀐 일봉이 없으면 신호도 기록하지 않음
+    assert feed.record('BBB', series('BBB', [1.0, 2.0]), series('BBB', [1.0, 2.0])) == 0
+
+
+def test_signal_turning_on_is_recorded(tmp_path):
+    feed = ChangeFeed(str(tmp_path / 'changes.jsonl'), 'kr')
+    rising = series('005930', [100 + i for i in range(25)])
+    feed.record('005930', [], rising)
+    events = [e['event'] for e in feed.entries if e['change'] == 'signal']
+    assert 'aligned' in events
+    assert all(e['date'] == DAYS[24] for e in feed.entries if e['change'] == 'signal')
+
+
+def test_close_replaces_previous_feed_sorted(tmp_path):
+    path = str(tmp_path / 'changes.jsonl')
+    first = ChangeFeed(path, 'us')
+    first.record('BBB', [], series('BBB', [1.0]))
+    first.record('AAA', [], series('AAA', [1.0, 2.0]))
+    assert first.close() == 3
+    assert [(e['code'], e['date']) for e in read(path)] == [('AAA', DAYS[0]), ('AAA', DAYS[1]), ('BBB', DAYS[0])]
+
+    # 다음 실행은 이전 피드를 대체하고, 바뀐 것이 없으면 빈 피드
+    assert ChangeFeed(path, 'us').close() == 0
+    assert read(path) == []
+
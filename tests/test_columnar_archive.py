@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+import pytest
+
+import columnar_archive
+from columnar_archive import ColumnarArchive, archive_dir, import_market
+from market_data import load_series
+from stock_record import StockBar, to_us_row
+
+
+def bars(code, days, start=1.0):
+    return [StockBar(code, code, day, open=start + i, high=start + i, low=start + i, close=start + i, volume=10)
+            for i, day in enumerate(days)]
+
+
+DAYS = [f"2026-10-{day:02d}" for day in (5, 6, 7, 8, 9, 12, 13, 14, 15, 16)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ColumnarArchive(str(tmp_path / 'archive'), 'us', ma_windows=(3,), writable=True)
+    yield archive
+    archive.close()
+
+
+def test_append_tail_is_in_place_and_recomputes_ma(archive):
+    archive.append('AAA', bars('AAA', DAYS[:5]))
+    _, offset, _, capacity = archive.index['tickers']['AAA']
+    assert archive.append('AAA', bars('AAA', DAYS[5:], start=6.0)) == 5
+    assert archive.index['tickers']['AAA'] == ['AAA', offset, 10, capacity]
+    result = archive.bars('AAA')
+    assert [bar.close for bar in result] == [float(i) for i in range(1, 11)]
+    assert [bar.ma[3] for bar in result[:3]] == [None, None, 2.0]
+    assert result[-1].ma[3] == 9.0
+
+
+def test_same_date_overwrites_and_middle_date_rewrites(archive):
+    archive.append('AAA', bars('AAA', DAYS[:3] + DAYS[4:6]))
+    archive.append('AAA', [StockBar('AAA', 'AAA', DAYS[1], close=20.0)])
+    archive.append('AAA', [StockBar('AAA', 'AAA', DAYS[3], close=30.0)])
+    result = archive.bars('AAA')
+    assert [bar.date for bar in result] == DAYS[:6]
+    assert [bar.close for bar in result] == [1.0, 20.0, 3.0, 30.0, 4.0, 5.0]
+
+
+def test_full_reservation_moves_only_that_ticker(archive, monkeypatch):
+    monkeypatch.setattr(columnar_archive, 'HEADROOM', 1)
+    archive.append('AAA', bars('AAA', DAYS[:2]))
+    archive.append('BBB', bars('BBB', DAYS[:2], start=50.0))
+    archive.append('AAA', bars('AAA', DAYS[2:6], start=3.0))
+    assert archive.index['tickers']['AAA'][1] > archive.index['tickers']['BBB'][1]
+    assert [bar.close for bar in archive.bars('AAA')] == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+    before, after = archive.compact()
+    assert after < before
+    assert [bar.close for bar in archive.bars('AAA')] == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert [bar.close for bar in archive.bars('BBB')] == [50.0, 51.0]
+
+
+def test_columns_are_mmap_views_by_date_range(archive):
+    archive.append('AAA', bars('AAA', DAYS))
+    archive.close()
+    reader = ColumnarArchive(archive.root_dir)
+    columns = reader.columns('AAA', start=DAYS[2], end=DAYS[4])
+    assert columns['date'].tolist() == [20261007, 20261008, 20261009]
+    assert isinstance(columns['close'], np.memmap)
+    with pytest.raises(ValueError):
+        reader.append('AAA', bars('AAA', DAYS[:1]))
+
+
+def test_reimport_picks_up_new_bars(tmp_path):
+    data_dir = tmp_path / 'us'
+    data_dir.mkdir()
+
+    def write_json(days):
+        rows = [to_us_row(bar) for bar in reversed(bars('AAA', days))]
+        with open(data_dir / 'stock_AAA.json', 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+
+    write_json(DAYS[:5])
+    assert import_market('us', str(data_dir), history=False) == {'AAA': 5}
+    write_json(DAYS[3:])
+    import_market('us', str(data_dir), history=False)
+    archive = ColumnarArchive(archive_dir(str(data_dir)))
+    assert [bar.date for bar in archive.bars('AAA')] == DAYS
+    assert [bar.date for bar in load_series('us', 'AAA', str(data_dir), history=False)] == DAYS
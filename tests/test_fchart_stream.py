@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import json
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pytest
+
+import stock_fetcher
+from history_store import HistoryStore
+from http_cache import CachedResponse
+from stock_fetcher import NaverStockFetcher, iter_fchart_bars
+from trading_calendar import KRX
+
+
+def fchart_body(days, name='삼성전자'):
+    items = ''.join(f'<item data="{day.replace("-", "")}|{100 + i}|{110 + i}|{90 + i}|{105 + i}|{1000 + i}" />'
+                    for i, day in enumerate(days))
+    return (f'<?xml version="1.0" encoding="EUC-KR" ?><protocol>'
+            f'<chartdata symbol="005930" name="{name}" count="{len(days)}" timeframe="day">{items}</chartdata>'
+            f'</protocol>').encode('euc-kr')
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+DAYS = [day.isoformat() for day in KRX.sessions_between('2026-08-03', '2026-10-16')]
+
+
+def test_chunks_split_anywhere_give_same_bars():
+    body = fchart_body(DAYS[:5])
+    expected = list(iter_fchart_bars([body], '005930'))
+    assert [bar.date for bar in expected] == DAYS[:5]
+    assert (expected[0].name, expected[0].open, expected[0].close, expected[0].volume) == ('삼성전자', 100, 105, 1000)
+    # 한글 종목명의 멀티바이트 문자나 태그 중간에서 잘려도 같은 결과
+    for size in (1, 3, 7, 64):
+        assert list(iter_fchart_bars(split(body, size), '005930')) == expected
+
+
+def test_bars_are_yielded_before_the_body_is_consumed():
+    chunks = split(fchart_body(DAYS), 64)
+    consumed = []
+
+    def stream():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    bars = iter_fchart_bars(stream(), '005930')
+    assert next(bars).date == DAYS[0]
+    assert len(consumed) < len(chunks) // 2
+
+
+def test_missing_chartdata_and_bad_xml():
+    with pytest.raises(LookupError):
+        list(iter_fchart_bars([b'<protocol></protocol>'], '005930'))
+    with pytest.raises(ET.ParseError):
+        list(iter_fchart_bars([b'<protocol><chartdata>'], '005930'))
+
+
+@pytest.fixture
+def fetcher(tmp_path, fixed_calendar):
+    fetcher = NaverStockFetcher(data_dir=str(tmp_path), history=HistoryStore(str(tmp_path / 'history')))
+    fetcher.calendar = fixed_calendar(KRX, datetime(2026, 10, 16, 18, 0))
+    return fetcher
+
+
+def test_backfill_records_in_chunks_and_keeps_recent_days(fetcher, tmp_path, monkeypatch):
+    # 토요일 행은 저장하지 않음
+    body = fchart_body(DAYS[:10] + ['2026-08-15'] + DAYS[10:])
+    monkeypatch.setattr(fetcher, '_get', lambda url, **kwargs: CachedResponse(url, 200, body))
+    monkeypatch.setattr(stock_fetcher, 'BACKFILL_CHUNK', 7)
+    flushed = []
+    record = fetcher._record
+    monkeypatch.setattr(fetcher, '_record', lambda code, bars: flushed.append(len(bars)) or record(code, bars))
+
+    saved = fetcher.backfill('005930', len(DAYS) + 1)
+    assert flushed[:-1] == [7] * (len(DAYS) // 7) and sum(flushed) == len(DAYS)
+    assert [bar.date for bar in fetcher.history.load('005930')] == DAYS
+    assert [bar.date for bar in saved] == DAYS[::-1][:stock_fetcher.SAVED_DAYS]
+    # MA는 저장 구간 앞쪽 일봉까지 써서 계산
+    assert all(bar.ma[20] is not None for bar in saved)
+    with open(tmp_path / 'stock_005930.json', encoding='utf-8') as f:
+        assert [row['날짜'] for row in json.load(f)] == [bar.date for bar in saved]
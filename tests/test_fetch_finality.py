@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""장중에 저장한 일봉을 장 마감 후 확정 시세로 교체하는지 (네트워크 없이 fetch 함수를 대체)"""
+from datetime import datetime
+
+import pytest
+
+from indicator_state import captured_at, merge_bars
+from stock_fetcher import NaverStockFetcher, update_stock
+from stock_fetcher_us import YahooStockFetcher
+from stock_record import StockBar
+from trading_calendar import KRX, NYSE
+
+
+@pytest.fixture
+def kr(tmp_path, fixed_calendar):
+    fetcher = NaverStockFetcher(data_dir=str(tmp_path))
+    fetcher.calendar = fixed_calendar(KRX, datetime(2026, 10, 16, 11, 0))
+    sessions = [day.isoformat() for day in fetcher.calendar.sessions_between('2026-09-01', '2026-10-16')]
+    fetcher.sessions = sessions
+    fetcher.calls = []
+    fetcher.quote = (999, 5)
+
+    def fetch_historical_data(code, days=30, target_date=None):
+        fetcher.calls.append(('history', days))
+        fetcher._captured[code] = fetcher.calendar.now().isoformat()
+        current = fetcher.calendar.current_session().isoformat()
+        return [StockBar(code, '종목', day, close=1000 + i, volume=100)
+                for i, day in enumerate(sessions) if day <= current][-days:]
+
+    def fetch_stock_info(code):
+        fetcher.calls.append(('quote',))
+        fetcher._captured[code] = fetcher.calendar.now().isoformat()
+        close, volume = fetcher.quote
+        return StockBar(code, '종목', fetcher.calendar.current_session().isoformat(), close=close, volume=volume)
+
+    fetcher.fetch_historical_data = fetch_historical_data
+    fetcher.fetch_stock_info = fetch_stock_info
+    return fetcher
+
+
+def run_at(fetcher, when, code='000001'):
+    fetcher.calendar.clock = when
+    fetcher.calls.clear()
+    assert update_stock(fetcher, code)
+    return list(fetcher.calls)
+
+
+def test_intraday_bar_is_replaced_after_close(kr):
+    run_at(kr, datetime(2026, 10, 16, 11, 0))
+    assert kr.load_saved('000001')[0].close == 999
+
+    kr.quote = (1234, 500)
+    assert run_at(kr, datetime(2026, 10, 16, 18, 0)) == [('quote',)]
+    latest = kr.load_saved('000001')[0]
+    assert (latest.date, latest.close, latest.volume) == ('2026-10-16', 1234, 500)
+
+    # 마감 후 받은 일봉이 있으면 더 이상 요청하지 않음
+    assert run_at(kr, datetime(2026, 10, 16, 18, 5)) == []
+
+
+def test_intraday_bar_of_previous_session_is_refetched_with_gap(kr):
+    run_at(kr, datetime(2026, 10, 15, 11, 0))
+    assert kr.load_saved('000001')[0].close == 999
+
+    # 누락된 10/16과 함께 장중에 저장한 10/15도 다시 받음 (마감 후라 현재가 조회는 생략)
+    assert run_at(kr, datetime(2026, 10, 16, 18, 0)) == [('history', 2)]
+    expected = [(day, 1000 + kr.sessions.index(day)) for day in ('2026-10-16', '2026-10-15')]
+    assert [(bar.date, bar.close) for bar in kr.load_saved('000001')[:2]] == expected
+
+
+def test_bar_saved_after_close_skips_network(kr):
+    run_at(kr, datetime(2026, 10, 16, 16, 0))
+    assert kr.is_final_saved('000001', '2026-10-16')
+    assert run_at(kr, datetime(2026, 10, 16, 20, 0)) == []
+
+
+@pytest.fixture
+def us(tmp_path, fixed_calendar):
+    fetcher = YahooStockFetcher(data_dir=str(tmp_path))
+    fetcher.calendar = fixed_calendar(NYSE, datetime(2026, 10, 16, 11, 0))
+    sessions = [day.isoformat() for day in fetcher.calendar.sessions_between('2026-09-01', '2026-10-16')]
+    fetcher.starts = []
+    fetcher.price = 1.0
+
+    def fetch_chart(ticker, sessions_count=None, start=None, end=None):
+        fetcher.starts.append(start)
+        bars = [StockBar(ticker, 'X', day, close=100.0 + i, volume=10) for i, day in enumerate(sessions)
+                if start is None or day >= start.isoformat()]
+        bars[-1].close = fetcher.price
+        bars.reverse()
+        return {'ticker': ticker, 'name': 'X', 'data': bars,
+                'captured_at': fetcher.calendar.now().isoformat()}
+
+    fetcher._fetch_chart = fetch_chart
+    return fetcher
+
+
+def test_us_intraday_bar_is_replaced_after_close(us):
+    us._refresh_one('AAA')
+
+    us.calendar.clock = datetime(2026, 10, 16, 17, 0)
+    us.price, us.starts = 2.0, []
+    result = us._refresh_one('AAA')
+    assert not result.get('up_to_date')
+    assert [str(start) for start in us.starts] == ['2026-10-16']
+    assert us.load_saved('AAA')[0].close == 2.0
+
+    us.starts = []
+    assert us._refresh_one('AAA')['up_to_date']
+    assert us.starts == []
+
+
+def test_captured_time_follows_last_bar(tmp_path):
+    bars = [StockBar('A', 'A', f'2025-01-{day:02d}', close=100 + day, volume=10) for day in range(1, 26)]
+    path = str(tmp_path / 'state.json')
+    merge_bars(path, [], bars[:-1], (5,), captured_at='2025-01-25T11:00:00+09:00')
+    assert captured_at(path, bars[-2].date) == datetime.fromisoformat('2025-01-25T11:00:00+09:00')
+    assert captured_at(path, bars[-1].date) is None
+
+    saved = merge_bars(path, [], bars, (5,), captured_at='2025-01-25T18:00:00+09:00')
+    assert captured_at(path, bars[-1].date).hour == 18
+
+    # 마지막 일봉이 아닌 과거 일봉만 다시 받으면 마지막 일봉을 받은 시각은 그대로
+    revised = StockBar('A', 'A', bars[-5].date, close=bars[-5].close + 1, volume=bars[-5].volume)
+    merge_bars(path, saved, [revised], (5,), captured_at='2025-01-26T09:30:00+09:00')
+    assert captured_at(path, bars[-1].date).hour == 18
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+import pytest
+
+from atomic_file import file_lock
+from history_store import BASE_SUFFIX, LOG_SUFFIX, HistoryStore, Retention
+from stock_record import StockBar
+
+
+def bar(day, close, code='A'):
+    return StockBar(code, 'A', day, open=close, high=close, low=close, close=close, volume=100)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / 'history'))
+
+
+def test_load_merges_base_and_log_later_lines_win(store):
+    store.append('A', [bar('2026-10-14', 1), bar('2026-10-15', 2)])
+    store.compact('A')
+    store.append('A', [bar('2026-10-15', 20), bar('2026-10-16', 3)])
+    store.append('A', [bar('2026-10-16', 30)])
+    assert [(b.date, b.close) for b in store.load('A')] == [('2026-10-14', 1), ('2026-10-15', 20), ('2026-10-16', 30)]
+    assert [b.date for b in store.load('A', start='2026-10-15', end='2026-10-15')] == ['2026-10-15']
+
+
+def test_truncated_log_line_is_skipped(store):
+    store.append('A', [bar('2026-10-15', 2), bar('2026-10-16', 3)])
+    with open(store._path('A', LOG_SUFFIX), 'a', encoding='utf-8') as f:
+        f.write('["2026-10-17", 1, 1')
+    assert [b.date for b in store.load('A')] == ['2026-10-15', '2026-10-16']
+
+
+def test_append_after_truncated_line_starts_new_line(store):
+    store.append('A', [bar('2026-10-15', 2)])
+    with open(store._path('A', LOG_SUFFIX), 'a', encoding='utf-8') as f:
+        f.write('["2026-10-16", 1, 1')
+    # 중단된 기록 뒤에 새 일봉을 붙여도 새 일봉은 잃지 않음
+    store.append('A', [bar('2026-10-16', 3), bar('2026-10-17', 4)])
+    assert [(b.date, b.close) for b in store.load('A')] == [('2026-10-15', 2), ('2026-10-16', 3), ('2026-10-17', 4)]
+
+
+def test_compact_applies_retention_and_clears_log(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'), Retention.parse('3d'))
+    store.append('A', [bar(f'2026-10-{day:02d}', day) for day in range(10, 17)])
+    assert store.compact('A') == 4
+    assert not os.path.exists(store._path('A', LOG_SUFFIX))
+    assert os.path.exists(store._path('A', BASE_SUFFIX))
+    assert [b.date for b in store.load('A')] == ['2026-10-13', '2026-10-14', '2026-10-15', '2026-10-16']
+
+
+def test_auto_compaction_when_log_grows(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'), compact_bytes=200)
+    for day in range(1, 20):
+        store.append('A', [bar(f'2026-09-{day:02d}', day)])
+    # 로그가 기준 크기를 넘을 때마다 기본 파일로 합쳐짐
+    assert os.path.exists(store._path('A', BASE_SUFFIX))
+    assert len(store.load('A')) == 19
+
+
+def test_compact_all_waits_for_ticker_lock(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    store.append('A', [bar('2026-10-15', 1)])
+    events = []
+
+    def writer():
+        # fetcher처럼 종목 잠금을 잡은 채 이력에 덧붙임
+        with file_lock(str(tmp_path / 'stock_A')):
+            events.append('locked')
+            time.sleep(0.2)
+            store.append('A', [bar('2026-10-16', 2)])
+            events.append('appended')
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not events:
+        time.sleep(0.01)
+    assert store.compact_all(lock_dir=str(tmp_path)) == {'A': 2}
+    thread.join()
+    assert events == ['locked', 'appended']
+    assert [b.date for b in store.load('A')] == ['2026-10-15', '2026-10-16']
+
+
+def test_retention_parse():
+    assert Retention.parse(None).unlimited
+    assert Retention.parse('unlimited').unlimited
+    assert Retention.parse('90d').cutoff('2026-10-16') == '2026-07-18'
+    with pytest.raises(ValueError):
+        Retention.parse('soon')
+
+
+def test_tail_matches_full_load(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history'))
+    days = [f'2025-{month:02d}-{day:02d}' for month in range(1, 13) for day in range(1, 29)]
+    store.append('A', [bar(day, i) for i, day in enumerate(days)])
+    store.compact('A')
+    # 로그에는 기본 파일의 과거 날짜를 덮어쓰는 줄과 새 날짜가 섞여 있음
+    store.append('A', [bar(days[-3], 1000), bar('2026-01-01', 2000), bar(days[5], 3000)])
+    full = store.load('A')
+    for count in (1, 3, 20, len(full), len(full) + 5):
+        assert store.tail('A', count) == full[-count:]
+
+    def keep(b):
+        return not b.date.endswith('-01')
+    assert store.tail('A', 30, keep) == [b for b in full if keep(b)][-30:]
+
+
+def test_tail_reads_only_the_end_of_the_base_file(tmp_path, monkeypatch):
+    import history_store
+    store = HistoryStore(str(tmp_path / 'history'))
+    store.append('A', [bar('2020-01-01', 0)] + [bar(f'2025-{m:02d}-{d:02d}', d) for m in range(1, 13)
+                                                 for d in range(1, 29)])
+    store.compact('A')
+    reads = []
+    original = history_store._reversed_lines
+
+    def counting(path, block_size=256):
+        for line in original(path, block_size):
+            reads.append(line)
+            yield line
+
+    monkeypatch.setattr(history_store, '_reversed_lines', counting)
+    assert [b.date for b in store.tail('A', 2)] == ['2025-12-27', '2025-12-28']
+    assert len(reads) == 2
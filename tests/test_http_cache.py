@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import http_cache
+from http_cache import INTRADAY_TTL, CachedResponse, HttpCache, cache_key, expires_at, ttl_for
+from trading_calendar import KRX
+
+
+def kst(*args):
+    return datetime(*args, tzinfo=KRX.tz)
+
+
+def test_ttl_for_session_state():
+    assert ttl_for(KRX, kst(2026, 10, 16, 11, 0)) == INTRADAY_TTL
+    # 장 시작 전: 그날 장 시작까지
+    assert ttl_for(KRX, kst(2026, 10, 16, 8, 0)) == 60 * 60
+    # 장 마감 후: 다음 거래일 장 시작까지, 최대 CLOSED_TTL
+    assert ttl_for(KRX, kst(2026, 10, 16, 16, 0)) == http_cache.CLOSED_TTL
+
+
+def test_entries_stored_during_session_expire_at_close():
+    assert expires_at(KRX, kst(2026, 10, 16, 15, 25).timestamp()) == kst(2026, 10, 16, 15, 26).timestamp()
+    assert expires_at(KRX, kst(2026, 10, 16, 15, 29, 30).timestamp()) == kst(2026, 10, 16, 15, 30).timestamp()
+
+
+def test_intraday_ttl_is_set_per_endpoint():
+    # 일봉 차트처럼 긴 TTL을 넘겨도 장중에 저장한 항목은 장 마감을 넘기지 않음
+    assert expires_at(KRX, kst(2026, 10, 16, 11, 0).timestamp(), 300) == kst(2026, 10, 16, 11, 5).timestamp()
+    assert expires_at(KRX, kst(2026, 10, 16, 15, 27).timestamp(), 300) == kst(2026, 10, 16, 15, 30).timestamp()
+    assert ttl_for(KRX, kst(2026, 10, 16, 11, 0), 300) == 300
+
+
+def test_entries_stored_after_close_last_until_next_open():
+    # 금요일 밤에 저장 → 최대 12시간, 일요일 밤에 저장 → 월요일 장 시작
+    assert expires_at(KRX, kst(2026, 10, 16, 23, 0).timestamp()) == kst(2026, 10, 17, 11, 0).timestamp()
+    assert expires_at(KRX, kst(2026, 10, 18, 22, 0).timestamp()) == kst(2026, 10, 19, 9, 0).timestamp()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(str(tmp_path / 'cache'))
+
+
+def put(cache, url, stored_at):
+    cache.put(url, None, CachedResponse(url, 200, b'body', 'utf-8', from_cache=False))
+    meta_path, _ = cache._paths(cache_key(url))
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['stored_at'] = stored_at
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def test_get_with_calendar_uses_store_time(cache, monkeypatch):
+    url = 'https://finance.naver.com/item/main.nhn?code=005930'
+    put(cache, url, kst(2026, 10, 16, 15, 25).timestamp())
+
+    monkeypatch.setattr(http_cache.time, 'time', lambda: kst(2026, 10, 16, 15, 25, 30).timestamp())
+    hit = cache.get(url, calendar=KRX)
+    assert hit is not None and hit.stored_at == kst(2026, 10, 16, 15, 25).timestamp()
+
+    # 장 마감 뒤에는 장중에 저장한 항목을 쓰지 않음 (읽는 시각의 긴 TTL을 적용하지 않음)
+    monkeypatch.setattr(http_cache.time, 'time', lambda: kst(2026, 10, 16, 16, 0).timestamp())
+    assert cache.get(url, calendar=KRX) is None
+    assert cache.get(url, ttl=ttl_for(KRX, kst(2026, 10, 16, 16, 0))) is not None
+
+
+def test_fetch_uses_endpoint_ttl_with_calendar(cache, monkeypatch):
+    url = 'https://fchart.stock.naver.com/sise.nhn?symbol=005930'
+    put(cache, url, kst(2026, 10, 16, 11, 0).timestamp())
+    monkeypatch.setattr(http_cache.time, 'time', lambda: kst(2026, 10, 16, 11, 3).timestamp())
+    assert cache.get(url, calendar=KRX) is None
+    assert cache.get(url, ttl=300, calendar=KRX) is not None
+    assert cache.fetch(None, url, ttl=300, calendar=KRX).from_cache
+
+
+def test_fetch_offline_ignores_expiry(cache, monkeypatch):
+    url = 'https://finance.naver.com/item/main.nhn?code=000660'
+    put(cache, url, kst(2026, 10, 16, 11, 0).timestamp())
+    monkeypatch.setattr(http_cache.time, 'time', lambda: kst(2026, 10, 16, 18, 0).timestamp())
+    assert cache.fetch(None, url, offline=True, calendar=KRX).content == b'body'
+    with pytest.raises(http_cache.CacheMiss):
+        cache.fetch(None, url + '1', offline=True, calendar=KRX)
+
+
+def test_non_success_responses_are_not_cached(cache):
+    url = 'https://example.com/x'
+    cache.put(url, None, CachedResponse(url, 503, b'', from_cache=False))
+    assert not os.path.exists(cache._paths(cache_key(url))[0])
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import indicator_state
+from indicator_state import (BOLLINGER_WIDTH, BOLLINGER_WINDOW, EMA_WINDOWS, RSI_WINDOW, VOLUME_HIGH_WINDOW,
+                             VOLUME_MA_WINDOW, IndicatorState, merge_bars)
+from stock_record import StockBar
+
+MA_WINDOWS = (5, 10, 20, 60)
+
+
+def make_bars(count, seed=0, start=date(2025, 1, 1)):
+    rng = random.Random(seed)
+    bars, close = [], 100.0
+    for i in range(count):
+        close = max(1.0, close + rng.gauss(0, 2))
+        day = (start + timedelta(days=i)).isoformat()
+        bars.append(StockBar('A', 'A', day, close=round(close, 2), volume=rng.randint(1000, 5000)))
+    return bars
+
+
+def reference(bars):
+    """전체 시계열로 마지막 일봉의 지표를 직접 계산합니다."""
+    closes = [float(bar.close) for bar in bars]
+    volumes = [float(bar.volume or 0) for bar in bars]
+    n = len(closes)
+
+    ma = {w: sum(closes[-w:]) / w if n >= w else None for w in MA_WINDOWS}
+
+    ema = {}
+    for window in EMA_WINDOWS:
+        value = closes[0]
+        for close in closes[1:]:
+            value += 2.0 / (window + 1) * (close - value)
+        ema[window] = value if n >= window else None
+
+    rsi = None
+    changes = [b - a for a, b in zip(closes, closes[1:])]
+    if len(changes) >= RSI_WINDOW:
+        gain = sum(max(c, 0.0) for c in changes[:RSI_WINDOW]) / RSI_WINDOW
+        loss = sum(max(-c, 0.0) for c in changes[:RSI_WINDOW]) / RSI_WINDOW
+        for c in changes[RSI_WINDOW:]:
+            gain = (gain * (RSI_WINDOW - 1) + max(c, 0.0)) / RSI_WINDOW
+            loss = (loss * (RSI_WINDOW - 1) + max(-c, 0.0)) / RSI_WINDOW
+        rsi = 100.0 - 100.0 / (1.0 + gain / loss) if loss else (100.0 if gain else 50.0)
+
+    upper = lower = None
+    if n >= BOLLINGER_WINDOW:
+        window = closes[-BOLLINGER_WINDOW:]
+        mean = sum(window) / BOLLINGER_WINDOW
+        std = math.sqrt(sum((c - mean) ** 2 for c in window) / BOLLINGER_WINDOW)
+        upper, lower = mean + BOLLINGER_WIDTH * std, mean - BOLLINGER_WIDTH * std
+
+    return {
+        'ma': ma,
+        'ema': ema,
+        'rsi': rsi,
+        'bollinger_upper': upper,
+        'bollinger_lower': lower,
+        'volume_ma': sum(volumes[-VOLUME_MA_WINDOW:]) / VOLUME_MA_WINDOW if n >= VOLUME_MA_WINDOW else None,
+        'volume_high': max(volumes[-VOLUME_HIGH_WINDOW:]) if n >= VOLUME_HIGH_WINDOW else None,
+    }
+
+
+def assert_values(got, want):
+    for key in ('ma', 'ema'):
+        assert got[key].keys() == want[key].keys()
+        for window in want[key]:
+            assert_close(got[key][window], want[key][window])
+    for key in ('rsi', 'bollinger_upper', 'bollinger_lower', 'volume_ma', 'volume_high'):
+        assert_close(got[key], want[key])
+
+
+def assert_close(got, want):
+    if want is None:
+        assert got is None
+    else:
+        assert got == pytest.approx(want, rel=1e-9, abs=1e-9)
+
+
+def test_push_matches_full_recompute_at_every_step():
+    bars = make_bars(150, seed=1)
+    state = IndicatorState(MA_WINDOWS)
+    for i, bar in enumerate(bars):
+        assert_values(state.push(bar), reference(bars[:i + 1]))
+
+
+def test_same_day_push_replaces_last_bar():
+    bars = make_bars(40, seed=2)
+    state = IndicatorState(MA_WINDOWS)
+    for bar in bars:
+        state.push(bar)
+    # 장중 갱신: 같은 날짜의 일봉이 여러 번 들어와도 마지막 값만 반영
+    for close in (90.0, 120.0, 101.5):
+        revised = StockBar('A', 'A', bars[-1].date, close=close, volume=777)
+        values = state.push(revised)
+    assert_values(values, reference(bars[:-1] + [revised]))
+
+
+def test_push_rejects_older_dates():
+    bars = make_bars(3)
+    state = IndicatorState(MA_WINDOWS)
+    for bar in bars:
+        state.push(bar)
+    with pytest.raises(ValueError):
+        state.push(bars[0])
+
+
+def test_state_round_trip(tmp_path):
+    bars = make_bars(80, seed=4)
+    state = IndicatorState(MA_WINDOWS)
+    for bar in bars[:-1]:
+        state.push(bar)
+    path = str(tmp_path / 'state.json')
+    state.dump(path)
+    restored = IndicatorState.load(path, MA_WINDOWS)
+    assert_values(restored.push(bars[-1]), reference(bars))
+    # 기준값(윈도우)이 다르면 복원하지 않음
+    assert IndicatorState.load(path, (5, 10)) is None
+
+
+def test_daily_merges_match_one_shot_merge(tmp_path):
+    bars = make_bars(120, seed=5)
+    daily_path = str(tmp_path / 'daily.json')
+    saved = merge_bars(daily_path, [], bars[:30], MA_WINDOWS)
+    for bar in bars[30:]:
+        # 저장 파일처럼 최근 20일만 유지하며 하루씩 병합
+        saved = merge_bars(daily_path, saved[:20], [bar], MA_WINDOWS)
+
+    once_path = str(tmp_path / 'once.json')
+    merged = merge_bars(once_path, [], bars, MA_WINDOWS)
+    for got, want in zip(saved[:20], merged[:20]):
+        assert got.date == want.date
+        for window in MA_WINDOWS:
+            assert_close(got.ma[window], want.ma[window])
+    with open(daily_path, encoding='utf-8') as f:
+        daily = json.load(f)['values']
+    with open(once_path, encoding='utf-8') as f:
+        once = json.load(f)['values']
+    assert daily.keys() == once.keys()
+    daily.update(ma={int(w): v for w, v in daily['ma'].items()}, ema={int(w): v for w, v in daily['ema'].items()})
+    assert_values(daily, reference(bars))
+
+
+def test_changed_past_bar_triggers_recompute(tmp_path):
+    bars = make_bars(60, seed=6)
+    path = str(tmp_path / 'state.json')
+    saved = merge_bars(path, [], bars, MA_WINDOWS)
+
+    # 과거 일봉의 종가가 바뀌면(수정주가) 증분 반영할 수 없으므로 전체를 다시 계산
+    revised = StockBar('A', 'A', bars[-10].date, close=bars[-10].close * 2, volume=bars[-10].volume)
+    state = IndicatorState.load(path, MA_WINDOWS)
+    assert not indicator_state._can_extend(state, {bar.date: bar for bar in saved}, [revised])
+
+    merged = merge_bars(path, saved, [revised], MA_WINDOWS)
+    expected = bars[:-10] + [revised] + bars[-9:]
+    assert merged[0].ma[20] == pytest.approx(reference(expected)['ma'][20])
+    assert merged[9].ma[5] == pytest.approx(reference(expected[:-9])['ma'][5])
+
+
+def test_unchanged_past_bar_extends_incrementally(tmp_path):
+    bars = make_bars(60, seed=7)
+    path = str(tmp_path / 'state.json')
+    saved = merge_bars(path, [], bars[:-1], MA_WINDOWS)
+    state = IndicatorState.load(path, MA_WINDOWS)
+    assert indicator_state._can_extend(state, {bar.date: bar for bar in saved},
+                                       [bars[-2], bars[-1]])
+    merged = merge_bars(path, saved, [bars[-2], bars[-1]], MA_WINDOWS)
+    assert merged[0].ma[60] == pytest.approx(reference(bars)['ma'][60])
+
+
+def test_bars_without_close_are_skipped(tmp_path):
+    bars = make_bars(30, seed=8)
+    broken = StockBar('A', 'A', bars[10].date, close=None, volume=100)
+    existing = bars[:10] + [broken] + bars[11:-1]
+    merged = merge_bars(str(tmp_path / 'state.json'), existing,
+                        [bars[-1], StockBar('A', 'A', '2030-01-01', close=None)], MA_WINDOWS)
+    assert all(bar.close is not None for bar in merged)
+    assert merged[0].date == bars[-1].date
+    assert merged[0].ma[20] == pytest.approx(reference(bars[:10] + bars[11:])['ma'][20])
+
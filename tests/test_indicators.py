@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+import pytest
+
+from indicators import apply_moving_averages, moving_averages, rolling_mean
+from stock_record import StockBar
+from strategy import rolling_mean_matrix
+
+
+def naive_mean(values, window):
+    return [sum(values[i + 1 - window:i + 1]) / window if i >= window - 1 else None
+            for i in range(len(values))]
+
+
+def test_moving_averages_match_naive_windows():
+    rng = random.Random(3)
+    values = [rng.uniform(50, 150) for _ in range(200)]
+    result = moving_averages(values, (1, 5, 20, 60, 250))
+    for window, averages in result.items():
+        expected = naive_mean(values, window)
+        assert len(averages) == len(values)
+        for got, want in zip(averages, expected):
+            assert got == pytest.approx(want) if want is not None else got is None
+
+
+def test_rolling_mean_short_series():
+    assert rolling_mean([1, 2, 3], 5) == [None, None, None]
+    assert rolling_mean([], 5) == []
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        moving_averages([1, 2, 3], (0,))
+
+
+def test_apply_moving_averages_fills_bars_in_place():
+    bars = [StockBar('A', 'A', f'2026-10-{day:02d}', close=day) for day in range(1, 11)]
+    apply_moving_averages(bars, (5,))
+    assert bars[3].ma[5] is None
+    assert bars[4].ma[5] == pytest.approx(3.0)
+    assert bars[-1].ma[5] == pytest.approx(8.0)
+
+
+def test_matrix_rolling_mean_matches_shared_engine():
+    rng = random.Random(5)
+    rows = [[rng.uniform(50, 150) for _ in range(40)] for _ in range(3)]
+    matrix = rolling_mean_matrix(rows, 10)
+    for row, got in zip(rows, matrix):
+        for value, want in zip(got, rolling_mean(row, 10)):
+            assert np.isnan(value) if want is None else value == pytest.approx(want)
+
+
+def test_matrix_rolling_mean_skips_windows_with_gaps():
+    # 상장 전처럼 비어 있는 칸(NaN)이 윈도우에 들어가면 NaN
+    matrix = rolling_mean_matrix([[np.nan, np.nan, 1, 2, 3, 4]], 3)
+    assert np.isnan(matrix[0, :4]).all()
+    assert matrix[0, 4:].tolist() == [2.0, 3.0]
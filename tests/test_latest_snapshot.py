@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from indicators import DEFAULT_MA_WINDOWS, apply_moving_averages
+from latest_snapshot import LatestSnapshot, rebuild, snapshot_entry
+from stock_record import StockBar, write_export
+
+DAYS = [f"2026-09-{day:02d}" for day in range(1, 31)]
+
+
+def series(code, start=100.0, count=25):
+    """최신 날짜가 위이고 MA가 채워진 일봉 리스트"""
+    bars = [StockBar(code, f"{code} Inc", day, open=start + i, high=start + i, low=start + i, close=start + i,
+                     volume=1000 + i) for i, day in enumerate(DAYS[:count])]
+    apply_moving_averages(bars, DEFAULT_MA_WINDOWS)
+    return bars[::-1]
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    os.makedirs(tmp_path / 'us')
+    for code in ('AAA', 'BBB'):
+        write_export('us', str(tmp_path / 'us'), code, series(code), DEFAULT_MA_WINDOWS)
+    return tmp_path
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_entry_has_latest_bar_rules_and_indicators():
+    entry = snapshot_entry(series('AAA'), {'rsi': 70.123, 'ema': {'12': 110.456}, 'volume_high': 1024.4})
+    assert (entry['date'], entry['close'], entry['volume']) == (DAYS[24], 124.0, 1024)
+    assert entry['ma']['5'] == 122.0 and entry['ma']['20'] == 114.5
+    # 꾸준히 오른 종목은 정배열
+    assert entry['aligned'] is True and set(entry['conditions']) == {'below_short', 'near_mid', 'volume_dry'}
+    assert entry['indicators']['rsi'] == 70.12 and entry['indicators']['ema'] == {'12': 110.46}
+    assert entry['indicators']['volume_high'] == 1024.0
+    assert snapshot_entry([StockBar('AAA', 'A', DAYS[0])]) is None
+
+
+def test_first_close_fills_every_saved_ticker(data_root):
+    snapshot = LatestSnapshot('us', str(data_root / 'us'))
+    snapshot.update('AAA', series('AAA', start=200.0))
+    assert snapshot.close() == 1
+
+    market = read(data_root / 'us' / 'latest.json')
+    assert (market['market'], market['count'], market['date']) == ('us', 2, DAYS[24])
+    assert market['tickers']['AAA']['close'] == 224.0
+    assert market['tickers']['BBB']['close'] == 124.0
+    combined = read(data_root / 'latest.json')
+    assert list(combined) == ['us'] and combined['us']['tickers'] == market['tickers']
+
+
+def test_later_runs_only_replace_updated_tickers(data_root):
+    LatestSnapshot('us', str(data_root / 'us')).close()
+    path = data_root / 'us' / 'latest.json'
+    mtime = os.stat(path).st_mtime_ns
+
+    # 바뀐 종목이 없으면 파일을 다시 쓰지 않음
+    assert LatestSnapshot('us', str(data_root / 'us')).close() == 0
+    assert os.stat(path).st_mtime_ns == mtime
+
+    # 두 실행이 각자 다른 종목을 갱신해도 둘 다 남음
+    first = LatestSnapshot('us', str(data_root / 'us'))
+    second = LatestSnapshot('us', str(data_root / 'us'))
+    first.update('AAA', series('AAA', start=300.0))
+    second.update('BBB', series('BBB', start=400.0))
+    first.close()
+    second.close()
+    tickers = read(path)['tickers']
+    assert (tickers['AAA']['close'], tickers['BBB']['close']) == (324.0, 424.0)
+    assert 'AAA' in second and 'CCC' not in second
+
+
+def test_removed_ticker_files_drop_out(data_root):
+    LatestSnapshot('us', str(data_root / 'us')).close()
+    os.remove(data_root / 'us' / 'stock_BBB.json')
+    assert rebuild('us', str(data_root / 'us')) == 1
+    assert list(read(data_root / 'us' / 'latest.json')['tickers']) == ['AAA']
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from benchmarks.bench_quote_parser import synthetic_page
+from http_cache import CachedResponse
+from quote_parser import parse_quote, parse_quote_lxml, parse_quote_soup
+from stock_fetcher import NaverStockFetcher
+
+EXPECTED = {'name': '삼성전자', 'close': 160500, 'open': 160100, 'high': 166500, 'low': 160100,
+            'volume': 39013626}
+
+
+@pytest.mark.parametrize('parse', [parse_quote_lxml, parse_quote_soup])
+def test_parsers_extract_quote_fields(parse):
+    assert parse(synthetic_page(5)) == EXPECTED
+
+
+def test_lxml_stops_after_totalinfo_on_long_pages():
+    # 시세 영역 뒤의 긴 뉴스/재무 영역은 결과에 영향을 주지 않음
+    page = synthetic_page(400)
+    assert parse_quote_lxml(page) == parse_quote_soup(page) == EXPECTED
+
+
+def test_missing_price_and_empty_page():
+    page = '<html><div class="wrap_company"><h2><a>종목</a></h2></div></html>'
+    for parse in (parse_quote_lxml, parse_quote_soup):
+        assert parse(page) == {'name': '종목', 'close': None}
+        assert parse('')['close'] is None
+
+
+def test_unknown_parser_is_rejected():
+    with pytest.raises(ValueError):
+        parse_quote(synthetic_page(1), 'html5lib')
+
+
+def test_quote_without_price_is_not_saved(tmp_path, monkeypatch, capsys):
+    fetcher = NaverStockFetcher(data_dir=str(tmp_path))
+    page = '<html><div class="wrap_company"><h2><a>종목</a></h2></div></html>'.encode('utf-8')
+
+    def get(url, **kwargs):
+        return CachedResponse(url, 200, page, 'utf-8')
+
+    monkeypatch.setattr(fetcher, '_get', get)
+    assert fetcher.fetch_stock_info('000001') is None
+    assert '현재가를 찾을 수 없습니다' in capsys.readouterr().out
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import json
+import pstats
+import threading
+
+import pytest
+
+import run_profile
+from run_profile import REPORT_VERSION, RunProfile
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(run_profile.time, 'perf_counter', clock.perf_counter)
+    return clock
+
+
+def test_nested_stages_record_self_time(clock):
+    profile = RunProfile()
+    with profile.stage('merge', 'A') as counts:
+        clock.now += 1.0
+        with profile.stage('write', 'A') as inner:
+            clock.now += 2.0
+            inner['rows'] = 3
+        clock.now += 0.5
+        counts['rows'] = 20
+    assert profile.stages['merge'] == {'calls': 1, 'seconds': 1.5, 'bytes': 0, 'rows': 20}
+    assert profile.stages['write'] == {'calls': 1, 'seconds': 2.0, 'bytes': 0, 'rows': 3}
+    assert profile.tickers['A']['write']['rows'] == 3
+
+
+def test_stage_records_even_when_block_fails(clock):
+    profile = RunProfile()
+    with pytest.raises(ValueError):
+        with profile.stage('parse', 'A'):
+            clock.now += 1.0
+            raise ValueError('bad page')
+    assert profile.stages['parse']['seconds'] == 1.0
+
+
+def test_meter_counts_items_or_bytes_and_excludes_consumer_time(clock):
+    profile = RunProfile()
+
+    def body():
+        for chunk in (b'abc', b'de'):
+            clock.now += 1.0
+            yield chunk
+
+    for chunk in profile.meter(body(), 'network', 'A', calls=0, count_bytes=True):
+        with profile.stage('parse', 'A'):
+            clock.now += 5.0
+    assert profile.stages['network'] == {'calls': 0, 'seconds': 2.0, 'bytes': 5, 'rows': 0}
+    assert profile.stages['parse']['seconds'] == 10.0
+
+    # 소비자가 중간에 멈춰도 그때까지의 값이 기록됨
+    items = profile.meter(iter(range(10)), 'load', 'B')
+    next(items)
+    next(items)
+    items.close()
+    assert profile.stages['load']['rows'] == 2
+
+
+def test_add_is_thread_safe():
+    profile = RunProfile()
+
+    def work():
+        for _ in range(1000):
+            profile.add('record', 'A', rows=1)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert profile.stages['record']['rows'] == 4000
+    assert profile.tickers['A']['record']['calls'] == 4000
+
+
+def test_report_orders_stages_and_writes_json(tmp_path, capsys):
+    profile = RunProfile()
+    profile.add('custom', seconds=0.1)
+    profile.add('write', 'B', seconds=0.1234567891)
+    profile.add('network', 'A', nbytes=10)
+    path = str(tmp_path / 'profile.json')
+    profile.write_report(path, market='us', failed=0)
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['version'] == REPORT_VERSION and report['market'] == 'us' and report['failed'] == 0
+    assert list(report['stages']) == ['network', 'write', 'custom']
+    assert list(report['tickers']) == ['A', 'B']
+    assert report['stages']['write']['seconds'] == 0.123457
+
+    profile.write_report('-')
+    assert json.loads(capsys.readouterr().out)['stages']['network']['bytes'] == 10
+
+
+def test_cprofile_dump_includes_worker_calls(tmp_path):
+    profile = RunProfile(cprofile=True)
+
+    def worker_task():
+        return sum(range(100))
+
+    assert profile.run(worker_task) == 4950
+    path = str(tmp_path / 'run.pstats')
+    profile.dump_cprofile(path)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'worker_task' in functions
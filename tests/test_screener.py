@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import history_store
+from history_store import HistoryStore
+from market_data import load_series
+from screener import rank, screen
+from stock_record import StockBar, write_export
+from trading_calendar import KRX
+
+
+@pytest.fixture
+def kr_dir(tmp_path):
+    sessions = [day.isoformat() for day in KRX.sessions_between('2026-01-02', '2026-10-16')]
+    bars = [StockBar('000001', '상승', day, close=10000 + 10 * i, volume=1000) for i, day in enumerate(sessions)]
+    # 장기 이력에는 전체, JSON에는 최근 20일 + 토요일로 잘못 저장된 행
+    HistoryStore(str(tmp_path / 'history')).append('000001', bars)
+    saturday = StockBar('000001', '상승', '2026-10-17', close=100, volume=5000)
+    write_export('kr', str(tmp_path), '000001', [saturday] + bars[::-1][:20])
+    return tmp_path, bars
+
+
+def test_screen_ignores_non_session_rows(kr_dir):
+    data_dir, bars = kr_dir
+    [row] = screen('kr', data_dir=str(data_dir), workers=1)
+    assert row['date'] == '2026-10-16'
+    assert row['close'] == bars[-1].close
+    assert row['ma_long'] == pytest.approx(sum(bar.close for bar in bars[-20:]) / 20)
+    assert row['signal'] == '정배열'
+
+
+def test_tail_load_does_not_read_full_history(kr_dir, monkeypatch):
+    data_dir, bars = kr_dir
+    full = load_series('kr', '000001', str(data_dir), sessions_only=True)
+    monkeypatch.setattr(history_store.HistoryStore, 'load', lambda *args, **kwargs: pytest.fail('full load'))
+    tail = load_series('kr', '000001', str(data_dir), tail=25, sessions_only=True)
+    assert [(b.date, b.close) for b in tail] == [(b.date, b.close) for b in full[-25:]]
+    assert [b.date for b in tail] == [b.date for b in bars[-25:]]
+
+
+def test_rank_orders_by_signal_then_conditions():
+    rows = [
+        {'signal': '-', 'conditions': [True, True, True], 'mid_gap': 0.0},
+        {'signal': '정배열', 'conditions': [True, False, False], 'mid_gap': 0.05},
+        {'signal': '정배열', 'conditions': [True, True, False], 'mid_gap': 0.10},
+        {'signal': '매수', 'conditions': [True, True, True], 'mid_gap': None},
+    ]
+    ranked = rank(rows)
+    assert [(row['signal'], sum(row['conditions'])) for row in ranked] == [
+        ('매수', 3), ('정배열', 2), ('정배열', 1), ('-', 3)]
+    assert [row['rank'] for row in ranked] == [1, 2, 3, 4]
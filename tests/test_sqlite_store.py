@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+
+import pytest
+
+import sqlite_store
+import stock_fetcher_us
+from sqlite_store import SqliteStore
+from stock_record import StockBar
+
+DAYS = ['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15', '2026-10-16']
+
+
+def bars(code, closes, days=DAYS):
+    return [StockBar(code, code, day, open=close, high=close, low=close, close=close, volume=10)
+            for day, close in zip(days, closes)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(str(tmp_path / 'stocks.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_upsert_replaces_same_date_and_skips_missing_close(store):
+    assert store.upsert('kr', bars('005930', [100, 101]) + [StockBar('005930', 'X', DAYS[2])]) == 2
+    store.upsert('kr', [StockBar('005930', '삼성전자', DAYS[1], close=105.0)])
+    series = store.series('kr', '005930')
+    assert [(bar.date, bar.close) for bar in series] == [(DAYS[0], 100), (DAYS[1], 105)]
+    # 국내 가격은 정수로 돌려줌
+    assert isinstance(series[1].close, int) and series[1].name == '삼성전자'
+
+
+def test_batch_commits_once_even_when_block_fails(store, tmp_path):
+    other = sqlite3.connect(str(tmp_path / 'stocks.sqlite3'))
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.upsert('us', bars('AAA', [1.0, 2.0]))
+            # 블록이 끝나기 전에는 기록되지 않음
+            assert other.execute("SELECT COUNT(*) FROM bars").fetchone()[0] == 0
+            raise RuntimeError('fetch failed')
+    assert other.execute("SELECT COUNT(*) FROM bars").fetchone()[0] == 2
+    other.close()
+
+
+def test_series_reads_ma_lookback_before_start(store):
+    store.upsert('us', bars('AAA', [1.0, 2.0, 3.0, 4.0, 5.0]))
+    series = store.series('us', 'AAA', start=DAYS[3], ma_windows=(3,))
+    assert [bar.date for bar in series] == DAYS[3:]
+    assert [bar.ma[3] for bar in series] == [3.0, 4.0]
+
+
+def test_cross_section_only_returns_codes_trading_that_day(store):
+    store.upsert('us', bars('AAA', [1.0, 2.0, 3.0, 4.0, 5.0]))
+    store.upsert('us', bars('BBB', [9.0, 9.0], DAYS[:2]))
+    section = store.cross_section('us', DAYS[-1], ma_windows=(5,))
+    assert [(bar.code, bar.ma[5]) for bar in section] == [('AAA', 3.0)]
+    assert store.codes('us') == ['AAA', 'BBB']
+    assert store.dates('us', start=DAYS[3]) == DAYS[3:]
+
+
+def test_export_writes_newest_first(store, tmp_path):
+    store.upsert('us', bars('AAA', [1.0, 2.0, 3.0]))
+    assert store.export_market('us', str(tmp_path / 'out'), days=2, ma_windows=(2,)) == {'AAA': 2}
+    with open(tmp_path / 'out' / 'stock_AAA.json', encoding='utf-8') as f:
+        rows = json.load(f)
+    assert [(row['날짜'], row['MA2']) for row in rows] == [(DAYS[2], 2.5), (DAYS[1], 1.5)]
+
+
+def run_us_main(tmp_path, monkeypatch, refresh):
+    monkeypatch.setattr(stock_fetcher_us, 'US_DATA_DIR', str(tmp_path / 'us'))
+    monkeypatch.setattr(stock_fetcher_us.YahooStockFetcher, 'refresh_watchlist', refresh)
+    closed = []
+    close = SqliteStore.close
+    monkeypatch.setattr(sqlite_store.SqliteStore, 'close', lambda self: closed.append(close(self)))
+    monkeypatch.setattr('sys.argv', ['stock_fetcher_us.py', 'AAA', '--no-cache',
+                                     '--db', str(tmp_path / 'stocks.sqlite3')])
+    return closed
+
+
+def test_us_main_closes_store_when_refresh_raises(tmp_path, monkeypatch):
+    def refresh(self, tickers, task=None):
+        raise RuntimeError('boom')
+
+    closed = run_us_main(tmp_path, monkeypatch, refresh)
+    with pytest.raises(RuntimeError):
+        stock_fetcher_us.main()
+    assert closed == [None]
+
+
+def test_us_main_closes_store_and_exits_nonzero_on_failures(tmp_path, monkeypatch):
+    def refresh(self, tickers, task=None):
+        return {}, {'AAA': 'not found'}
+
+    closed = run_us_main(tmp_path, monkeypatch, refresh)
+    with pytest.raises(SystemExit) as exit_info:
+        stock_fetcher_us.main()
+    assert exit_info.value.code == 1
+    assert closed == [None]
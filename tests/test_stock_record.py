@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+
+import pytest
+
+from stock_record import (StockBar, from_kr_row, from_us_row, parse_int, parse_number, to_kr_row, to_us_row,
+                          write_export)
+
+KR_ROW = {
+    '종목코드': '005930', '종목명': '삼성전자', '날짜': '2026-10-16',
+    '시가': '160100', '고가': '161,000', '저가': '159000', '종가': '160500', '거래량': '12345678',
+    'MA5': '160,200원', 'MA10': '158,950원', 'MA20': 'N/A',
+}
+
+
+def test_parse_number_formats():
+    assert parse_number('160,100') == 160100
+    assert parse_number('148,565원') == 148565
+    assert parse_number('255.16') == pytest.approx(255.16)
+    assert parse_number('N/A') is None
+    assert parse_number('') is None
+    assert parse_number(12) == 12
+    assert parse_int('1,234.0') == 1234
+
+
+def test_kr_row_round_trip():
+    bar = from_kr_row(KR_ROW)
+    assert (bar.open, bar.high, bar.close, bar.volume) == (160100, 161000, 160500, 12345678)
+    assert bar.ma == {5: 160200, 10: 158950, 20: None}
+    assert to_kr_row(bar, (5, 10, 20)) == KR_ROW | {'고가': '161000'}
+
+
+def test_kr_row_omits_missing_prices():
+    row = to_kr_row(StockBar('005930', '삼성전자', '2026-10-16', close=160500), (5,))
+    assert row == {'종목코드': '005930', '종목명': '삼성전자', '날짜': '2026-10-16', '종가': '160500', 'MA5': 'N/A'}
+
+
+def test_us_row_round_trip():
+    bar = StockBar('AAPL', 'Apple', '2026-10-16', 250.1, 255.5, 249.0, 255.16, 5000, {5: 252.3456, 10: None})
+    row = to_us_row(bar, (5, 10))
+    assert row['MA5'] == 252.35 and row['MA10'] is None
+    restored = from_us_row(row)
+    assert (restored.close, restored.volume, restored.ma) == (255.16, 5000, {5: 252.35, 10: None})
+
+
+def test_bars_are_slotted_and_compare_by_value():
+    bar = StockBar('A', 'A', '2026-10-16', close=1)
+    with pytest.raises(AttributeError):
+        bar.extra = 1
+    assert bar == StockBar('A', 'A', '2026-10-16', close=1)
+    assert bar != StockBar('A', 'A', '2026-10-16', close=2)
+
+
+def test_write_export_kr_writes_json_and_csv(tmp_path):
+    bars = [from_kr_row(KR_ROW)]
+    assert write_export('kr', str(tmp_path), '005930', bars, (5, 10, 20)) == 1
+    with open(tmp_path / 'stock_005930.json', encoding='utf-8') as f:
+        assert json.load(f)[0]['MA5'] == '160,200원'
+    with open(tmp_path / 'stock_005930.csv', encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['종가'] == '160500' and rows[0]['MA20'] == 'N/A'
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import math
+
+import pytest
+
+import sweep
+from backtest import run
+from history_store import HistoryStore
+from stock_record import StockBar, write_export
+from strategy import StrategyParams
+from trading_calendar import KRX
+
+
+@pytest.fixture
+def kr_dir(tmp_path):
+    sessions = [day.isoformat() for day in KRX.sessions_between('2026-03-02', '2026-10-16')]
+    # 상승 추세 중 주기적인 눌림목이 있어 정배열 매수 신호가 나오는 시계열
+    bars = []
+    for i, day in enumerate(sessions):
+        close = round(10000 * (1.004 ** i) * (1 + 0.03 * math.sin(i / 3)))
+        volume = 1000 + (i * 37) % 400
+        bars.append(StockBar('000001', 'A', day, open=close, high=close + 50, low=close - 150, close=close,
+                             volume=volume))
+    HistoryStore(str(tmp_path / 'history')).append('000001', bars)
+    saturday = StockBar('000001', 'A', '2026-10-17', open=1, high=1, low=1, close=1, volume=1)
+    write_export('kr', str(tmp_path), '000001', [saturday] + bars[::-1][:19])
+    return tmp_path, sessions
+
+
+def test_grid_combinations_sample_is_grouped_by_windows():
+    combos = sweep.grid_combinations(samples=10, seed=1)
+    assert len(combos) == 10
+    windows = [combo['ma_windows'] for combo in combos]
+    assert windows == sorted(windows)
+    assert len(sweep.grid_combinations()) == math.prod(len(values) for values in sweep.DEFAULT_GRID.values())
+
+
+def test_sweep_matches_backtest_on_sessions_only(kr_dir, monkeypatch):
+    data_dir, sessions = kr_dir
+    loaded = []
+
+    def load_matrix(*args, **kwargs):
+        matrix = sweep_load(*args, **kwargs)
+        loaded.append(matrix.dates)
+        return matrix
+
+    sweep_load = sweep.load_matrix
+    monkeypatch.setattr(sweep, 'load_matrix', load_matrix)
+    combos = [{'ma_windows': (5, 10, 20)}, {'ma_windows': (3, 10, 20), 'take_profit': 0.10}]
+    results = sweep.sweep('kr', combos, workers=1, data_dir=str(data_dir))
+
+    assert loaded == [sessions]
+    for combo, result in zip(combos, results):
+        summary = run('kr', params=StrategyParams(**combo), data_dir=str(data_dir), workers=1).summary()
+        assert result['params'] == combo
+        assert result['total_return'] == pytest.approx(summary['total_return'])
+        assert result['trades'] == summary['trades']
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime, timezone
+
+from trading_calendar import KRX, NYSE
+
+
+def test_weekends_and_holidays_are_not_sessions():
+    assert KRX.is_session('2026-10-16')
+    assert not KRX.is_session('2026-10-17')  # 토요일
+    assert not KRX.is_session('2026-10-09')  # 한글날
+    assert not NYSE.is_session('2026-11-26')  # 추수감사절
+    assert NYSE.is_session(date(2026, 11, 27))
+
+
+def test_current_session_before_and_after_open():
+    # 장 시작 전에는 직전 거래일, 장 시작부터는 오늘
+    assert KRX.current_session(datetime(2026, 10, 16, 8, 59)) == date(2026, 10, 15)
+    assert KRX.current_session(datetime(2026, 10, 16, 9, 0)) == date(2026, 10, 16)
+    assert KRX.current_session(datetime(2026, 10, 16, 20, 0)) == date(2026, 10, 16)
+
+
+def test_current_session_skips_weekends_and_holidays():
+    assert KRX.current_session(datetime(2026, 10, 18, 12, 0)) == date(2026, 10, 16)
+    # 한글날(금) 장중 시각 → 목요일
+    assert KRX.current_session(datetime(2026, 10, 9, 11, 0)) == date(2026, 10, 8)
+    # 추석 연휴(9/24~9/28) 다음 거래일 장 시작 전 → 연휴 전 마지막 거래일
+    assert KRX.current_session(datetime(2026, 9, 29, 8, 0)) == date(2026, 9, 23)
+
+
+def test_is_final_at_close_time():
+    assert not KRX.is_final('2026-10-16', datetime(2026, 10, 16, 15, 29, 59))
+    assert KRX.is_final('2026-10-16', datetime(2026, 10, 16, 15, 30))
+    assert KRX.is_final('2026-10-15', datetime(2026, 10, 16, 10, 0))
+    assert not NYSE.is_final('2026-10-16', datetime(2026, 10, 16, 15, 59))
+    assert NYSE.is_final('2026-10-16', datetime(2026, 10, 16, 16, 0))
+
+
+def test_is_final_converts_aware_times_to_exchange_time():
+    # 20:00 UTC = 16:00 EDT (마감), 19:59 UTC = 15:59 EDT (장중)
+    assert NYSE.is_final('2026-10-16', datetime(2026, 10, 16, 20, 0, tzinfo=timezone.utc))
+    assert not NYSE.is_final('2026-10-16', datetime(2026, 10, 16, 19, 59, tzinfo=timezone.utc))
+    # 06:30 UTC = 15:30 KST
+    assert KRX.is_final('2026-10-16', datetime(2026, 10, 16, 6, 30, tzinfo=timezone.utc))
+
+
+def test_is_open():
+    assert KRX.is_open(datetime(2026, 10, 16, 9, 0))
+    assert not KRX.is_open(datetime(2026, 10, 16, 15, 30))
+    assert not KRX.is_open(datetime(2026, 10, 9, 11, 0))
+
+
+def test_missing_sessions_across_holidays():
+    now = datetime(2026, 9, 30, 18, 0)
+    assert KRX.missing_sessions('2026-09-22', now) == [date(2026, 9, 23), date(2026, 9, 29), date(2026, 9, 30)]
+    assert KRX.missing_sessions('2026-09-30', now) == []
+    assert KRX.missing_sessions(None, now) == []
+
+
+def test_sessions_since_counts_both_ends():
+    now = datetime(2026, 9, 30, 18, 0)
+    assert KRX.sessions_since('2026-09-23', now) == 3
+    assert KRX.sessions_since('2026-09-30', now) == 1
+    # 장 시작 전에는 오늘이 아직 포함되지 않음
+    assert KRX.sessions_since('2026-09-30', datetime(2026, 9, 30, 8, 0)) == 0
+
+
+def test_previous_and_next_session():
+    assert KRX.previous_session('2026-10-12') == date(2026, 10, 8)
+    assert KRX.next_session('2026-10-08') == date(2026, 10, 12)
+    assert NYSE.next_session('2026-07-02') == date(2026, 7, 6)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import pytest
+import requests
+
+import transport
+from transport import CircuitBreaker, CircuitOpenError, TokenBucket, Transport
+
+URL = 'https://finance.naver.com/item/main.nhn?code=005930'
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """outcomes를 순서대로 돌려주는 세션 (예외 인스턴스면 발생)"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, params=None, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(transport.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(transport.time, 'sleep', clock.sleep)
+    monkeypatch.setattr(transport.random, 'random', lambda: 1.0)
+    return clock
+
+
+def make_transport(outcomes, **kwargs):
+    kwargs.setdefault('host_limits', {})
+    client = Transport(**kwargs)
+    client._session = FakeSession(outcomes)
+    return client
+
+
+def test_retries_server_errors_with_backoff(clock):
+    client = make_transport([FakeResponse(503), FakeResponse(502), FakeResponse(200)])
+    assert client.get(URL).status_code == 200
+    assert client._session.calls == 3
+    assert clock.sleeps == [transport.BACKOFF_BASE, transport.BACKOFF_BASE * 2]
+    assert client.stats['retries'] == 2
+
+
+def test_returns_last_error_response_after_retries(clock):
+    client = make_transport([FakeResponse(500)] * 3, retries=2)
+    assert client.get(URL).status_code == 500
+    assert client._session.calls == 3
+
+
+def test_connection_errors_raise_after_retries(clock):
+    client = make_transport([requests.ConnectionError('down')] * 2, retries=1)
+    with pytest.raises(requests.ConnectionError):
+        client.get(URL)
+    # 호출 측은 requests를 import하지 않고 OSError로 받을 수 있음
+    assert issubclass(requests.ConnectionError, OSError)
+
+
+def test_retry_after_throttles_without_failure(clock):
+    client = make_transport([FakeResponse(429, {'Retry-After': '2'}), FakeResponse(200)], failure_threshold=1)
+    assert client.get(URL).status_code == 200
+    assert clock.sleeps == [2.0]
+    assert client.stats['throttled'] == 1
+    assert client.circuit_state(URL) == 'closed'
+
+
+def test_circuit_opens_then_probes_after_reset(clock):
+    client = make_transport([FakeResponse(503)] * 3 + [FakeResponse(200)],
+                            retries=0, failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        client.get(URL)
+    assert client.circuit_state(URL) == 'open'
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+    assert client.stats['rejected'] == 1
+
+    clock.now += 30
+    assert client.get(URL).status_code == 200
+    assert client.circuit_state(URL) == 'closed'
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=5)
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 5
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_token_bucket_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_other_request_errors_do_not_wedge_half_open_probe(clock):
+    client = make_transport([FakeResponse(503), requests.TooManyRedirects('loop'), FakeResponse(200)],
+                            retries=0, failure_threshold=1, reset_timeout=5)
+    client.get(URL)
+    clock.now += 5
+    with pytest.raises(requests.TooManyRedirects):
+        client.get(URL)
+    assert client._session.calls == 2
+    assert client.circuit_state(URL) == 'open'
+
+    clock.now += 5
+    assert client.get(URL).status_code == 200
+    assert client.circuit_state(URL) == 'closed'
+
+
+def test_unexpected_error_releases_half_open_probe(clock):
+    client = make_transport([FakeResponse(503), KeyboardInterrupt(), FakeResponse(200)],
+                            retries=0, failure_threshold=1, reset_timeout=5)
+    client.get(URL)
+    clock.now += 5
+    with pytest.raises(KeyboardInterrupt):
+        client.get(URL)
+    assert client.circuit_state(URL) == 'half_open'
+    assert client.get(URL).status_code == 200
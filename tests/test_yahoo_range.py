@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import date, datetime, time
+
+import pytest
+
+from history_store import HistoryStore
+from http_cache import CachedResponse
+from stock_fetcher_us import YAHOO_RANGES, YahooStockFetcher, choose_range
+from trading_calendar import NYSE
+
+LISTED = '2023-03-01'
+
+
+class FakeYahoo:
+    """상장일(LISTED)부터 매 거래일 일봉이 있는 차트 API (range 또는 period1/period2)"""
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+        self.requests = []
+
+    @property
+    def sessions(self):
+        return self.calendar.sessions_between(LISTED, self.calendar.current_session())
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append(dict(params))
+        sessions = self.sessions
+        if 'period1' in params:
+            start = datetime.fromtimestamp(int(params['period1']), self.calendar.tz).date()
+            end = datetime.fromtimestamp(int(params['period2']), self.calendar.tz).date()
+            days = [day for day in sessions if start <= day < end]
+        else:
+            days = sessions[-dict(YAHOO_RANGES)[params['range']]:]
+        timestamps = [int(datetime.combine(day, time(9, 30), self.calendar.tz).timestamp()) for day in days]
+        closes = [100.0 + day.toordinal() % 50 for day in days]
+        first_trade = int(datetime.combine(sessions[0], time(9, 30), self.calendar.tz).timestamp())
+        body = {'chart': {'result': [{
+            'meta': {'shortName': 'Test', 'currency': 'USD', 'firstTradeDate': first_trade},
+            'timestamp': timestamps,
+            'indicators': {'quote': [{'open': closes, 'high': closes, 'low': closes, 'close': closes,
+                                      'volume': [1000] * len(days)}]}}]}}
+        return CachedResponse(url, 200, json.dumps(body).encode('utf-8'), 'utf-8')
+
+
+@pytest.fixture
+def yahoo(tmp_path, fixed_calendar):
+    fetcher = YahooStockFetcher(data_dir=str(tmp_path), history=HistoryStore(str(tmp_path / 'history')))
+    fetcher.calendar = fixed_calendar(NYSE, datetime(2026, 10, 14, 17, 0))
+    fetcher.api = FakeYahoo(fetcher.calendar)
+
+    def get(url, params=None, code=None, ttl=None):
+        return fetcher.api.get(url, params)
+
+    fetcher._get = get
+    return fetcher
+
+
+def period(fetcher, params):
+    return tuple(datetime.fromtimestamp(int(params[key]), fetcher.calendar.tz).date().isoformat()
+                 for key in ('period1', 'period2'))
+
+
+def test_choose_range_picks_smallest_covering_range():
+    assert choose_range(5) == '5d'
+    assert choose_range(22) == '3mo'
+    assert choose_range(3000) == 'max'
+
+
+def test_period_params_are_exchange_midnights(yahoo):
+    params = yahoo._period_params(date(2026, 10, 13), date(2026, 10, 14))
+    assert period(yahoo, params) == ('2026-10-13', '2026-10-15')
+
+
+def test_refresh_requests_only_missing_sessions(yahoo):
+    yahoo._refresh_one('AAA')
+    assert yahoo.api.requests[0]['range'] == '1mo'
+
+    # 다음 거래일 마감 후: 새 거래일 하나만 요청
+    yahoo.calendar.clock = datetime(2026, 10, 16, 17, 0)
+    info = yahoo._refresh_one('AAA')
+    assert period(yahoo, yahoo.api.requests[1]) == ('2026-10-15', '2026-10-17')
+    assert [bar.date for bar in info['data']] == ['2026-10-16', '2026-10-15']
+    assert yahoo.load_saved('AAA')[0].date == '2026-10-16'
+
+    # 이미 확정 시세가 저장되어 있으면 요청하지 않음
+    assert yahoo._refresh_one('AAA')['up_to_date']
+    assert len(yahoo.api.requests) == 2
+
+
+def test_backfill_fetches_newest_chunk_first_until_listing(yahoo):
+    info = yahoo.backfill('AAA', chunk_days=365)
+    periods = [period(yahoo, params) for params in yahoo.api.requests]
+    assert periods[0] == ('2025-10-15', '2026-10-15')
+    # 기간이 겹치거나 비지 않고 이어지며, 상장일 이전은 요청하지 않음
+    assert all(older[1] == newer[0] for newer, older in zip(periods, periods[1:]))
+    assert periods[-1][0] <= LISTED < periods[-1][1]
+    assert len(periods) == 4
+
+    stored = [bar.date for bar in yahoo.history.load('AAA')]
+    assert stored == [day.isoformat() for day in yahoo.api.sessions]
+    assert info['backfilled'] == len(stored)
+    assert len(yahoo.load_saved('AAA')) == 20
+
+
+def test_backfill_stops_at_requested_start(yahoo):
+    yahoo.backfill('AAA', start=date(2026, 1, 2), chunk_days=200)
+    periods = [period(yahoo, params) for params in yahoo.api.requests]
+    assert periods == [('2026-03-29', '2026-10-15'), ('2026-01-02', '2026-03-29')]
+    assert yahoo.history.load('AAA')[0].date == '2026-01-02'
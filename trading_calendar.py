@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+KRX / NYSE 거래일 달력 (오프라인)
+
+주말과 휴장일 표로 거래일(session)을 판정해, 저장된 데이터에서 누락된 거래일을
+정확히 계산하고 필요한 만큼만 과거 데이터를 요청하는 데 사용합니다.
+휴장일 표에 없는 연도는 주말만 휴장일로 취급하므로 매년 표를 갱신해야 합니다.
+"""
+
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+# 한국거래소 휴장일 (주말 제외)
+KRX_HOLIDAYS = frozenset(date.fromisoformat(d) for d in (
+    # 2025
+    '2025-01-01', '2025-01-27', '2025-01-28', '2025-01-29', '2025-01-30',
+    '2025-03-03', '2025-05-01', '2025-05-05', '2025-05-06', '2025-06-03',
+    '2025-06-06', '2025-08-15', '2025-10-03', '2025-10-06', '2025-10-07',
+    '2025-10-08', '2025-10-09', '2025-12-25', '2025-12-31',
+    # 2026
+    '2026-01-01', '2026-02-16', '2026-02-17', '2026-02-18', '2026-03-02',
+    '2026-05-01', '2026-05-05', '2026-05-25', '2026-06-03', '2026-08-17',
+    '2026-09-24', '2026-09-25', '2026-09-28', '2026-10-05', '2026-10-09',
+    '2026-12-25', '2026-12-31',
+    # 2027
+    '2027-01-01', '2027-02-08', '2027-02-09', '2027-03-01', '2027-05-05',
+    '2027-05-13', '2027-08-16', '2027-09-14', '2027-09-15', '2027-09-16',
+    '2027-10-04', '2027-10-11', '2027-12-27', '2027-12-31',
+))
+
+# 뉴욕증권거래소 휴장일 (주말 제외)
+NYSE_HOLIDAYS = frozenset(date.fromisoformat(d) for d in (
+    # 2025
+    '2025-01-01', '2025-01-09', '2025-01-20', '2025-02-17', '2025-04-18',
+    '2025-05-26', '2025-06-19', '2025-07-04', '2025-09-01', '2025-11-27',
+    '2025-12-25',
+    # 2026
+    '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25',
+    '2026-06-19', '2026-07-03', '2026-09-07', '2026-11-26', '2026-12-25',
+    # 2027
+    '2027-01-01', '2027-01-18', '2027-02-15', '2027-03-26', '2027-05-31',
+    '2027-06-18', '2027-07-05', '2027-09-06', '2027-11-25', '2027-12-24',
+))
+
+
+def _to_date(value):
+    """date 또는 "YYYY-MM-DD" 문자열을 date로 변환합니다."""
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+class TradingCalendar:
+    def __init__(self, name, timezone, open_time, close_time, holidays):
+        """
+        Args:
+            name (str): 거래소 이름
+            timezone (str): 거래소 시간대 (예: Asia/Seoul)
+            open_time (time): 정규장 시작 시각 (현지)
+            close_time (time): 정규장 종료 시각 (현지)
+            holidays: 휴장일 date 집합 (주말 제외)
+        """
+        self.name = name
+        self.tz = ZoneInfo(timezone)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.holidays = holidays
+
+    def now(self, now=None):
+        """거래소 현지 시각 (now가 naive datetime이면 현지 시각으로 간주)"""
+        if now is None:
+            return datetime.now(self.tz)
+        if now.tzinfo is None:
+            return now.replace(tzinfo=self.tz)
+        return now.astimezone(self.tz)
+
+    def today(self, now=None):
+        """거래소 현지 날짜"""
+        return self.now(now).date()
+
+    def is_session(self, day):
+        """거래일 여부 (주말/휴장일이면 False)"""
+        day = _to_date(day)
+        return day.weekday() < 5 and day not in self.holidays
+
+    def previous_session(self, day):
+        """day 이전(미포함)의 가장 가까운 거래일"""
+        day = _to_date(day) - timedelta(days=1)
+        while not self.is_session(day):
+            day -= timedelta(days=1)
+        return day
+
+    def next_session(self, day):
+        """day 이후(미포함)의 가장 가까운 거래일"""
+        day = _to_date(day) + timedelta(days=1)
+        while not self.is_session(day):
+            day += timedelta(days=1)
+        return day
+
+    def sessions_between(self, start, end):
+        """start~end(양끝 포함) 사이의 거래일 리스트"""
+        day, end = _to_date(start), _to_date(end)
+        sessions = []
+        while day <= end:
+            if self.is_session(day):
+                sessions.append(day)
+            day += timedelta(days=1)
+        return sessions
+
+    def is_open(self, now=None):
+        """정규장 운영 중 여부"""
+        local = self.now(now)
+        return self.is_session(local.date()) and self.open_time <= local.time() < self.close_time
+
+    def current_session(self, now=None):
+        """
+        시세가 존재하는 가장 최근 거래일.
+
+        오늘이 거래일이고 장이 열렸으면 오늘, 아니면 직전 거래일입니다.
+        현재가(장중 시세)를 저장할 날짜로 사용하므로 휴장일이 나오지 않습니다.
+        """
+        local = self.now(now)
+        today = local.date()
+        if self.is_session(today) and local.time() >= self.open_time:
+            return today
+        return self.previous_session(today)
+
+    def is_final(self, day, now=None):
+        """day 거래일의 시세가 장 마감으로 확정되었는지 여부"""
+        day = _to_date(day)
+        local = self.now(now)
+        return day < local.date() or (day == local.date() and local.time() >= self.close_time)
+
+    def missing_sessions(self, last_date, now=None):
+        """
+        저장된 마지막 날짜 이후 current_session()까지의 누락 거래일
+
+        Args:
+            last_date: 저장된 가장 최근 날짜 (date 또는 "YYYY-MM-DD"), None이면 빈 리스트
+
+        Returns:
+            list: 누락된 거래일 date 리스트 (오래된 날짜부터)
+        """
+        if last_date is None:
+            return []
+        return self.sessions_between(_to_date(last_date) + timedelta(days=1), self.current_session(now))
+
+    def sessions_since(self, day, now=None):
+        """
+        day부터 current_session()까지(양끝 포함)의 거래일 수.
+
+        "최근 N개 일봉" 형태의 API로 day의 데이터까지 받으려면 N이 이 값이어야 합니다.
+        """
+        return len(self.sessions_between(day, self.current_session(now)))
+
+
+# 한국거래소 (정규장 09:00~15:30 KST)
+KRX = TradingCalendar('KRX', 'Asia/Seoul', time(9, 0), time(15, 30), KRX_HOLIDAYS)
+
+# 뉴욕증권거래소 (정규장 09:30~16:00 ET)
+NYSE = TradingCalendar('NYSE', 'America/New_York', time(9, 30), time(16, 0), NYSE_HOLIDAYS)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+네이버 금융 / fchart / Yahoo chart 요청 공통 전송 계층
+
+두 fetcher의 모든 요청이 이 모듈의 Transport.get을 거칩니다.
+
+- 호스트별 token bucket으로 초당 요청 수 제한 (여러 스레드가 같은 버킷을 공유)
+- 연결/읽기 타임아웃 (응답 없는 연결 하나가 배치 전체를 멈추지 않도록)
+- 연결 오류, 타임아웃, 429/5xx는 지수 백오프(+무작위 jitter) 후 재시도,
+  429의 Retry-After는 해당 호스트의 모든 요청을 그만큼 늦춤
+- 호스트별 circuit breaker: 연속 실패가 기준을 넘으면 일정 시간 요청 없이 바로 실패시키고,
+  이후 요청 하나로 회복 여부를 확인
+
+requests는 첫 요청 때 import합니다 (캐시만 쓰는 실행, --help 등은 requests를 읽지 않음).
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# 연결 / 읽기 타임아웃 (초)
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# 재시도 횟수와 백오프 (초): attempt번째 재시도 전 0 ~ min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt) 대기
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+# Retry-After 헤더를 따를 최대 시간 (초)
+RETRY_AFTER_MAX = 60.0
+
+# 재시도할 HTTP 상태 코드
+RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+
+# circuit breaker: 연속 실패 횟수 기준 / 열린 뒤 다시 시도하기까지 대기 (초)
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+# 알려진 호스트별 (초당 요청 수, 버스트) - 목록에 없는 호스트는 Transport의 rate/burst 적용
+HOST_LIMITS = {
+    'finance.naver.com': (10.0, 10),
+    'fchart.stock.naver.com': (10.0, 10),
+    'query1.finance.yahoo.com': (4.0, 8),
+    'query2.finance.yahoo.com': (4.0, 8),
+}
+
+
+class CircuitOpenError(IOError):
+    """
+    circuit breaker가 열려 있어 요청을 보내지 않은 경우
+
+    requests.RequestException과 같이 IOError(OSError) 하위 클래스라서, 호출 측은
+    requests를 import하지 않고 OSError로 두 오류를 함께 받을 수 있습니다.
+    """
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷 (스레드 안전)"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 대기합니다. 대기한 시간(초)을 반환합니다."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """seconds 동안 토큰이 생기지 않도록 비웁니다 (429 Retry-After)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class CircuitBreaker:
+    """
+    호스트 하나의 연속 실패를 추적합니다.
+
+    closed(정상) → 연속 실패 threshold회 → open(요청 차단) → reset_timeout 경과 →
+    half_open(요청 하나만 허용) → 성공하면 closed, 실패하면 다시 open
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """지금 요청을 보내도 되는지 여부"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self):
+        """결과를 기록하지 못한 요청의 half_open 확인 자리를 비웁니다 (상태는 그대로)."""
+        with self._lock:
+            self._probing = False
+
+
+def _retry_after(response):
+    """Retry-After 헤더(초)를 읽습니다. 없거나 날짜 형식이면 None."""
+    value = response.headers.get('Retry-After')
+    try:
+        return min(RETRY_AFTER_MAX, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class Transport:
+    def __init__(self, headers=None, pool_size=4, rate=None, burst=None, host_limits=None,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=MAX_RETRIES,
+                 failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        """
+        Args:
+            headers (dict): 모든 요청에 붙일 헤더
+            pool_size (int): 호스트별 keep-alive 커넥션 수 (동시 요청 수에 맞춤)
+            rate (float): host_limits에 없는 호스트의 초당 요청 수 (None이면 제한 없음)
+            burst (int): rate에 대한 버스트 크기
+            host_limits (dict): {호스트: (초당 요청 수, 버스트)} (None이면 HOST_LIMITS)
+            timeout: (연결, 읽기) 타임아웃 (초)
+            retries (int): 일시적 오류 재시도 횟수
+            failure_threshold (int): circuit breaker가 열리는 연속 실패 횟수
+            reset_timeout (float): circuit breaker가 열린 뒤 다시 시도하기까지 대기 (초)
+        """
+        self.headers = headers or {}
+        self.pool_size = pool_size
+        self._session = None
+
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = HOST_LIMITS if host_limits is None else host_limits
+        self.timeout = timeout
+        self.retries = retries
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'rejected': 0, 'wait_seconds': 0.0}
+
+    @property
+    def session(self):
+        """keep-alive requests.Session (첫 사용 때 생성)"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, self.pool_size))
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _host(self, host):
+        """호스트별 (TokenBucket 또는 None, CircuitBreaker)"""
+        with self._lock:
+            if host not in self._hosts:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                bucket = TokenBucket(rate, burst) if rate else None
+                self._hosts[host] = (bucket, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+            return self._hosts[host]
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def circuit_state(self, url):
+        """url 호스트의 circuit breaker 상태 ('closed', 'open', 'half_open')"""
+        return self._host(urlsplit(url).netloc)[1].state
+
+    def get(self, url, params=None, **kwargs):
+        """
+        GET 요청을 보냅니다. requests.Session.get과 같은 방식으로 호출합니다.
+
+        재시도 후에도 429/5xx이면 그 응답을 반환하므로 호출 측의 raise_for_status()로 처리합니다.
+
+        Raises:
+            CircuitOpenError: 호스트의 circuit breaker가 열려 있는 경우
+            requests.RequestException: 재시도 후에도 연결 오류/타임아웃이거나 재시도하지 않는 요청 오류인 경우
+        """
+        import requests
+
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session
+        host = urlsplit(url).netloc
+        bucket, breaker = self._host(host)
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count('rejected')
+                raise CircuitOpenError(f"{host} 요청 차단 중 (연속 {breaker.failures}회 실패)")
+            if bucket is not None:
+                waited = bucket.acquire()
+                if waited:
+                    self._count('wait_seconds', waited)
+            self._count('requests')
+
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.random()
+            try:
+                response = session.get(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+            except requests.RequestException:
+                # 재시도해도 같은 결과인 오류 (잘못된 URL, 리다이렉트 반복 등): 실패로 세고 바로 전달
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # 그 밖의 예외(KeyboardInterrupt 등)로 끝나도 half_open 확인 요청이 계속 잡혀 있지 않도록
+                breaker.release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    breaker.record_success()
+                    return response
+                if response.status_code == 429:
+                    # 서버는 응답하고 있으므로 실패로 세지 않고 호스트 전체 요청 속도를 늦춤
+                    breaker.record_success()
+                    self._count('throttled')
+                    delay = _retry_after(response) or delay
+                    if bucket is not None:
+                        bucket.pause(delay)
+                else:
+                    breaker.record_failure()
+                if attempt >= self.retries:
+                    return response
+                response.close()
+
+            attempt += 1
+            self._count('retries')
+            time.sleep(delay)